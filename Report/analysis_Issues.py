@@ -1,15 +1,25 @@
-import pandas as pd
 import plotly.graph_objects as go
 import os
 from plotly.subplots import make_subplots
 
+import analytics
+
 def analyze_issue_reports(directory):
-    files = [f for f in os.listdir(directory) if "issue" in f.lower() and f.endswith(".csv")]
+    # Tabelle modello x severita'/tipo, calcolate dal database (o dai risultati salvati)
+    df_severity = analytics.issue_table("Severità", directory)
+    df_type = analytics.issue_table("Tipo", directory)
 
-    if not files:
+    if df_severity.empty:
         print("Nessun file trovato.")
         return
 
+    totals = df_severity.sum(axis=1)
+    # Nelle torte solo le voci sopra l'1% delle issue del modello
+    df_severity = df_severity.where(df_severity.div(totals, axis=0) > 0.01, 0)
+    df_type = df_type.reindex(totals.index, fill_value=0)
+    df_type = df_type.where(df_type.div(totals, axis=0) > 0.01, 0)
+
+    files = list(totals.index)
     num_files = len(files)
     fig = make_subplots(
         rows=num_files, cols=3, 
@@ -19,19 +29,13 @@ def analyze_issue_reports(directory):
     )
 
     for i, file in enumerate(files, start=1):
-        file_path = os.path.join(directory, file)
-        df = pd.read_csv(file_path, encoding='utf-8', header=None)
-        total_issues = df.shape[0]
+        total_issues = int(totals[file])
 
         # Severity Counts
-        severity_counts = df[3].value_counts().reset_index()
-        severity_counts.columns = ["Severità", "Count"]
-        severity_counts = severity_counts[severity_counts["Count"] / total_issues > 0.01]
+        severity_counts = df_severity.loc[file][lambda s: s > 0].rename_axis("Severità").reset_index(name="Count")
 
         # Type Counts
-        type_counts = df[2].value_counts().reset_index()
-        type_counts.columns = ["Tipologia", "Count"]
-        type_counts = type_counts[type_counts["Count"] / total_issues > 0.01]
+        type_counts = df_type.loc[file][lambda s: s > 0].rename_axis("Tipologia").reset_index(name="Count")
 
         # 🔹 Indicator - Reduced Font Size
         fig.add_trace(go.Indicator(
@@ -1,35 +1,35 @@
-import pandas as pd
 import plotly.express as px
 import os
 
+import analytics
+
 def load_and_analyze_files(directory):
     """
-    Legge tutti i file nella cartella che contengono "Valutazioni" nel nome,
-    calcola la media delle metriche e crea un grafico interattivo.
+    Confronta i modelli: media delle metriche (grafico a barre), distribuzione
+    dei punteggi, correlazione tra i modelli e file su cui sono meno d'accordo.
     
     :param directory: Percorso della cartella contenente i file CSV
     """
-    files = [f for f in os.listdir(directory) if "Valutazioni" in f and f.endswith(".csv")]
-    
-    all_data = []
-    
-    for file in files:
-
-        print(file)
-        
-        file_path = os.path.join(directory, file)
-        df = pd.read_csv(file_path, encoding='utf-8')
-        metriche_media = df.select_dtypes(include=['number']).mean()
-        df_media = pd.DataFrame({"Metrica": metriche_media.index, "Media": metriche_media.values})
-        df_media["File"] = file
-        all_data.append(df_media)
-    
-    if all_data:
-        df_final = pd.concat(all_data)
-        fig = px.bar(df_final, x="Metrica", y="Media", color="File", title="Media delle Metriche per File",
-                     text="Media", barmode='group')
-        fig.show()
-    else:
+    df = analytics.metric_means(by_model=True, directory=directory)
+
+    if df.empty:
         print("Nessun file trovato.")
+        return
+
+    df_final = df.melt(id_vars="Model", var_name="Metrica", value_name="Media").rename(columns={"Model": "File"})
+    fig = px.bar(df_final, x="Metrica", y="Media", color="File", title="Media delle Metriche per File",
+                 text="Media", barmode='group')
+    fig.show()
+
+    scores = analytics.load_scores(directory)
+    print(analytics.score_distribution(scores).round(1).to_string())
+
+    if df["Model"].nunique() > 1:
+        correlation = analytics.model_correlation(scores)
+        px.imshow(correlation, text_auto=".2f", zmin=-1, zmax=1, color_continuous_scale="RdBu",
+                  title="Correlazione tra i Modelli (media delle metriche per file)").show()
+
+        print("File con meno accordo tra i modelli:")
+        print(analytics.file_agreement(scores).head(20).round(2).to_string())
 
 load_and_analyze_files(os.path.dirname(os.path.abspath(__file__)))
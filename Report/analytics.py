@@ -0,0 +1,104 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import report_data
+import review_schema
+import run_journal
+
+# Confronto tra modelli usato dagli script di Report: tutti i calcoli sono groupby/pivot
+# vettoriali su un unico DataFrame tipizzato, senza cicli Python sui file o sui modelli.
+
+METRICS = list(report_data.results_db.METRIC_COLUMNS.values())
+
+
+def _concat(frames, categories):
+    """Unisce i blocchi mantenendo categoriali le colonne indicate (senza passare da stringhe)."""
+
+    df = pd.concat([frame.drop(columns=categories) for frame in frames], ignore_index=True)
+    for column in categories:
+        df[column] = union_categoricals([frame[column] for frame in frames], ignore_order=True)
+    return df[frames[0].columns]
+
+
+def load_scores(directory=report_data.REPORT_DIR):
+    """
+    Valutazioni di tutti i modelli in un unico DataFrame: Model e FullPath
+    categoriali, metriche float32 (NaN per i valori non numerici come "Unknown").
+    I risultati sono letti a blocchi e convertiti blocco per blocco, cosi' in
+    memoria ci sono solo le colonne gia' compattate.
+    Restituisce un DataFrame vuoto se non ci sono risultati.
+    """
+
+    frames = []
+    for chunk in report_data.iter_chunks("valutazioni", ["Model", "FullPath"] + METRICS, directory):
+        frames.append(pd.DataFrame({"Model": chunk["Model"].astype("category"),
+                                    "FullPath": chunk["FullPath"].astype("category"),
+                                    **{m: pd.to_numeric(chunk[m], errors="coerce").astype("float32")
+                                       for m in METRICS}}))
+    if not frames:
+        return pd.DataFrame({"Model": pd.Categorical([]), "FullPath": pd.Categorical([]),
+                             **{m: pd.Series(dtype="float32") for m in METRICS}})
+    return _concat(frames, ["Model", "FullPath"])
+
+
+def metric_means(by_model=False, directory=report_data.REPORT_DIR):
+    """Media di ogni metrica (calcolata dal database se presente), con una riga per modello se by_model."""
+
+    return report_data.metric_means(by_model, directory)
+
+
+def issue_table(column, directory=report_data.REPORT_DIR):
+    """Numero di issue per modello (righe) e valore di column, es. "Severità" o "Tipo" (colonne)."""
+
+    counts = report_data.issue_counts(["Model", column], directory)
+    if counts.empty:
+        return pd.DataFrame()
+    table = counts.pivot_table(index="Model", columns=column, values="Count", aggfunc="sum",
+                               fill_value=0, observed=True, dropna=False)
+    return table.astype("int64")
+
+
+def score_distribution(scores):
+    """Per ogni modello e metrica: numero di file, media, deviazione standard e quartili."""
+
+    return scores.groupby("Model", observed=True)[METRICS].describe()
+
+
+def file_scores(scores, metric=None):
+    """
+    Punteggio di ogni file (righe) per ogni modello (colonne): la metrica
+    indicata, oppure la media delle metriche. Piu' righe dello stesso file
+    (es. parti revisionate separatamente) vengono mediate. Le righe con percorso
+    legacy (CSV importati) sono escluse: file diversi con lo stesso nome si confonderebbero.
+    """
+
+    categories = scores["FullPath"].cat.categories
+    legacy = scores["FullPath"].isin(categories[categories.map(run_journal.is_legacy_path)])
+    if legacy.any():
+        print(f"Confronto per file: escluse {int(legacy.sum())} righe con percorso legacy")
+        scores = scores[~legacy]
+
+    value = scores[metric] if metric else scores[METRICS].mean(axis=1)
+    frame = pd.DataFrame({"FullPath": scores["FullPath"], "Model": scores["Model"], "Score": value})
+    return frame.pivot_table(index="FullPath", columns="Model", values="Score", aggfunc="mean", observed=True)
+
+
+def file_agreement(scores, metric=None):
+    """
+    Accordo tra modelli per ogni file valutato da almeno due modelli: media,
+    deviazione standard e distanza tra punteggio massimo e minimo; Agreement
+    va da 1 (stesso punteggio) a 0 (un modello da 1 e uno da 5, gli estremi della scala).
+    """
+
+    table = file_scores(scores, metric)
+    table = table[table.notna().sum(axis=1) >= 2]
+    result = pd.DataFrame({"Models": table.notna().sum(axis=1), "Mean": table.mean(axis=1),
+                           "Std": table.std(axis=1), "Range": table.max(axis=1) - table.min(axis=1)})
+    result["Agreement"] = 1 - result["Range"] / (review_schema.SCORE_MAX - review_schema.SCORE_MIN)
+    return result.sort_values("Agreement")
+
+
+def model_correlation(scores, metric=None, method="spearman"):
+    """Correlazione tra i punteggi dei modelli sui file valutati da entrambi (matrice modello x modello)."""
+
+    return file_scores(scores, metric).corr(method=method, min_periods=2)
@@ -0,0 +1,117 @@
+import os
+import time
+import argparse
+import tempfile
+import resource
+import tracemalloc
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+import report_data
+
+# Misura tempo e picco di memoria del calcolo dei conteggi delle issue per i Report,
+# caricando tutti i CSV in memoria (come facevano gli script) oppure a blocchi.
+# I CSV Issues_ sono sintetici, con testi lunghi in Descrizione/Suggerimento.
+# Esempio: python Report/benchmark_report.py --rows 2000000 --models 5
+# Con --rows 1000000 --models 3 (1654 MB di CSV, 1 CPU): a blocchi 9.6s e 438 MB RSS,
+# tutto in memoria 24.2s e 2512 MB RSS, con gli stessi conteggi.
+
+TIPI = ["Bug", "Sicurezza", "Performance", "Stile", "Manutenibilità", "Leggibilità"]
+SEVERITA = ["Alta", "Media", "Bassa"]
+
+
+def write_synthetic(directory, models, rows, seed=0):
+    """Un CSV Issues_<modello>.csv di rows righe per ogni modello, scritto a blocchi."""
+
+    rng = np.random.default_rng(seed)
+    text = "Descrizione del problema trovato nel codice, con dettagli sulla causa e sul contesto. " * 3
+    for m in range(models):
+        path = os.path.join(directory, f"Issues_model{m}.csv")
+        for start in range(0, rows, report_data.CHUNK_ROWS):
+            n = min(report_data.CHUNK_ROWS, rows - start)
+            files = rng.integers(0, 20000, n)
+            df = pd.DataFrame({
+                "File": [f"file_{f}.py" for f in files],
+                "Riga": rng.integers(1, 2000, n),
+                "Tipo": np.array(TIPI)[rng.integers(0, len(TIPI), n)],
+                "Severità": np.array(SEVERITA)[rng.integers(0, len(SEVERITA), n)],
+                "Descrizione": text,
+                "Suggerimento": text,
+                "FullPath": [f"/src/pkg/file_{f}.py" for f in files],
+            })
+            df.to_csv(path, mode="a" if start else "w", header=not start, index=False, encoding="utf-8")
+
+
+def full_load(directory):
+    """Come gli script prima dei blocchi: tutti i CSV in memoria, poi i conteggi."""
+
+    frames = []
+    for model, path in report_data.csv_files("issues", directory).items():
+        df = pd.read_csv(path, encoding="utf-8")
+        df.insert(0, "Model", model)
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    return df.groupby(["Model", "Severità"]).size()
+
+
+def chunked(directory):
+    """Come report_data.issue_counts sui CSV: conteggi sommati blocco per blocco."""
+
+    counts = None
+    chunks = (chunk for model, path in report_data.csv_files("issues", directory).items()
+              for chunk in report_data._read_csv(path, model, ["Model", "Severità"], report_data.CHUNK_ROWS))
+    for chunk in chunks:
+        part = chunk.groupby(["Model", "Severità"], observed=True).size()
+        counts = part if counts is None else counts.add(part, fill_value=0)
+    return counts
+
+
+def _measure(function, directory, queue):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(directory)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # ru_maxrss e' in KB su Linux: include anche la memoria di pyarrow, non vista da tracemalloc
+    queue.put((result, elapsed, peak, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024))
+
+
+def measure(function, directory):
+    """(risultato, secondi, picco tracemalloc, picco RSS) in un processo separato, per avere picchi indipendenti."""
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(function, directory, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark della lettura a blocchi dei risultati")
+    parser.add_argument("--rows", type=int, default=2000000, help="issue per modello")
+    parser.add_argument("--models", type=int, default=5)
+    parser.add_argument("--skip-full", action="store_true", help="solo la lettura a blocchi")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        write_synthetic(directory, args.models, args.rows)
+        size = sum(os.path.getsize(p) for p in report_data.csv_files("issues", directory).values())
+        total = args.models * args.rows
+        print(f"{total} issue sintetiche ({size / 2 ** 20:.0f} MB di CSV) in {time.perf_counter() - start:.1f}s")
+
+        runs = [("a blocchi", chunked)] + ([] if args.skip_full else [("tutto in memoria", full_load)])
+        results = []
+        for name, function in runs:
+            counts, elapsed, peak, rss = measure(function, directory)
+            results.append(counts.sort_index())
+            print(f"{name:>16}: {elapsed:.1f}s, {total / elapsed:,.0f} righe/s, "
+                  f"picco {peak / 2 ** 20:.0f} MB (tracemalloc), {rss / 2 ** 20:.0f} MB RSS")
+        if len(results) == 2:
+            same = (results[0].astype("int64").values == results[1].values).all()
+            print("conteggi uguali" if same else "ATTENZIONE: conteggi diversi")
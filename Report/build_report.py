@@ -0,0 +1,245 @@
+import os
+import json
+import html
+import time
+import shutil
+import argparse
+
+import pandas as pd
+import plotly.express as px
+
+import analytics
+import report_data
+import review_schema
+
+results_db = report_data.results_db
+
+# Report statico da pubblicare come artifact della CI: gli aggregati vengono calcolati una
+# volta sola e scritti in una cartella con index.html (grafici gia' pronti, dimensione che non
+# cresce con il numero di modelli o di issue), summary.json e le tabelle di dettaglio divise in
+# pagine data/*.js caricate solo quando vengono aperte (funziona anche aprendo il file da disco).
+# Esempio: python Report/build_report.py --output Report/site --max-rows 200000
+
+OUTPUT_DIR = os.path.join(report_data.REPORT_DIR, "site")
+
+# Righe per pagina delle tabelle di dettaglio
+PAGE_ROWS = 5000
+
+# File nel grafico dei file con piu' problemi e righe della tabella di accordo tra modelli
+TOP_FILES = 50
+TOP_DISAGREEMENT = 50
+
+# Intervalli di mezzo punto dell'istogramma dei punteggi, sulla scala 1-5 delle metriche
+# (l'ultimo, [5, 5.5), contiene i file con punteggio pieno)
+SCORE_BINS = [review_schema.SCORE_MIN + 0.5 * i
+              for i in range(2 * (review_schema.SCORE_MAX - review_schema.SCORE_MIN) + 2)]
+
+ISSUE_COLUMNS = ["Model", "File", "Riga", "Tipo", "Severità", "Descrizione", "Suggerimento", "FullPath"]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="it">
+<head>
+<meta charset="utf-8">
+<title>Report revisione codice</title>
+<style>
+body {{ font-family: sans-serif; margin: 20px; }}
+table {{ border-collapse: collapse; font-size: 13px; }}
+td, th {{ border: 1px solid #ccc; padding: 3px 6px; text-align: left; vertical-align: top; }}
+.summary span {{ margin-right: 30px; font-size: 18px; }}
+</style>
+</head>
+<body>
+<h1>Report revisione codice</h1>
+<p class="summary">{summary}</p>
+{figures}
+<h2>Modelli meno d'accordo (punteggio medio per file)</h2>
+{disagreement}
+{tables}
+<script>
+var reportTables = {manifest};
+var reportPages = {{}};
+window.reportPage = function (table, page, rows) {{
+  reportPages[table + ":" + page] = rows;
+  show(table, page);
+}};
+function escapeHtml(value) {{
+  return value === null ? "" : String(value).replace(/[&<>"]/g, function (c) {{
+    return {{"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}}[c];
+  }});
+}}
+function show(table, page) {{
+  var info = reportTables[table];
+  var rows = reportPages[table + ":" + page];
+  if (rows === undefined) {{
+    var script = document.createElement("script");
+    script.src = "data/" + table + "_" + page + ".js";
+    document.body.appendChild(script);
+    return;
+  }}
+  var body = rows.map(function (row) {{
+    return "<tr>" + row.map(function (v) {{ return "<td>" + escapeHtml(v) + "</td>"; }}).join("") + "</tr>";
+  }}).join("");
+  var head = "<tr>" + info.columns.map(function (c) {{ return "<th>" + escapeHtml(c) + "</th>"; }}).join("") + "</tr>";
+  document.getElementById(table + "_table").innerHTML = head + body;
+  document.getElementById(table + "_page").textContent = "Pagina " + (page + 1) + " di " + info.pages;
+  info.current = page;
+}}
+function move(table, step) {{
+  var info = reportTables[table];
+  var page = Math.min(Math.max((info.current || 0) + step, 0), info.pages - 1);
+  show(table, page);
+}}
+</script>
+</body>
+</html>
+"""
+
+TABLE_TEMPLATE = """<h2>{title}</h2>
+<p>{rows} righe.
+<button onclick="show('{name}', 0)">Mostra</button>
+<button onclick="move('{name}', -1)">&lt;</button>
+<button onclick="move('{name}', 1)">&gt;</button>
+<span id="{name}_page"></span></p>
+<table id="{name}_table"></table>
+"""
+
+
+def _write_page(directory, table, page, rows_json):
+    with open(os.path.join(directory, "data", f"{table}_{page}.js"), "w", encoding="utf-8") as f:
+        f.write(f"window.reportPage({json.dumps(table)}, {page}, {rows_json});\n")
+
+
+def write_issue_pages(directory, page_rows=PAGE_ROWS, max_rows=None):
+    """Issue dell'ultimo run di ogni modello in pagine data/issues_<n>.js, lette a blocchi; (righe, pagine)."""
+
+    rows = pages = 0
+    for chunk in report_data.iter_chunks("issues", ISSUE_COLUMNS, chunksize=page_rows):
+        if max_rows is not None:
+            chunk = chunk.head(max_rows - rows)
+        if chunk.empty:
+            break
+        _write_page(directory, "issues", pages, chunk[ISSUE_COLUMNS].to_json(orient="values", force_ascii=False))
+        rows += len(chunk)
+        pages += 1
+    return rows, pages
+
+
+def write_consensus_pages(directory, page_rows=PAGE_ROWS, max_rows=None, min_hits=2):
+    """Issue in comune tra piu' modelli (cluster di issue_clusters.py) in pagine data/consensus_<n>.js."""
+
+    rows = pages = 0
+    while max_rows is None or rows < max_rows:
+        limit = page_rows if max_rows is None else min(page_rows, max_rows - rows)
+        page, _ = report_data.consensus_page(rows, limit, min_hits)
+        if not page:
+            break
+        _write_page(directory, "consensus", pages, json.dumps([list(row.values()) for row in page],
+                                                              ensure_ascii=False))
+        rows += len(page)
+        pages += 1
+    return rows, pages
+
+
+def score_histogram(scores):
+    """Numero di file per intervallo di punteggio medio e modello: pochi punti per modello, non uno per file."""
+
+    mean = scores[analytics.METRICS].mean(axis=1)
+    bins = pd.cut(mean, SCORE_BINS, include_lowest=True, right=False).rename("Intervallo")
+    counts = mean.groupby([scores["Model"], bins], observed=False).size().rename("File").reset_index()
+    counts["Punteggio"] = counts["Intervallo"].map(lambda interval: interval.left).astype(float)
+    return counts[["Model", "Punteggio", "File"]]
+
+
+def build_figures(scores):
+    """Grafici dagli aggregati: uno per tipo, con tutti i modelli insieme."""
+
+    figures = []
+    severity = analytics.issue_table("Severità")
+    if not severity.empty:
+        df = severity.reset_index().melt(id_vars="Model", var_name="Severità", value_name="Issue")
+        figures.append(px.bar(df, x="Model", y="Issue", color="Severità", title="Issue per Modello e Severità"))
+    types = analytics.issue_table("Tipo")
+    if not types.empty:
+        df = types.reset_index().melt(id_vars="Model", var_name="Tipo", value_name="Issue")
+        figures.append(px.bar(df, x="Model", y="Issue", color="Tipo", title="Issue per Modello e Tipo"))
+
+    means = analytics.metric_means(by_model=True)
+    if not means.empty:
+        df = means.melt(id_vars="Model", var_name="Metrica", value_name="Media")
+        figures.append(px.bar(df, x="Metrica", y="Media", color="Model", barmode="group",
+                              title="Media delle Metriche per Modello"))
+
+    files = report_data.issue_counts(["File"], limit=TOP_FILES)
+    if not files.empty:
+        figures.append(px.bar(files, x="File", y="Count", title=f"{TOP_FILES} File con più Problemi"))
+
+    if len(scores):
+        figures.append(px.line(score_histogram(scores), x="Punteggio", y="File", color="Model", markers=True,
+                               title="Distribuzione del Punteggio Medio per File"))
+        if scores["Model"].nunique() > 1:
+            figures.append(px.imshow(analytics.model_correlation(scores), text_auto=".2f", zmin=-1, zmax=1,
+                                     color_continuous_scale="RdBu", title="Correlazione tra i Modelli"))
+    return figures
+
+
+def build(output_dir=OUTPUT_DIR, page_rows=PAGE_ROWS, max_rows=None, cdn=False):
+    start = time.perf_counter()
+    if os.path.isdir(os.path.join(output_dir, "data")):
+        shutil.rmtree(os.path.join(output_dir, "data"))
+    os.makedirs(os.path.join(output_dir, "data"), exist_ok=True)
+
+    scores = analytics.load_scores()
+    figures = build_figures(scores)
+    # plotly.js una sola volta (inclusa nel file, o dalla CDN con cdn=True)
+    plotlyjs = "cdn" if cdn else True
+    figures_html = "\n".join(fig.to_html(full_html=False, include_plotlyjs=plotlyjs if i == 0 else False)
+                             for i, fig in enumerate(figures))
+
+    disagreement = analytics.file_agreement(scores).head(TOP_DISAGREEMENT) if len(scores) else pd.DataFrame()
+    disagreement_html = disagreement.round(2).to_html() if len(disagreement) else "<p>Meno di due modelli.</p>"
+
+    issue_rows, issue_pages = write_issue_pages(output_dir, page_rows, max_rows)
+    consensus_rows, consensus_pages = write_consensus_pages(output_dir, page_rows, max_rows)
+    manifest = {"issues": {"columns": ISSUE_COLUMNS, "pages": issue_pages}}
+    tables = TABLE_TEMPLATE.format(title="Tabella Dettagliata dei Problemi", rows=issue_rows, name="issues")
+    if consensus_pages:
+        manifest["consensus"] = {"columns": list(results_db.CLUSTER_COLUMNS.values()), "pages": consensus_pages}
+        tables += TABLE_TEMPLATE.format(title="Issue in comune tra i modelli", rows=consensus_rows, name="consensus")
+
+    counts = report_data.issue_counts(["Model"])
+    means = analytics.metric_means(by_model=True)
+    summary = {
+        "generated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "total_issues": int(counts["Count"].sum()),
+        "issues_by_model": {str(k): int(v) for k, v in zip(counts["Model"], counts["Count"])},
+        "metric_means": {str(row["Model"]): {m: (None if pd.isna(row[m]) else round(float(row[m]), 2))
+                                              for m in analytics.METRICS} for _, row in means.iterrows()},
+        "files_scored": int(scores["FullPath"].nunique()) if len(scores) else 0,
+        "consensus_issues": consensus_rows,
+        "detail_rows": issue_rows,
+    }
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    summary_html = "".join(f"<span>{html.escape(label)}: <b>{value}</b></span>" for label, value in [
+        ("Issue", summary["total_issues"]), ("Modelli", len(summary["issues_by_model"])),
+        ("File valutati", summary["files_scored"]), ("Issue in comune", consensus_rows),
+        ("Generato", summary["generated"])])
+    with open(os.path.join(output_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(PAGE_TEMPLATE.format(summary=summary_html, figures=figures_html, disagreement=disagreement_html,
+                                     tables=tables, manifest=json.dumps(manifest, ensure_ascii=False)))
+    return summary, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report statico HTML/JSON dei risultati")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="cartella del report")
+    parser.add_argument("--page-rows", type=int, default=PAGE_ROWS, help="righe per pagina delle tabelle")
+    parser.add_argument("--max-rows", type=int, default=None, help="righe massime per tabella di dettaglio")
+    parser.add_argument("--cdn", action="store_true", help="carica plotly.js dalla CDN invece di includerlo")
+    args = parser.parse_args()
+
+    summary, seconds = build(args.output, args.page_rows, args.max_rows, args.cdn)
+    size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(args.output) for f in files)
+    print(f"Report in {args.output}: {summary['total_issues']} issue, {summary['detail_rows']} righe di dettaglio, "
+          f"{size / 2 ** 20:.1f} MB in {seconds:.1f}s")
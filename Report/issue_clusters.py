@@ -0,0 +1,188 @@
+import re
+import sys
+import time
+import zlib
+import hashlib
+import argparse
+from contextlib import closing
+from collections import Counter
+
+import numpy as np
+
+import report_data
+
+results_db = report_data.results_db
+
+# Raggruppa le issue che descrivono lo stesso problema (stesso file, righe vicine, testo simile),
+# segnalate da modelli diversi o piu' volte dallo stesso modello, e salva nel database un id
+# canonico per ogni gruppo con i modelli che lo hanno trovato.
+# Le coppie candidate vengono da MinHash + LSH sul testo di Descrizione: nessun confronto a coppie
+# su tutte le issue, il costo cresce con il numero di issue. Tutto locale, senza rete.
+# Esempio: python Report/issue_clusters.py --line-window 5 --similarity 0.4
+
+# Righe di distanza massima tra due issue dello stesso problema
+LINE_WINDOW = 5
+
+# Somiglianza di Jaccard (stimata) minima tra le parole delle descrizioni
+SIMILARITY = 0.4
+
+# Firma MinHash: NUM_PERM valori divisi in BANDS bande per l'LSH. Con 32 bande da 2 valori
+# una coppia con somiglianza 0.4 diventa candidata con probabilita' superiore al 99%
+NUM_PERM = 64
+BANDS = 32
+
+# Issue vicine (ordinate per riga) confrontate dentro ogni bucket LSH
+MAX_NEIGHBOURS = 8
+
+# Issue elaborate insieme (sempre file interi)
+BATCH_ISSUES = 50000
+
+PRIME = 4294967291
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 31, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text):
+    """
+    Hash (crc32) delle parole del testo in minuscolo, escluse quelle di tre
+    lettere o meno (articoli, preposizioni): modelli diversi descrivono lo
+    stesso problema con parole simili in ordine diverso.
+    """
+
+    words = {w for w in re.findall(r"\w+", (text or "").lower()) if len(w) > 3} or {""}
+    return [zlib.crc32(word.encode("utf-8")) for word in words]
+
+
+def signatures(texts, block=1000):
+    """Firme MinHash (una riga di NUM_PERM valori per testo), calcolate con numpy a blocchi di testi."""
+
+    result = []
+    for start in range(0, len(texts), block):
+        hashed = [shingles(text) for text in texts[start:start + block]]
+        offsets = np.cumsum([0] + [len(h) for h in hashed[:-1]])
+        values = np.fromiter((h for hs in hashed for h in hs), dtype=np.uint64)
+        permuted = (_A[:, None] * values[None, :] + _B[:, None]) % PRIME
+        result.append(np.minimum.reduceat(permuted, offsets, axis=1).T.astype(np.uint32))
+    return np.concatenate(result) if result else np.empty((0, NUM_PERM), dtype=np.uint32)
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+
+def candidate_pairs(file_ids, lines, signature, line_window=LINE_WINDOW, similarity=SIMILARITY):
+    """
+    Coppie (i, j) di issue dello stesso file, a meno di line_window righe e con
+    somiglianza stimata almeno similarity. Per ogni banda le issue con la stessa
+    banda della firma (stesso bucket) vengono ordinate per riga e confrontate solo
+    con le MAX_NEIGHBOURS successive: costo lineare nel numero di issue.
+    """
+
+    rows = NUM_PERM // BANDS
+    found = []
+    for band in range(BANDS):
+        _, bucket = np.unique(signature[:, band * rows:(band + 1) * rows], axis=0, return_inverse=True)
+        bucket = bucket.reshape(-1)
+        order = np.lexsort((lines, bucket, file_ids))
+        for step in range(1, MAX_NEIGHBOURS + 1):
+            i, j = order[:-step], order[step:]
+            same = (bucket[i] == bucket[j]) & (file_ids[i] == file_ids[j]) & (lines[j] - lines[i] <= line_window)
+            found.append(np.stack([i[same], j[same]], axis=1))
+
+    pairs = np.unique(np.concatenate(found), axis=0) if found else np.empty((0, 2), dtype=np.int64)
+    if len(pairs):
+        score = (signature[pairs[:, 0]] == signature[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[score >= similarity]
+    return pairs
+
+
+def _clusters(rows, line_window, similarity):
+    """Cluster (tuple come results_db.CLUSTER_COLUMNS senza id) e rowid membri di un blocco di issue."""
+
+    file_ids = np.unique([row[2] for row in rows], return_inverse=True)[1].reshape(-1)
+    # Le issue senza riga valgono come riga -inf: si raggruppano solo tra loro
+    lines = np.array([row[3] if row[3] is not None else -10 ** 9 for row in rows], dtype=np.int64)
+    signature = signatures([row[6] for row in rows])
+
+    groups = _UnionFind(len(rows))
+    for i, j in candidate_pairs(file_ids, lines, signature, line_window, similarity):
+        groups.union(int(i), int(j))
+
+    members = {}
+    for index in range(len(rows)):
+        members.setdefault(groups.find(index), []).append(rows[index])
+    for group in members.values():
+        # Rappresentante: la prima issue per riga e modello
+        first = min(group, key=lambda row: (row[3] is None, row[3] or 0, row[1]))
+        models = sorted({row[1] for row in group})
+        line_values = [row[3] for row in group if row[3] is not None]
+        yield ((first[2], min(line_values, default=None), max(line_values, default=None),
+                Counter(row[4] for row in group).most_common(1)[0][0],
+                Counter(row[5] for row in group).most_common(1)[0][0],
+                first[6], ", ".join(models), len(models)),
+               [row[0] for row in group])
+
+
+def _batches(cursor, size):
+    """Blocchi di circa size issue, senza dividere un file tra due blocchi."""
+
+    batch = []
+    for row in cursor:
+        if len(batch) >= size and row[2] != batch[-1][2]:
+            yield batch
+            batch = []
+        batch.append(row)
+    if batch:
+        yield batch
+
+
+def build_clusters(connection, line_window=LINE_WINDOW, similarity=SIMILARITY):
+    """Ricostruisce i cluster delle issue dell'ultimo run di ogni modello e li salva nel database."""
+
+    clusters, members, used = [], [], set()
+    issues = 0
+    for batch in _batches(results_db.latest_issue_rows(connection), BATCH_ISSUES):
+        issues += len(batch)
+        for cluster, rowids in _clusters(batch, line_window, similarity):
+            key = "\0".join(str(v) for v in (cluster[0], cluster[1], cluster[5]))
+            cluster_id = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+            n = 1
+            while cluster_id in used:
+                cluster_id = hashlib.sha1(f"{key}\0{n}".encode("utf-8")).hexdigest()[:16]
+                n += 1
+            used.add(cluster_id)
+            clusters.append((cluster_id,) + cluster)
+            members.extend((rowid, cluster_id) for rowid in rowids)
+
+    results_db.replace_clusters(connection, clusters, members)
+    return issues, clusters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deduplica delle issue tra modelli")
+    parser.add_argument("--line-window", type=int, default=LINE_WINDOW, help="righe di distanza massima")
+    parser.add_argument("--similarity", type=float, default=SIMILARITY, help="somiglianza minima del testo (0-1)")
+    args = parser.parse_args()
+
+    if not report_data.database_available():
+        sys.exit(f"Nessun risultato in {results_db.DB_PATH}: esegui prima una revisione")
+
+    start = time.perf_counter()
+    with closing(results_db.connect()) as connection:
+        issues, clusters = build_clusters(connection, args.line_window, args.similarity)
+    shared = sum(1 for cluster in clusters if cluster[-1] > 1)
+    print(f"{issues} issue in {len(clusters)} cluster ({shared} segnalati da piu' modelli) "
+          f"in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,384 @@
+import os
+import sys
+import time
+import argparse
+from contextlib import closing
+from functools import lru_cache
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Script")))
+import results_db
+import results_store
+import run_journal
+
+# Cartella dei report e dei CSV prodotti dagli script
+REPORT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CSV_PREFIX = {"valutazioni": "Valutazioni_", "issues": "Issues_"}
+
+# Righe lette per blocco quando i risultati vengono aggregati a blocchi
+CHUNK_ROWS = 200000
+
+# Colonne di testo ripetute lette come categoriali
+CATEGORY_COLUMNS = ("Model", "File", "Tipo", "Severità")
+
+# Operatori accettati nei filtri delle issue: (colonna, operatore, valore)
+OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "contains")
+
+
+def csv_files(table, directory=REPORT_DIR):
+    """{modello: percorso} dei CSV Valutazioni_/Issues_ presenti nella cartella."""
+
+    prefix = CSV_PREFIX[table]
+    return {f[len(prefix):-len(".csv")]: os.path.join(directory, f) for f in sorted(os.listdir(directory))
+            if f.startswith(prefix) and f.endswith(".csv")}
+
+
+def db_path_of(directory=REPORT_DIR):
+    """Database dei risultati della cartella, dove lo scrive results_store.export_run."""
+    return os.path.join(directory, os.path.basename(results_db.DB_PATH))
+
+
+def store_of(directory=REPORT_DIR):
+    """Archivio Parquet dei risultati della cartella, dove lo scrive results_store.export_run."""
+    return os.path.join(directory, os.path.basename(results_store.RESULTS_DIR))
+
+
+def _read_csv(path, model, columns, chunksize=None):
+    """
+    CSV di un modello con le sole colonne richieste, le colonne ripetute categoriali e la colonna Model.
+    FullPath diventa il percorso legacy (vedi run_journal.legacy_path), come nei CSV importati.
+    """
+
+    wanted = None if columns is None else [c for c in columns if c != "Model"]
+    dtype = {c: "category" for c in CATEGORY_COLUMNS if wanted is None or c in wanted}
+    # Con la sola colonna Model si legge comunque File, altrimenti pandas non restituisce righe
+    usecols = ["File"] if wanted == [] else wanted
+    chunks = pd.read_csv(path, encoding="utf-8", usecols=usecols, dtype=dtype, chunksize=chunksize)
+    for chunk in ([chunks] if chunksize is None else chunks):
+        chunk.insert(0, "Model", pd.Categorical([model] * len(chunk)))
+        if "FullPath" in chunk:
+            chunk["FullPath"] = chunk["FullPath"].map(run_journal.legacy_path)
+        yield chunk if wanted != [] else chunk[["Model"]]
+
+
+def _load_csv(table, columns, directory):
+    frames = [df for model, path in csv_files(table, directory).items() for df in _read_csv(path, model, columns)]
+    if not frames:
+        return None
+
+    df = pd.concat(frames, ignore_index=True)
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("category")
+    return df
+
+
+class _CsvRun:
+    """
+    I CSV Valutazioni_/Issues_ di un modello come voci di journal (una per riga),
+    letti a blocchi di CHUNK_ROWS righe, per importarli con write_journal.
+    Il percorso di ogni voce e' quello legacy ricavato da FullPath.
+    """
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def ordered_entries(self):
+        for table, path in self.paths.items():
+            for df in pd.read_csv(path, encoding="utf-8", dtype=object, chunksize=CHUNK_ROWS):
+                for row in df.where(df.notna(), None).itertuples(index=False, name=None):
+                    entry = {"path": run_journal.legacy_path(row[-1]), "valutazioni": [], "issues": []}
+                    entry[table].append(list(row))
+                    yield entry
+
+
+def _db_models(db_path):
+    with closing(results_db.connect(db_path)) as connection:
+        return {model for (model,) in connection.execute("SELECT DISTINCT model FROM runs")}
+
+
+def _store_models(directory):
+    if not results_store.available():
+        return set()
+    store = store_of(directory)
+    return set(results_store.runs("valutazioni", store)) | set(results_store.runs("issues", store))
+
+
+def _csv_models(directory):
+    """{modello: {tabella: percorso}} dei CSV della cartella."""
+
+    files = {}
+    for table in CSV_PREFIX:
+        for model, path in csv_files(table, directory).items():
+            files.setdefault(model, {})[table] = path
+    return files
+
+
+def import_csv(directory=REPORT_DIR, db_path=None):
+    """
+    Importa nel database e nell'archivio Parquet della cartella i modelli che hanno
+    solo i CSV (run degli script precedenti), cosi' compaiono nei Report insieme ai
+    risultati salvati. Ogni modello viene importato una sola volta, con il run id
+    dato dalla data del CSV e i percorsi legacy. Restituisce i modelli importati.
+    """
+
+    db_path = db_path or db_path_of(directory)
+    db_models = _db_models(db_path) if database_available(db_path) else set()
+    store_models = _store_models(directory)
+
+    imported = []
+    for model, paths in _csv_models(directory).items():
+        to_db = model not in db_models
+        to_store = results_store.available() and model not in store_models
+        if not (to_db or to_store):
+            continue
+        run_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(max(map(os.path.getmtime, paths.values()))))
+        if to_db:
+            results_db.write_journal(_CsvRun(paths), model, run_id, db_path)
+        if to_store:
+            results_store.write_journal(_CsvRun(paths), model, run_id, store_of(directory))
+        imported.append(model)
+    return imported
+
+
+@lru_cache(maxsize=8)
+def _sources_for(directory, db_path, version):
+    has_db = database_available(db_path)
+    db_models = _db_models(db_path) if has_db else set()
+    store_models = _store_models(directory)
+    use_store = bool(store_models) and db_models <= store_models
+
+    # Con risultati salvati i CSV non vengono letti: i modelli che hanno solo i CSV vanno importati
+    if has_db or store_models:
+        missing = sorted(set(_csv_models(directory)) - db_models - store_models)
+        if missing:
+            print(f"Modelli presenti solo nei CSV, esclusi dai Report: {', '.join(missing)}. "
+                  f"Importali con: python Report/report_data.py --directory {directory}")
+    return use_store, has_db, db_path
+
+
+def _sources(directory, db_path):
+    """
+    (usa l'archivio Parquet, usa il database, percorso del database) per la cartella,
+    ricalcolato solo quando cambiano i dati. L'archivio si usa solo se contiene
+    tutti i modelli del database.
+    """
+
+    db_path = db_path or db_path_of(directory)
+    return _sources_for(directory, db_path, data_version(directory, db_path))
+
+
+def _load_db(table, columns, db_path):
+    with closing(results_db.connect(db_path)) as connection:
+        df = pd.read_sql_query(results_db.latest_query(table, columns), connection)
+    if df.empty:
+        return None
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def load(table, columns=None, directory=REPORT_DIR, db_path=None):
+    """
+    Risultati di tutti i modelli per la tabella "valutazioni" o "issues", con la
+    colonna Model. Legge solo le colonne richieste dall'archivio Parquet, poi dal
+    database della cartella (vedi _sources); se nessuno dei due ha risultati legge
+    i CSV della cartella. Restituisce None se non ci sono risultati.
+    """
+
+    use_store, has_db, db_path = _sources(directory, db_path)
+    if use_store:
+        return results_store.load(table, columns, directory=store_of(directory))
+    if has_db:
+        return _load_db(table, columns, db_path)
+    return _load_csv(table, columns, directory)
+
+
+def iter_chunks(table, columns=None, directory=REPORT_DIR, chunksize=CHUNK_ROWS, db_path=None):
+    """
+    Come load, ma a blocchi di al massimo chunksize righe, per aggregare
+    risultati che non stanno in memoria. Le colonne ripetute sono categoriali
+    in ogni blocco, con categorie che possono cambiare da un blocco all'altro.
+    """
+
+    use_store, has_db, db_path = _sources(directory, db_path)
+    if use_store:
+        yield from results_store.iter_batches(table, columns, chunksize, directory=store_of(directory))
+    elif has_db:
+        with closing(results_db.connect(db_path)) as connection:
+            for chunk in pd.read_sql_query(results_db.latest_query(table, columns), connection, chunksize=chunksize):
+                for column in CATEGORY_COLUMNS:
+                    if column in chunk:
+                        chunk[column] = chunk[column].astype("category")
+                yield chunk
+    else:
+        for model, path in csv_files(table, directory).items():
+            yield from _read_csv(path, model, columns, chunksize)
+
+# Colonne dei Report e corrispondenti colonne del database
+DB_COLUMNS = {name: column for column, name in results_db.ISSUE_COLUMNS.items()}
+
+
+def database_available(db_path=results_db.DB_PATH):
+    if not os.path.exists(db_path):
+        return False
+    with closing(results_db.connect(db_path)) as connection:
+        return connection.execute("SELECT 1 FROM runs LIMIT 1").fetchone() is not None
+
+
+def issue_counts(columns, directory=REPORT_DIR, limit=None, db_path=None):
+    """
+    Numero di issue per ogni combinazione delle colonne indicate (es. ["Model", "Severità"]),
+    in ordine decrescente, nella colonna Count. Se c'e' il database il conteggio e' fatto
+    da SQLite sull'ultimo run di ogni modello, senza caricare le issue.
+    """
+
+    _, has_db, db_path = _sources(directory, db_path)
+    if has_db:
+        with closing(results_db.connect(db_path)) as connection:
+            rows = results_db.issue_counts(connection, [DB_COLUMNS[c] for c in columns], limit=limit)
+        return pd.DataFrame(rows, columns=list(columns) + ["Count"])
+
+    # Conteggi sommati blocco per blocco: in memoria c'e' un solo blocco alla volta
+    counts = None
+    for chunk in iter_chunks("issues", list(dict.fromkeys(columns)), directory, db_path=db_path):
+        part = chunk.groupby(list(columns), observed=True, dropna=False).size()
+        counts = part if counts is None else counts.add(part, fill_value=0)
+    if counts is None:
+        return pd.DataFrame(columns=list(columns) + ["Count"])
+    counts = counts.astype("int64").sort_values(ascending=False).reset_index(name="Count")
+    return counts if limit is None else counts.head(limit)
+
+
+def metric_means(by_model=False, directory=REPORT_DIR, db_path=None):
+    """Media di ogni metrica (colonne Manutenibilità, ...), con una riga per modello se by_model."""
+
+    names = list(results_db.METRIC_COLUMNS.values())
+    _, has_db, db_path = _sources(directory, db_path)
+    if has_db:
+        with closing(results_db.connect(db_path)) as connection:
+            rows = results_db.metric_means(connection, by_model)
+        df = pd.DataFrame(rows, columns=(["Model"] if by_model else []) + names)
+        return df.astype({name: "float64" for name in names})
+
+    # Somme e conteggi per modello accumulati blocco per blocco
+    sums = counts = None
+    for chunk in iter_chunks("valutazioni", ["Model"] + names, directory, db_path=db_path):
+        values = chunk[names].apply(pd.to_numeric, errors="coerce")
+        grouped = values.groupby(chunk["Model"], observed=True)
+        part_sums, part_counts = grouped.sum(), grouped.count()
+        sums = part_sums if sums is None else sums.add(part_sums, fill_value=0)
+        counts = part_counts if counts is None else counts.add(part_counts, fill_value=0)
+    if sums is None:
+        return pd.DataFrame(columns=(["Model"] if by_model else []) + names)
+    if by_model:
+        return (sums / counts).rename_axis("Model").reset_index()
+    return (sums.sum() / counts.sum()).to_frame().T
+
+
+def data_version(directory=REPORT_DIR, db_path=None):
+    """
+    Firma dei risultati salvati (date di modifica di database, archivio Parquet
+    e CSV): cambia quando un run scrive nuovi risultati.
+    """
+
+    db_path = db_path or db_path_of(directory)
+    paths = [db_path, db_path + "-wal"]
+    for table in CSV_PREFIX:
+        paths.extend(csv_files(table, directory).values())
+    for root, _, files in os.walk(store_of(directory)):
+        paths.extend(os.path.join(root, f) for f in files if f.endswith(".parquet"))
+    return tuple((path, os.path.getmtime(path)) for path in sorted(paths) if os.path.exists(path))
+
+
+@lru_cache(maxsize=1)
+def _issues_frame(directory, db_path, version):
+    return load("issues", directory=directory, db_path=db_path)
+
+
+def _value(column, value):
+    if column == "Riga":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return value
+    return value
+
+
+def _filter_frame(df, filters):
+    compare = {"=": "eq", "!=": "ne", "<": "lt", "<=": "le", ">": "gt", ">=": "ge"}
+    for column, operator, value in filters:
+        if operator == "contains":
+            mask = df[column].astype(str).str.contains(str(value), case=False, regex=False, na=False)
+        else:
+            mask = getattr(df[column], compare[operator])(_value(column, value))
+        df = df[mask]
+    return df
+
+
+def issues_page(offset, limit, filters=None, sort=None, directory=REPORT_DIR, db_path=None):
+    """
+    Una pagina di issue come lista di dizionari e il numero di issue che
+    soddisfano i filtri. filters e' una lista di (colonna, operatore, valore)
+    con gli operatori di OPERATORS, sort una lista di (colonna, "asc"/"desc").
+    Con il database filtro, ordinamento e paginazione sono fatti da SQLite;
+    altrimenti sulle issue caricate una sola volta per versione dei dati.
+    """
+
+    filters = list(filters or [])
+    sort = list(sort or [])
+    for column, operator, _ in filters:
+        if column not in DB_COLUMNS or operator not in OPERATORS:
+            raise ValueError(f"filtro non supportato: {column} {operator}")
+    for column, _ in sort:
+        if column not in DB_COLUMNS:
+            raise ValueError(f"colonna sconosciuta: {column}")
+
+    _, has_db, db_path = _sources(directory, db_path)
+    if has_db:
+        db_filters = [(DB_COLUMNS[column], "LIKE", f"%{value}%") if operator == "contains"
+                      else (DB_COLUMNS[column], operator, _value(column, value))
+                      for column, operator, value in filters]
+        with closing(results_db.connect(db_path)) as connection:
+            total = results_db.total_issues(connection, db_filters)
+            rows = results_db.issues_page(connection, offset, limit, db_filters,
+                                          [(DB_COLUMNS[column], direction) for column, direction in sort])
+        names = list(results_db.ISSUE_COLUMNS.values())
+        return [dict(zip(names, row)) for row in rows], total
+
+    df = _issues_frame(directory, db_path, data_version(directory, db_path))
+    if df is None:
+        return [], 0
+    df = _filter_frame(df, filters)
+    if sort:
+        df = df.sort_values([column for column, _ in sort],
+                            ascending=[direction != "desc" for _, direction in sort], kind="stable")
+    page = df.iloc[offset:offset + limit]
+    return page.astype(object).where(page.notna(), None).to_dict("records"), len(df)
+
+
+def consensus_page(offset, limit, min_hits=2, directory=REPORT_DIR, db_path=None):
+    """
+    Una pagina dei cluster di issue (creati da issue_clusters.py) segnalati da
+    almeno min_hits modelli, come lista di dizionari, e il numero di cluster.
+    """
+
+    db_path = db_path or db_path_of(directory)
+    if not database_available(db_path):
+        return [], 0
+    with closing(results_db.connect(db_path)) as connection:
+        total = results_db.cluster_count(connection, min_hits)
+        rows = results_db.clusters_page(connection, offset, limit, min_hits)
+    names = list(results_db.CLUSTER_COLUMNS.values())
+    return [dict(zip(names, row)) for row in rows], total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa i CSV Valutazioni_/Issues_ nel database e nell'archivio")
+    parser.add_argument("--directory", default=REPORT_DIR, help="cartella dei CSV e dei risultati")
+    args = parser.parse_args()
+
+    imported = import_csv(args.directory)
+    print(f"Modelli importati: {', '.join(imported)}" if imported else "Nessun modello da importare")
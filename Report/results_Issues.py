@@ -1,84 +1,199 @@
 import os
+import re
 import pandas as pd
 import plotly.express as px
 import dash
 from dash import dcc, html, dash_table
+from dash.dependencies import Input, Output, State
+
+import analytics
+import report_data
 
 # Cartella con i file CSV
 folder_path = os.path.dirname(os.path.abspath(__file__))  # Modifica con il percorso della tua cartella
 
-# Trova tutti i file che contengono "issues" nel nome
-files = [f for f in os.listdir(folder_path) if "issues" in f.lower() and f.endswith(".csv")]
+# Righe per pagina della tabella e file mostrati nel grafico dei file con piu' problemi
+PAGE_SIZE = 10
+TOP_FILES = 50
+
+# Ogni quanti secondi la pagina controlla se ci sono nuovi risultati
+REFRESH_SECONDS = 30
+
+# Colonne della tabella dettagliata
+TABLE_COLUMNS = ["Model", "File", "Riga", "Tipo", "Severità", "Descrizione", "Suggerimento", "FullPath"]
+
+# Colonne della tabella delle issue in comune tra i modelli (cluster di issue_clusters.py)
+CONSENSUS_COLUMNS = list(report_data.results_db.CLUSTER_COLUMNS.values())
 
-# Legge e combina i file CSV
-dfs = [pd.read_csv(os.path.join(folder_path, file)) for file in files]
-df = pd.concat(dfs, ignore_index=True)
+# Aggregati calcolati dal database (o dai risultati salvati), ricalcolati solo quando cambiano i dati
+_aggregates = {"version": None}
 
-# Preparazione dati per i grafici
-df_tipo = df['Tipo'].value_counts().reset_index()
-df_tipo.columns = ['Tipo', 'Conteggio']
 
-df_file = df['File'].value_counts().reset_index()
-df_file.columns = ['File', 'Numero di Problemi']
+def aggregates():
+    version = report_data.data_version(folder_path)
+    if _aggregates["version"] == version:
+        return _aggregates
 
-# Numero totale di issues
-total_issues = len(df)
+    # Totali di tutti i modelli dalle tabelle modello x severita'/tipo
+    df_severita = analytics.issue_table('Severità', folder_path).sum().sort_values(ascending=False)
+    df_severita = df_severita.rename_axis('Severità').reset_index(name='Count')
 
-# Trova tutti i file che contengono "issues" nel nome
-files = [f for f in os.listdir(folder_path) if "valutazioni" in f.lower() and f.endswith(".csv")]
-# Legge e combina i file CSV
-dfs = [pd.read_csv(os.path.join(folder_path, file)) for file in files]
-df_valutazioni = pd.concat(dfs, ignore_index=True)
+    df_tipo = analytics.issue_table('Tipo', folder_path).sum().sort_values(ascending=False)
+    df_tipo = df_tipo.rename_axis('Tipo').reset_index(name='Conteggio')
+
+    df_file = report_data.issue_counts(['File'], folder_path, limit=TOP_FILES)
+    df_file.columns = ['File', 'Numero di Problemi']
+
+    # Media delle metriche di tutti i modelli (vuota se non ci sono ancora valutazioni)
+    means = analytics.metric_means(directory=folder_path)
+    means = means.iloc[0] if len(means) else pd.Series(index=means.columns, dtype='float64')
+    df_valutazioni_mean = means.rename_axis('Metrica').reset_index(name='Media')
+
+    _aggregates.update(
+        version=version,
+        total_issues=int(report_data.issue_counts(['Model'], folder_path)['Count'].sum()),
+        severity_pie=px.pie(df_severita, names='Severità', values='Count', title='Distribuzione per Severità', hole=0.4),
+        type_bar=px.bar(df_tipo, x='Tipo', y='Conteggio',
+                        title='Numero di Problemi per Tipo', labels={'Tipo': 'Tipo', 'Conteggio': 'Numero di Problemi'}),
+        file_bar=px.bar(df_file, x='File', y='Numero di Problemi',
+                        title='File con più Problemi', labels={'File': 'File', 'Numero di Problemi': 'Conteggio'}),
+        metrics=df_valutazioni_mean.astype(object).where(df_valutazioni_mean.notna(), None).to_dict('records'),
+    )
+    return _aggregates
+
+
+def parse_filter(filter_query):
+    """Filtri della tabella (es. '{Tipo} contains Bug && {Riga} > 10') come (colonna, operatore, valore)."""
+
+    filters = []
+    for part in (filter_query or "").split(" && "):
+        match = re.match(r"\s*\{(.+?)\}\s+(s?contains|[si]?(?:=|!=|<=|>=|<|>)|eq|ne|lt|le|gt|ge)\s+(.*)", part)
+        if not match:
+            continue
+        column, operator, value = match.groups()
+        operator = {"eq": "=", "ne": "!=", "lt": "<", "le": "<=", "gt": ">", "ge": ">="}.get(operator, operator)
+        # Le varianti s/i (maiuscole/minuscole) sono trattate come l'operatore semplice
+        operator = operator.lstrip("si")
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'`":
+            value = value[1:-1]
+        filters.append((column, operator, value))
+    return filters
 
-# Calcolare la media delle metriche
-df_valutazioni_mean = df_valutazioni.select_dtypes(include=['number']).mean().reset_index()
-df_valutazioni_mean.columns = ['Metrica', 'Media']
 
 # Avvia l'app Dash
 app = dash.Dash(__name__)
 app.title = "Analisi Issues Multipli"
 
+initial = aggregates()
+
 app.layout = html.Div([
     # Titolo e numero totale di issues
     html.Div([
         html.H1("Dashboard Analisi Issues", style={'display': 'inline-block', 'marginRight': '20px'}),
-        html.H3(f"Totale Issues: {total_issues}", style={'display': 'inline-block', 'color': 'red'})
+        html.H3(f"Totale Issues: {initial['total_issues']}", id='total_issues',
+                style={'display': 'inline-block', 'color': 'red'})
     ], style={'textAlign': 'center'}),
 
     # Contenitore per il grafico a torta e la media delle metriche
     html.Div([
-        dcc.Graph(id='severity_pie',
-                  figure=px.pie(df, names='Severità', title='Distribuzione per Severità', hole=0.4)),
-        
+        dcc.Graph(id='severity_pie', figure=initial['severity_pie']),
+
         html.Div([
             html.H3("Media delle Metriche", style={'textAlign': 'center'}),
             dash_table.DataTable(
-                columns=[{'name': col, 'id': col} for col in df_valutazioni_mean.columns],
-                data=df_valutazioni_mean.to_dict('records'),
+                id='metrics',
+                columns=[{'name': col, 'id': col} for col in ['Metrica', 'Media']],
+                data=initial['metrics'],
                 style_table={'margin': 'auto', 'width': '300px'},
                 style_cell={'textAlign': 'center'}
             )
         ], style={'marginLeft': '50px'})
     ], style={'display': 'flex', 'justifyContent': 'center', 'alignItems': 'center'}),
 
-    dcc.Graph(id='type_bar',
-              figure=px.bar(df_tipo, x='Tipo', y='Conteggio',
-                            title='Numero di Problemi per Tipo', labels={'Tipo': 'Tipo', 'Conteggio': 'Numero di Problemi'})),
+    dcc.Graph(id='type_bar', figure=initial['type_bar']),
 
-    dcc.Graph(id='file_bar',
-              figure=px.bar(df_file, x='File', y='Numero di Problemi',
-                            title='File con più Problemi', labels={'File': 'File', 'Numero di Problemi': 'Conteggio'})),
+    dcc.Graph(id='file_bar', figure=initial['file_bar']),
 
     html.H2("Tabella Dettagliata dei Problemi"),
+    # Paginazione, ordinamento e filtri sono fatti dal server: il browser riceve una pagina alla volta
     dash_table.DataTable(
         id='table',
-        columns=[{'name': col, 'id': col} for col in df.columns],
-        data=df.to_dict('records'),
-        page_size=10,
+        columns=[{'name': col, 'id': col} for col in TABLE_COLUMNS],
+        page_current=0,
+        page_size=PAGE_SIZE,
+        page_action='custom',
+        sort_action='custom',
+        sort_mode='multi',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
         style_table={'overflowX': 'auto'}
-    )
+    ),
+
+    html.H2("Issue in comune tra i modelli"),
+    html.Div([
+        html.Span("Segnalate da almeno ", style={'marginRight': '5px'}),
+        dcc.Dropdown(id='min_models', options=[{'label': str(n), 'value': n} for n in range(1, 6)], value=2,
+                     clearable=False, style={'width': '80px'}),
+        html.Span(" modelli", style={'marginLeft': '5px'}),
+        html.Span(id='consensus_total', style={'marginLeft': '20px', 'color': 'red'})
+    ], style={'display': 'flex', 'alignItems': 'center'}),
+    # Gruppi gia' calcolati nel database: la pagina legge solo le righe mostrate
+    dash_table.DataTable(
+        id='consensus',
+        columns=[{'name': col, 'id': col} for col in CONSENSUS_COLUMNS],
+        page_current=0,
+        page_size=PAGE_SIZE,
+        page_action='custom',
+        style_table={'overflowX': 'auto'}
+    ),
+
+    dcc.Store(id='data_version', data=str(initial['version'])),
+    dcc.Interval(id='refresh', interval=REFRESH_SECONDS * 1000)
 ])
 
+
+@app.callback(
+    [Output('data_version', 'data'), Output('total_issues', 'children'), Output('severity_pie', 'figure'),
+     Output('metrics', 'data'), Output('type_bar', 'figure'), Output('file_bar', 'figure')],
+    [Input('refresh', 'n_intervals')],
+    [State('data_version', 'data')])
+def refresh_charts(_, shown_version):
+    # I grafici vengono aggiornati solo se sono arrivati nuovi risultati
+    current = aggregates()
+    if str(current['version']) == shown_version:
+        raise dash.exceptions.PreventUpdate
+    return (str(current['version']), f"Totale Issues: {current['total_issues']}", current['severity_pie'],
+            current['metrics'], current['type_bar'], current['file_bar'])
+
+
+@app.callback(
+    [Output('table', 'data'), Output('table', 'page_count')],
+    [Input('table', 'page_current'), Input('table', 'page_size'), Input('table', 'sort_by'),
+     Input('table', 'filter_query'), Input('data_version', 'data')])
+def update_table(page_current, page_size, sort_by, filter_query, _):
+    sort = [(s['column_id'], s['direction']) for s in sort_by or []]
+    try:
+        rows, total = report_data.issues_page(page_current * page_size, page_size, parse_filter(filter_query),
+                                              sort, folder_path)
+    except ValueError:
+        rows, total = [], 0
+    return rows, max(1, -(-total // page_size))
+
+
+@app.callback(
+    [Output('consensus', 'data'), Output('consensus', 'page_count'), Output('consensus_total', 'children')],
+    [Input('consensus', 'page_current'), Input('consensus', 'page_size'), Input('min_models', 'value'),
+     Input('data_version', 'data')])
+def update_consensus(page_current, page_size, min_models, _):
+    rows, total = report_data.consensus_page(page_current * page_size, page_size, min_models, folder_path)
+    if not total:
+        return [], 1, (f"Nessuna issue segnalata da almeno {min_models} modelli "
+                       "(se i gruppi non sono ancora calcolati esegui Report/issue_clusters.py)")
+    return rows, max(1, -(-total // page_size)), f"Issue distinte: {total}"
+
+
 # Avvio del server Dash
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+
+import chunker
+import review_engine
+
+# Secondi tra un controllo e l'altro dello stato dei batch
+POLL_INTERVAL = 60
+
+# Numero massimo di richieste per batch (sotto i limiti di OpenAI e Anthropic)
+BATCH_MAX_REQUESTS = 10000
+
+
+class OpenAIBatch:
+    """Batch API di OpenAI: file JSONL caricato con purpose="batch" e job su /v1/chat/completions."""
+
+    def __init__(self, client, model_name, response_format=None):
+        self.client = client
+        self.model_name = model_name
+        self.response_format = response_format
+
+    def submit(self, requests):
+        body = {"model": self.model_name}
+        if self.response_format:
+            body["response_format"] = self.response_format
+        lines = [json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": dict(body, messages=[{"role": "user", "content": prompt}])
+        }, ensure_ascii=False) for custom_id, prompt in requests]
+
+        batch_file = self.client.files.create(file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+                                              purpose="batch")
+        batch = self.client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions",
+                                           completion_window="24h")
+        return batch.id
+
+    def is_done(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        print(f"Batch {batch_id}: {batch.status}")
+        return batch.status in ("completed", "failed", "expired", "cancelled")
+
+    def results(self, batch_id):
+        """Restituisce (custom_id, testo della risposta o None) per ogni richiesta completata."""
+
+        batch = self.client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            return
+
+        content = self.client.files.content(batch.output_file_id).text
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            if response.get("status_code") == 200:
+                yield entry["custom_id"], response["body"]["choices"][0]["message"]["content"]
+            else:
+                yield entry["custom_id"], None
+
+
+class AnthropicBatch:
+    """
+    Message Batches API di Anthropic; tools e tool_choice vincolano la
+    risposta allo schema della revisione.
+    """
+
+    def __init__(self, client, model_name, max_tokens=1024, tools=None, tool_choice=None):
+        self.client = client
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.options = {"tools": tools, "tool_choice": tool_choice} if tools else {}
+
+    def submit(self, requests):
+        batch = self.client.messages.batches.create(requests=[{
+            "custom_id": custom_id,
+            "params": dict(self.options, model=self.model_name, max_tokens=self.max_tokens,
+                           messages=[{"role": "user", "content": prompt}])
+        } for custom_id, prompt in requests])
+        return batch.id
+
+    def is_done(self, batch_id):
+        batch = self.client.messages.batches.retrieve(batch_id)
+        print(f"Batch {batch_id}: {batch.processing_status}")
+        return batch.processing_status == "ended"
+
+    def results(self, batch_id):
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded" and entry.result.message.content:
+                block = entry.result.message.content[0]
+                if block.type == "tool_use":
+                    yield entry.custom_id, json.dumps(block.input, ensure_ascii=False)
+                else:
+                    yield entry.custom_id, block.text
+            else:
+                yield entry.custom_id, None
+
+
+def _save_state(state_path, state):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+
+def _read_chunks(file_path, max_chunk_tokens):
+    with open(file_path, "r") as f:
+        code = f.read()
+    if max_chunk_tokens is None:
+        return [(1, code)]
+    return chunker.split_code(code, file_path, max_chunk_tokens)
+
+
+def _submit_all(backend, prompt_template, folder_path, journal, cache, extensions, max_files, max_chunk_tokens):
+    """Legge i file da revisionare e li invia in uno o piu' batch. I risultati in cache vanno subito nel journal."""
+
+    file_paths = review_engine.walk_code_files(folder_path, extensions, max_files)
+
+    pending = []
+    for index, file_path in enumerate(file_paths):
+        if file_path in journal.done:
+            continue
+        try:
+            chunks = _read_chunks(file_path, max_chunk_tokens)
+        except Exception as e:
+            print(f"analyze_code Error: {e}")
+            continue
+
+        cached = [cache.get(code) for _, code in chunks] if cache is not None else [None]
+        if all(c is not None for c in cached):
+            results = [(valutazioni, issues) for _, valutazioni, issues in cached]
+            valutazioni, issues = chunker.merge_results(chunks, results) if len(chunks) > 1 else results[0]
+            review_engine.append_full_path(valutazioni, issues, file_path)
+            journal.append(index, file_path, valutazioni, issues)
+        else:
+            pending.append((index, file_path, [prompt_template.format(code=code) for _, code in chunks]))
+
+    print(f"{len(file_paths)} file, {len(pending)} da inviare in batch")
+
+    # Le parti di uno stesso file restano nello stesso batch
+    groups = [[]]
+    for item in pending:
+        if groups[-1] and sum(len(p) for _, _, p in groups[-1]) + len(item[2]) > BATCH_MAX_REQUESTS:
+            groups.append([])
+        groups[-1].append(item)
+
+    batches = []
+    for group in groups:
+        if not group:
+            continue
+        requests = [(f"{index}-{n}", prompt) for index, _, prompts in group for n, prompt in enumerate(prompts)]
+        batch_id = backend.submit(requests)
+        print(f"Batch {batch_id} inviato con {len(requests)} richieste")
+        batches.append({"id": batch_id, "files": {str(index): file_path for index, file_path, _ in group},
+                        "chunks": {str(index): len(prompts) for index, _, prompts in group},
+                        "ingested": False})
+    return {"max_chunk_tokens": max_chunk_tokens, "batches": batches}
+
+
+def _ingest(backend, batch, parse_response, journal, cache, max_chunk_tokens):
+    """Acquisisce le risposte di un batch completato e registra i file nel journal."""
+
+    responses = {}
+    for custom_id, response_text in backend.results(batch["id"]):
+        index, n = custom_id.split("-")
+        responses.setdefault(index, {})[int(n)] = response_text
+
+    ricevute = 0
+    for index, file_path in batch["files"].items():
+        if file_path in journal.done:
+            continue
+        texts = [responses.get(index, {}).get(n) for n in range(batch["chunks"][index])]
+        if any(text is None for text in texts):
+            print(f"analyze_code Error: richiesta fallita nel batch per {os.path.basename(file_path)}")
+            continue
+
+        results = [parse_response(text) for text in texts]
+        # Le risposte non interpretabili non entrano nel journal: il file si ritenta con --resume
+        if not all(valutazioni or issues for valutazioni, issues in results):
+            print(f"analyze_code Error: risposta non interpretabile nel batch per {os.path.basename(file_path)}")
+            continue
+
+        chunks = _read_chunks(file_path, max_chunk_tokens)
+        if cache is not None and len(chunks) == len(texts):
+            for (_, code), text, (valutazioni, issues) in zip(chunks, texts, results):
+                cache.put(code, text, valutazioni, issues)
+
+        valutazioni, issues = chunker.merge_results(chunks, results) if len(results) > 1 else results[0]
+        review_engine.append_full_path(valutazioni, issues, file_path)
+        journal.append(int(index), file_path, valutazioni, issues)
+        ricevute += 1
+
+    print(f"Batch {batch['id']}: {ricevute} file acquisiti su {len(batch['files'])}")
+
+
+def run_batch(backend, prompt_template, parse_response, folder_path, journal, state_path,
+              cache=None, extensions=review_engine.CODE_EXTENSIONS, max_files=None,
+              max_chunk_tokens=None, poll_interval=POLL_INTERVAL):
+    """
+    Revisiona una cartella tramite le API batch del provider.
+
+    I prompt vengono raccolti e inviati come job batch (costo ridotto, nessun
+    limite di richieste al minuto), poi lo stato viene controllato ogni
+    poll_interval secondi. Le risposte passano dalla stessa parse_response
+    della modalita' sincrona e finiscono nel journal; i file divisi con
+    max_chunk_tokens vengono riuniti come nel motore di revisione. Gli id dei
+    batch sono salvati in state_path: se lo script viene interrotto, il run
+    successivo riprende ad attendere gli stessi batch invece di inviarli di nuovo.
+    """
+
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        print(f"Ripresa dei batch gia' inviati: {', '.join(b['id'] for b in state['batches'])}")
+    else:
+        state = _submit_all(backend, prompt_template, folder_path, journal, cache, extensions, max_files,
+                            max_chunk_tokens)
+        _save_state(state_path, state)
+
+    for batch in state["batches"]:
+        if batch["ingested"]:
+            continue
+
+        while not backend.is_done(batch["id"]):
+            time.sleep(poll_interval)
+
+        _ingest(backend, batch, parse_response, journal, cache, state["max_chunk_tokens"])
+        batch["ingested"] = True
+        _save_state(state_path, state)
+
+    # Tutti i batch sono stati acquisiti: i file mancanti si recuperano con --resume
+    os.remove(state_path)
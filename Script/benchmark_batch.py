@@ -0,0 +1,53 @@
+import os
+import time
+import argparse
+import tempfile
+import openai
+import anthropic
+
+import batch_mode
+import review_schema
+import run_journal
+import fake_provider_server
+from benchmark_engine import create_sample_folder
+
+# Verifica end-to-end della modalita' batch di OpenAI e Anthropic contro il server finto.
+# Esempio: python Script/benchmark_batch.py --files 40
+
+
+def run(backend, folder_path, name):
+    out_path = os.path.join(folder_path, "out")
+    journal = run_journal.RunJournal(os.path.join(out_path, f"Journal_{name}.jsonl"))
+
+    start = time.perf_counter()
+    batch_mode.run_batch(backend, "{code}", review_schema.parse_review, folder_path, journal,
+                         os.path.join(out_path, f"Batch_{name}.json"), poll_interval=0.2)
+    journal.export_csv(os.path.join(out_path, f"Valutazioni_{name}.csv"),
+                       os.path.join(out_path, f"Issues_{name}.csv"))
+    journal.close()
+    elapsed = time.perf_counter() - start
+
+    with open(os.path.join(out_path, f"Issues_{name}.csv"), encoding="utf-8") as f:
+        righe = sum(1 for _ in f) - 1
+    return elapsed, len(journal.done), righe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test end-to-end delle API batch con il server finto")
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=1.0, help="secondi prima che un batch risulti completato")
+    args = parser.parse_args()
+
+    server, base_url = fake_provider_server.start_server(latency=args.latency)
+    openai_client = openai.OpenAI(api_key="fake", base_url=base_url)
+    anthropic_client = anthropic.Anthropic(api_key="fake", base_url=base_url[:-len("/v1")])
+
+    with tempfile.TemporaryDirectory() as folder_path:
+        create_sample_folder(folder_path, args.files)
+
+        for name, backend in (("openai", batch_mode.OpenAIBatch(openai_client, "fake-model")),
+                              ("anthropic", batch_mode.AnthropicBatch(anthropic_client, "fake-model"))):
+            elapsed, file_ok, righe = run(backend, folder_path, name)
+            print(f"{name}: {file_ok}/{args.files} file acquisiti, {righe} issue nel CSV, {elapsed:.2f}s")
+
+    server.shutdown()
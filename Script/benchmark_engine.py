@@ -0,0 +1,73 @@
+import os
+import time
+import argparse
+import tempfile
+import openai
+
+import review_engine
+import review_schema
+import fake_provider_server
+from providers.mock_provider import MockProvider
+
+# Confronta l'elaborazione seriale con quella concorrente usando il server finto, oppure
+# con --mock il provider finto in processo (senza HTTP).
+# Esempio: python Script/benchmark_engine.py --files 40 --latency 0.5 --in-flight 8
+
+
+def create_sample_folder(folder_path, num_files):
+    """Crea num_files file Python sintetici di lunghezza variabile."""
+    for i in range(num_files):
+        sub = os.path.join(folder_path, f"pkg{i % 4}")
+        os.makedirs(sub, exist_ok=True)
+        with open(os.path.join(sub, f"modulo_{i}.py"), "w") as f:
+            for j in range(5 + i % 17):
+                f.write(f"def funzione_{j}(x):\n    return x + {j}\n")
+
+
+def run(folder_path, base_url, max_in_flight):
+    client = openai.AsyncOpenAI(api_key="fake", base_url=base_url, max_retries=0)
+
+    async def request_review(code):
+        response = await client.chat.completions.create(
+            model="fake-model", messages=[{"role": "user", "content": code}])
+        return response.choices[0].message.content
+
+    start = time.perf_counter()
+    # Cartelle di prova temporanee: l'indice dei file non viene salvato
+    result = review_engine.process_folder(folder_path, request_review, review_schema.parse_review,
+                                          max_in_flight=max_in_flight, index_dir=None)
+    return time.perf_counter() - start, result
+
+
+def run_mock(folder_path, latency, max_in_flight):
+    provider = MockProvider(latency=latency)
+    start = time.perf_counter()
+    result = review_engine.process_folder(folder_path, provider.request_review_async, provider.parse_response,
+                                          max_in_flight=max_in_flight, index_dir=None)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del motore di revisione concorrente")
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--in-flight", type=int, default=review_engine.MAX_IN_FLIGHT)
+    parser.add_argument("--mock", action="store_true", help="provider finto in processo invece del server HTTP")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder_path:
+        create_sample_folder(folder_path, args.files)
+
+        if args.mock:
+            seriale, risultato_seriale = run_mock(folder_path, args.latency, 1)
+            concorrente, risultato_concorrente = run_mock(folder_path, args.latency, args.in_flight)
+        else:
+            server, base_url = fake_provider_server.start_server(latency=args.latency)
+            seriale, risultato_seriale = run(folder_path, base_url, 1)
+            concorrente, risultato_concorrente = run(folder_path, base_url, args.in_flight)
+            server.shutdown()
+
+    print(f"Seriale:     {seriale:.2f}s")
+    print(f"Concorrente: {concorrente:.2f}s ({args.in_flight} in volo)")
+    print(f"Speedup:     {seriale / concorrente:.1f}x")
+    print(f"Risultati identici: {risultato_seriale == risultato_concorrente}")
@@ -0,0 +1,51 @@
+import time
+import argparse
+
+import local_backend
+
+# Confronta la generazione un prompt alla volta con quella a batch sul modello locale.
+# Funziona su CPU con un modello piccolo gia' scaricato in una cartella, senza rete.
+# Esempio: python Script/benchmark_local.py --model ./modelli/tiny-starcoder --prompts 16 --batch-size 4
+
+PROMPT = "Revisiona il seguente codice e restituisci un JSON con Metriche e Issue:\n{code}\n"
+
+
+def sample_prompts(num_prompts):
+    """Prompt sintetici di lunghezza variabile, come file di dimensioni diverse."""
+    prompts = []
+    for i in range(num_prompts):
+        code = "".join(f"def funzione_{j}(x):\n    return x + {j}\n" for j in range(2 + i % 9))
+        prompts.append(PROMPT.format(code=code))
+    return prompts
+
+
+def run(generator, prompts):
+    generator.generated_tokens = 0
+    generator.generate_seconds = 0.0
+    start = time.perf_counter()
+    generator.generate(prompts)
+    elapsed = time.perf_counter() - start
+    return elapsed, generator.generated_tokens
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark della generazione locale a batch")
+    parser.add_argument("--model", required=True, help="cartella del modello (es. tiny_starcoder)")
+    parser.add_argument("--prompts", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=local_backend.BATCH_SIZE)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--quantization", choices=["int8", "int4"], default=None)
+    args = parser.parse_args()
+
+    tokenizer = local_backend.load_tokenizer(args.model, local_files_only=True)
+    model = local_backend.load_model(args.model, device=args.device, quantization=args.quantization,
+                                     local_files_only=True)
+    prompts = sample_prompts(args.prompts)
+
+    for batch_size in (1, args.batch_size):
+        generator = local_backend.LocalGenerator(tokenizer, model, device=args.device, batch_size=batch_size,
+                                                 max_new_tokens=args.max_new_tokens)
+        elapsed, tokens = run(generator, prompts)
+        print(f"batch {batch_size:>3}: {len(prompts)} prompt in {elapsed:.2f}s, "
+              f"{tokens} token generati ({tokens / elapsed:.1f} token/s)")
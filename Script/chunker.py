@@ -0,0 +1,156 @@
+import ast
+
+from rate_limiter import estimate_tokens
+
+# Token massimi di codice per richiesta: i file piu' grandi vengono divisi
+MAX_CHUNK_TOKENS = 6000
+
+# Posizione delle metriche nelle righe prodotte da parse_*_response
+METRIC_COLUMNS = range(1, 6)
+
+
+def _python_segments(lines, node, first_line, last_line, max_tokens):
+    """
+    Divide le righe [first_line, last_line] ai confini delle definizioni figlie di node.
+    Le definizioni ancora troppo grandi (es. classi) vengono divise ai confini dei loro metodi.
+    """
+
+    body = [child for child in getattr(node, "body", []) if child.lineno >= first_line]
+    starts = [min([child.lineno] + [d.lineno for d in getattr(child, "decorator_list", [])]) for child in body]
+
+    bounds = sorted(set([first_line] + [s for s in starts if s > first_line]))
+    segments = []
+    for i, start in enumerate(bounds):
+        end = bounds[i + 1] - 1 if i + 1 < len(bounds) else last_line
+        text = "".join(lines[start - 1:end])
+        child = next((c for c, s in zip(body, starts) if s == start), None)
+
+        if estimate_tokens(text) > max_tokens and isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            inner_start = child.body[0].lineno if child.body else end
+            if inner_start > start:
+                segments.append((start, inner_start - 1))
+                segments.extend(_python_segments(lines, child, inner_start, end, max_tokens))
+                continue
+        segments.append((start, end))
+    return segments
+
+
+def _is_boundary(line):
+    """Riga dopo la quale e' ragionevole tagliare un file non Python."""
+    stripped = line.strip()
+    return stripped == "" or (stripped in ("}", "};") and not line[:1].isspace())
+
+
+def _split_lines(lines, first_line, last_line, max_tokens):
+    """Divisione a righe, preferendo righe vuote o graffe di chiusura a inizio riga."""
+
+    segments = []
+    start = first_line
+    tokens = 0
+    boundary = None
+    for n in range(first_line, last_line + 1):
+        line_tokens = estimate_tokens(lines[n - 1])
+        if tokens + line_tokens > max_tokens and n > start:
+            cut = boundary if boundary is not None and boundary - start >= (n - start) // 2 else n - 1
+            segments.append((start, cut))
+            start = cut + 1
+            tokens = sum(estimate_tokens(lines[i - 1]) for i in range(start, n))
+            boundary = None
+        tokens += line_tokens
+        if _is_boundary(lines[n - 1]):
+            boundary = n
+    if start <= last_line:
+        segments.append((start, last_line))
+    return segments
+
+
+def split_code(code, file_path, max_tokens=MAX_CHUNK_TOKENS):
+    """
+    Divide un file troppo grande in parti da revisionare separatamente.
+
+    Per i file Python i tagli cadono ai confini di funzioni e classi (ast);
+    per gli altri linguaggi, o se il parsing fallisce, si divide a righe.
+    Restituisce una lista di (riga iniziale, codice) con righe numerate da 1.
+    """
+
+    if estimate_tokens(code) <= max_tokens:
+        return [(1, code)]
+
+    lines = code.splitlines(keepends=True)
+    segments = None
+    if file_path.endswith(".py"):
+        try:
+            segments = _python_segments(lines, ast.parse(code), 1, len(lines), max_tokens)
+        except (SyntaxError, ValueError):
+            segments = None
+    if segments is None:
+        segments = [(1, len(lines))]
+
+    # Le parti ancora troppo grandi vengono divise a righe
+    pieces = []
+    for start, end in segments:
+        if estimate_tokens("".join(lines[start - 1:end])) > max_tokens:
+            pieces.extend(_split_lines(lines, start, end, max_tokens))
+        else:
+            pieces.append((start, end))
+
+    # Le parti consecutive vengono riunite finche' restano nel limite
+    chunks = []
+    for start, end in pieces:
+        if chunks and estimate_tokens("".join(lines[chunks[-1][0] - 1:end])) <= max_tokens:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+
+    return [(start, "".join(lines[start - 1:end])) for start, end in chunks]
+
+
+def _line_offset(value, offset):
+    try:
+        return int(value) + offset
+    except (TypeError, ValueError):
+        return value
+
+
+def weighted_metrics(parts):
+    """
+    Media delle metriche di piu' parti, pesata sul numero di righe e arrotondata
+    all'intero come i punteggi restituiti dai modelli. parts e' una lista di
+    (valutazioni, righe); restituisce [] se nessuna parte ha metriche.
+    """
+
+    weighted = [[] for _ in METRIC_COLUMNS]
+    filename = None
+    for valutazioni, weight in parts:
+        for val in valutazioni:
+            filename = filename or val[0]
+            for i, column in enumerate(METRIC_COLUMNS):
+                if isinstance(val[column], (int, float)) and not isinstance(val[column], bool):
+                    weighted[i].append((val[column], weight))
+
+    if filename is None:
+        return []
+
+    merged = [filename]
+    for values in weighted:
+        total = sum(w for _, w in values)
+        merged.append(round(sum(v * w for v, w in values) / total) if total else "Unknown")
+    return [merged]
+
+
+def merge_results(chunks, results):
+    """
+    Unisce le risposte delle parti di un file in un unico risultato.
+
+    Le righe delle issue vengono riportate alla numerazione del file originale;
+    le metriche diventano la media delle parti pesata sul numero di righe.
+    """
+
+    issues = []
+    for (start_line, code), (_, chunk_issues) in zip(chunks, results):
+        for issue in chunk_issues:
+            issue[1] = _line_offset(issue[1], start_line - 1)
+            issues.append(issue)
+
+    parts = [(valutazioni, code.count("\n") + 1) for (_, code), (valutazioni, _) in zip(chunks, results)]
+    return weighted_metrics(parts), issues
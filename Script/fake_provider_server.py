@@ -0,0 +1,317 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Server HTTP locale che imita gli endpoint di OpenAI e Anthropic, comprese le API batch.
+# Risponde con una revisione JSON deterministica dopo una latenza configurabile,
+# cosi' il motore di revisione puo' essere misurato senza rete e senza costi.
+
+
+def _fake_entries(filename, lines):
+    metrica = {
+        "Filename": filename,
+        "Manutenibilità": 1 + lines % 5,
+        "Leggibilità": 1 + (lines // 2) % 5,
+        "Performance": 1 + (lines // 3) % 5,
+        "Sicurezza": 1 + (lines // 5) % 5,
+        "Modularità": 1 + (lines // 7) % 5
+    }
+    issue = {
+        "Filename": filename,
+        "Line": lines,
+        "Tipo": "Cattiva Pratica",
+        "Severità": ["Bassa", "Media", "Alta"][lines % 3],
+        "Descrizione": f"Issue sintetica per un prompt di {lines} righe",
+        "Suggestion": "Nessuna, risposta generata dal server finto."
+    }
+    return metrica, issue
+
+
+def fake_review(prompt):
+    """
+    Costruisce una revisione deterministica a partire dal prompt ricevuto.
+    Se il prompt raggruppa piu' file (marcatori '# File: '), restituisce una voce per ognuno.
+    """
+
+    sections = re.split(r"^# File: (.+)$", prompt, flags=re.M)
+    if len(sections) > 1:
+        files = [(sections[i].strip(), sections[i + 1].count("\n")) for i in range(1, len(sections), 2)]
+    else:
+        files = [("main.py", prompt.count("\n") + 1)]
+
+    review = {"Metriche": [], "Issue": []}
+    for filename, lines in files:
+        metrica, issue = _fake_entries(filename, lines)
+        review["Metriche"].append(metrica)
+        review["Issue"].append(issue)
+    return json.dumps(review, ensure_ascii=False)
+
+
+class FakeProviderStats:
+    """Statistiche sulle richieste ricevute dal server finto."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rate_limited = 0
+
+    def enter(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def exit(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def as_dict(self):
+        with self.lock:
+            return {"requests": self.requests, "in_flight": self.in_flight,
+                    "max_in_flight": self.max_in_flight, "rate_limited": self.rate_limited}
+
+
+def chat_completion(request, text, request_id):
+    """Risposta in formato OpenAI chat.completion."""
+    prompt = _prompt_of(request)
+    return {
+        "id": f"chatcmpl-fake-{request_id}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "fake-model"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": text}}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4,
+                  "total_tokens": (len(prompt) + len(text)) // 4}
+    }
+
+
+def anthropic_message(request, text, request_id):
+    """Risposta in formato Anthropic message."""
+    prompt = _prompt_of(request)
+    return {
+        "id": f"msg_fake_{request_id}",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", "fake-model"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+    }
+
+
+def _blocks_of(message):
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return [block for block in content if block.get("type") == "text"]
+
+
+def _prompt_of(request):
+    return "".join(block["text"] for m in request.get("messages", []) for block in _blocks_of(m))
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    latency = 0.5
+    error_rate = 0.0
+    retry_after = 1
+    stats = None
+
+    # Stato delle API batch: file caricati e job creati
+    files = None
+    batches = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send_bytes(body, "application/json", status, headers)
+
+    def _send_bytes(self, body, content_type, status=200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        parts = path.split("/")
+
+        if path.endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "fake-model", "object": "model",
+                                                          "created": 0, "owned_by": "local"}]})
+        elif path.endswith("/stats"):
+            self._send_json(self.stats.as_dict())
+        elif path.endswith("/content") and parts[-2] in self.files:
+            self._send_bytes(self.files[parts[-2]]["content"], "application/octet-stream")
+        elif path.endswith("/results") and parts[-2] in self.batches:
+            self._send_bytes(self.batches[parts[-2]]["output"], "application/x-jsonl")
+        elif parts[-1] in self.batches:
+            self._send_json(self._batch_payload(parts[-1]))
+        else:
+            self._not_found()
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        if path.endswith("/files"):
+            self._upload_file(body)
+        elif path.endswith("/messages/batches"):
+            self._create_anthropic_batch(json.loads(body))
+        elif path.endswith("/batches"):
+            self._create_openai_batch(json.loads(body or b"{}"))
+        elif path.endswith("/chat/completions") or path.endswith("/messages"):
+            self._review(path, json.loads(body or b"{}"))
+        else:
+            self._not_found()
+
+    def _review(self, path, request):
+        # Simula il superamento dei limiti del provider
+        if random.random() < self.error_rate:
+            with self.stats.lock:
+                self.stats.rate_limited += 1
+            self._send_json({"error": {"type": "rate_limit_error", "message": "rate limit exceeded"}},
+                            status=429, headers={"Retry-After": str(self.retry_after)})
+            return
+
+        self.stats.enter()
+        try:
+            time.sleep(self.latency)
+            text = fake_review(_prompt_of(request))
+        finally:
+            self.stats.exit()
+
+        if path.endswith("/chat/completions"):
+            self._send_json(chat_completion(request, text, self.stats.requests))
+        else:
+            self._send_json(anthropic_message(request, text, self.stats.requests))
+
+    def _upload_file(self, body):
+        """Caricamento multipart di un file (OpenAI /v1/files)."""
+
+        message = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + body)
+        content, filename, purpose = b"", "file", ""
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                content = part.get_payload(decode=True)
+                filename = part.get_filename() or filename
+            elif name == "purpose":
+                purpose = part.get_payload(decode=True).decode()
+
+        file_id = f"file-fake-{len(self.files) + 1}"
+        self.files[file_id] = {"content": content, "filename": filename, "purpose": purpose}
+        self._send_json(self._file_payload(file_id))
+
+    def _file_payload(self, file_id):
+        entry = self.files[file_id]
+        return {"id": file_id, "object": "file", "bytes": len(entry["content"]), "created_at": int(time.time()),
+                "filename": entry["filename"], "purpose": entry["purpose"], "status": "processed"}
+
+    def _create_openai_batch(self, request):
+        lines = [json.loads(line) for line in self.files[request["input_file_id"]]["content"].splitlines()
+                 if line.strip()]
+        output = []
+        for n, line in enumerate(lines):
+            text = fake_review(_prompt_of(line["body"]))
+            output.append({"id": f"batch_req_{n}", "custom_id": line["custom_id"], "error": None,
+                           "response": {"status_code": 200, "request_id": f"req_{n}",
+                                        "body": chat_completion(line["body"], text, n)}})
+
+        output_id = f"file-fake-{len(self.files) + 1}"
+        self.files[output_id] = {"content": "\n".join(json.dumps(o, ensure_ascii=False) for o in output).encode(),
+                                 "filename": "output.jsonl", "purpose": "batch_output"}
+
+        batch_id = f"batch_fake_{len(self.batches) + 1}"
+        self.batches[batch_id] = {"kind": "openai", "created": time.time(), "input_file_id": request["input_file_id"],
+                                  "output_file_id": output_id, "total": len(lines)}
+        self._send_json(self._batch_payload(batch_id))
+
+    def _create_anthropic_batch(self, request):
+        output = []
+        for n, entry in enumerate(request["requests"]):
+            text = fake_review(_prompt_of(entry["params"]))
+            output.append({"custom_id": entry["custom_id"],
+                           "result": {"type": "succeeded", "message": anthropic_message(entry["params"], text, n)}})
+
+        batch_id = f"msgbatch_fake_{len(self.batches) + 1}"
+        self.batches[batch_id] = {"kind": "anthropic", "created": time.time(), "total": len(output),
+                                  "output": "\n".join(json.dumps(o, ensure_ascii=False) for o in output).encode()}
+        self._send_json(self._batch_payload(batch_id))
+
+    def _batch_payload(self, batch_id):
+        """Il batch risulta completato dopo `latency` secondi dalla creazione."""
+
+        batch = self.batches[batch_id]
+        done = time.time() - batch["created"] >= self.latency
+        created = int(batch["created"])
+
+        if batch["kind"] == "openai":
+            return {"id": batch_id, "object": "batch", "endpoint": "/v1/chat/completions", "errors": None,
+                    "input_file_id": batch["input_file_id"], "completion_window": "24h",
+                    "status": "completed" if done else "in_progress",
+                    "output_file_id": batch["output_file_id"] if done else None, "error_file_id": None,
+                    "created_at": created, "request_counts": {"total": batch["total"],
+                                                              "completed": batch["total"] if done else 0,
+                                                              "failed": 0}}
+
+        host = self.headers.get("Host", "127.0.0.1")
+        return {"id": batch_id, "type": "message_batch", "processing_status": "ended" if done else "in_progress",
+                "request_counts": {"processing": 0 if done else batch["total"],
+                                   "succeeded": batch["total"] if done else 0,
+                                   "errored": 0, "canceled": 0, "expired": 0},
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created)),
+                "expires_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created + 86400)),
+                "ended_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created)) if done else None,
+                "archived_at": None, "cancel_initiated_at": None,
+                "results_url": f"http://{host}/v1/messages/batches/{batch_id}/results" if done else None}
+
+
+def start_server(host="127.0.0.1", port=0, latency=0.5, error_rate=0.0):
+    """
+    Avvia il server in un thread e restituisce (server, base_url).
+    base_url va passato ai client OpenAI; per Anthropic si usa lo stesso indirizzo senza "/v1".
+    """
+
+    handler = type("Handler", (FakeProviderHandler,), {"latency": latency, "error_rate": error_rate,
+                                                        "stats": FakeProviderStats(), "files": {}, "batches": {}})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server finto per OpenAI/Anthropic")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="secondi di attesa per risposta")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="frazione di richieste respinte con 429")
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.host, args.port, args.latency, args.error_rate)
+    print(f"Server finto in ascolto su {base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,291 @@
+import os
+import re
+import json
+import time
+import fnmatch
+import hashlib
+
+import response_cache
+
+# Linguaggio associato a ogni estensione di codice
+LANGUAGES = {".py": "python", ".js": "javascript", ".java": "java", ".cpp": "cpp", ".cs": "csharp",
+             ".ts": "typescript", ".c": "c"}
+
+# Percorsi sempre esclusi (glob sul percorso relativo alla cartella o sul nome)
+EXCLUDE_GLOBS = [".git"]
+
+# Cartella degli indici salvati, separata dalla cache delle risposte (che ha un limite di dimensione)
+INDEX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".review_index"))
+
+
+def language_of(path):
+    return LANGUAGES.get(os.path.splitext(path)[1], "other")
+
+
+def _glob_regex(pattern):
+    """Converte un glob in stile .gitignore (con ** per piu' cartelle) in una regex."""
+
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile(regex + r"\Z")
+
+
+class GitIgnore:
+    """
+    Regole dei file .gitignore incontrati durante la visita.
+
+    Supporta i casi usati in pratica: glob con * ? e **, negazione con !,
+    regole solo per cartelle (/ finale) e regole ancorate alla cartella del
+    .gitignore (/ iniziale o interna). Vale l'ultima regola che corrisponde.
+    """
+
+    def __init__(self):
+        self.rules = []
+
+    def add_file(self, directory):
+        path = os.path.join(directory, ".gitignore")
+        if not os.path.isfile(path):
+            return
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.rstrip("\n").rstrip()
+                if not line or line.startswith("#"):
+                    continue
+                negate = line.startswith("!")
+                line = line[1:] if negate else line
+                dir_only = line.endswith("/")
+                line = line.rstrip("/")
+                anchored = "/" in line
+                self.rules.append((directory, _glob_regex(line.lstrip("/")), negate, dir_only, anchored))
+
+    def ignored(self, path, is_dir):
+        result = False
+        for directory, regex, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            rel = os.path.relpath(path, directory)
+            if rel.startswith(".."):
+                continue
+            rel = rel.replace(os.sep, "/")
+            if regex.match(rel if anchored else rel.rsplit("/", 1)[-1]):
+                result = not negate
+        return result
+
+
+def _excluded(rel, patterns):
+    name = rel.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def walk_files(folder_path, extensions, exclude=None):
+    """
+    Percorsi dei file con le estensioni indicate, nell'ordine di os.walk,
+    saltando i file e le cartelle esclusi da .gitignore o dai glob di exclude.
+    """
+
+    patterns = EXCLUDE_GLOBS + list(exclude or [])
+    gitignore = GitIgnore()
+    for root, dirs, files in os.walk(folder_path):
+        gitignore.add_file(root)
+        rel_root = os.path.relpath(root, folder_path).replace(os.sep, "/")
+        rel_root = "" if rel_root == "." else rel_root + "/"
+
+        # Le cartelle escluse non vengono visitate
+        dirs[:] = [d for d in dirs if not _excluded(rel_root + d, patterns)
+                   and not gitignore.ignored(os.path.join(root, d), True)]
+        for file_name in files:
+            if os.path.splitext(file_name)[1] not in extensions or _excluded(rel_root + file_name, patterns):
+                continue
+            path = os.path.join(root, file_name)
+            if not gitignore.ignored(path, False):
+                yield path
+
+
+def index_path_for(folder_path, extensions, exclude=None, index_dir=INDEX_DIR):
+    """Percorso dell'indice salvato della cartella, oppure None con index_dir=None."""
+
+    if index_dir is None:
+        return None
+    key = json.dumps([os.path.abspath(folder_path), sorted(extensions), sorted(exclude or [])])
+    return os.path.join(index_dir, hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".json")
+
+
+def read_code(path):
+    """Testo di un file di codice, letto come lo legge review_engine (e come ne calcola l'hash)."""
+    with open(path, "r") as f:
+        return f.read()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class FileIndex:
+    """
+    Indice persistente dei file di codice di una cartella: per ogni cartella
+    l'elenco (gia' filtrato) di sottocartelle e file, per ogni file dimensione,
+    mtime, linguaggio e hash del contenuto.
+
+    scan() rilegge l'elenco di una cartella solo se il suo mtime (o quello di un
+    .gitignore suo o delle cartelle sopra) e' cambiato; altrimenti riusa quello
+    salvato, senza listdir ne' regole da valutare. Dei file basta uno stat: le
+    voci con dimensione/mtime invariati, compreso l'hash, vengono riprese
+    dall'indice. L'hash non viene calcolato qui ma da review_engine quando legge
+    il file (set_hash), cosi' nessun file viene letto due volte; nei run
+    successivi la cache delle risposte si consulta con l'hash, senza leggere
+    i file invariati. Con index_dir=None l'indice resta in memoria.
+    """
+
+    # Versione del formato salvato: gli indici di formato diverso vengono ignorati
+    VERSION = 2
+
+    def __init__(self, folder_path, extensions, exclude=None, index_path=None, index_dir=INDEX_DIR):
+        self.folder_path = folder_path
+        self.extensions = set(extensions)
+        self.exclude = list(exclude or [])
+        self.index_path = index_path or index_path_for(folder_path, self.extensions, self.exclude, index_dir)
+        self.dirs = {}
+        self.files = {}
+        self.reused = 0
+        self.updated = 0
+        self.dirs_reused = 0
+        self.dirs_listed = 0
+        self.seconds = 0.0
+
+        if self.index_path is None:
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.dirs = data["dirs"]
+                self.files = {entry["path"]: entry for entry in data["files"]}
+        except (OSError, ValueError, KeyError):
+            self.dirs, self.files = {}, {}
+
+    def _list(self, root, rel_root, patterns, gitignore):
+        """Sottocartelle e file di codice di root, filtrati come in walk_files, nell'ordine di os.walk."""
+
+        subdirs, files = [], []
+        with os.scandir(root) as entries:
+            for entry in entries:
+                rel = rel_root + entry.name
+                if entry.is_dir():
+                    # Come os.walk: i link a cartelle non vengono visitati
+                    if not entry.is_symlink() and not _excluded(rel, patterns) \
+                            and not gitignore.ignored(entry.path, True):
+                        subdirs.append(entry.name)
+                elif os.path.splitext(entry.name)[1] in self.extensions and not _excluded(rel, patterns) \
+                        and not gitignore.ignored(entry.path, False):
+                    files.append(entry.name)
+        return subdirs, files
+
+    def _walk(self, dirs):
+        """Percorsi dei file come walk_files, riusando gli elenchi delle cartelle invariate; riempie dirs."""
+
+        patterns = EXCLUDE_GLOBS + self.exclude
+        gitignore = GitIgnore()
+        # (cartella, percorso relativo, True se nessun .gitignore sopra e' cambiato)
+        stack = [(self.folder_path, "", True)]
+        while stack:
+            root, rel_root, rules_ok = stack.pop()
+            mtime = _mtime(root)
+            if mtime is None:
+                continue
+            ignore_mtime = _mtime(os.path.join(root, ".gitignore"))
+            if ignore_mtime is not None:
+                gitignore.add_file(root)
+
+            old = self.dirs.get(root)
+            rules_ok = rules_ok and old is not None and old["gitignore"] == ignore_mtime
+            if rules_ok and old["mtime"] == mtime:
+                subdirs, files = old["dirs"], old["files"]
+                self.dirs_reused += 1
+            else:
+                try:
+                    subdirs, files = self._list(root, rel_root, patterns, gitignore)
+                except OSError:
+                    continue
+                self.dirs_listed += 1
+            dirs[root] = {"mtime": mtime, "gitignore": ignore_mtime, "dirs": subdirs, "files": files}
+
+            for name in files:
+                yield os.path.join(root, name)
+            for name in reversed(subdirs):
+                stack.append((os.path.join(root, name), rel_root + name + "/", rules_ok))
+
+    def scan(self, max_files=None):
+        """Restituisce le voci dei file nell'ordine di os.walk."""
+
+        start = time.perf_counter()
+        entries = []
+        dirs = {}
+        truncated = False
+        reused = 0
+        self.dirs_reused = self.dirs_listed = 0
+        for path in self._walk(dirs):
+            if max_files is not None and len(entries) >= max_files:
+                truncated = True
+                break
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            old = self.files.get(path)
+            if old is not None and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime_ns:
+                entries.append(old)
+                reused += 1
+                continue
+            entries.append({"path": path, "size": stat.st_size, "mtime": stat.st_mtime_ns,
+                            "language": language_of(path), "hash": None})
+
+        # Con max_files la visita e' parziale: le voci non visitate restano nell'indice
+        files = {entry["path"]: entry for entry in entries}
+        self.files = {**self.files, **files} if truncated else files
+        self.dirs = {**self.dirs, **dirs} if truncated else dirs
+        self.reused = reused
+        self.updated = len(entries) - reused
+        self.seconds = time.perf_counter() - start
+        return entries
+
+    def set_hash(self, path, code):
+        """Registra l'hash del contenuto appena letto di un file (vedi response_cache.content_hash)."""
+
+        entry = self.files.get(path)
+        if entry is not None:
+            entry["hash"] = response_cache.content_hash(code)
+
+    def save(self):
+        if self.index_path is None:
+            return
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "folder": os.path.abspath(self.folder_path), "dirs": self.dirs,
+                       "files": list(self.files.values())}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def summary(self):
+        return (f"Indice file: {self.reused + self.updated} file ({self.reused} invariati, {self.updated} aggiornati), "
+                f"{self.dirs_reused + self.dirs_listed} cartelle ({self.dirs_reused} riusate) "
+                f"in {self.seconds * 1000:.0f} ms")
@@ -0,0 +1,190 @@
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from Define import SourceCode
+import chunker
+import multi_runner
+import review_engine
+import run_journal
+from providers import pipeline
+
+# Revisione incrementale per la CI: solo i file aggiunti o modificati in un intervallo di
+# revisioni git, con i risultati uniti ai journal del run precedente, cosi' i risultati
+# salvati (archivio Parquet e CSV) restano completi. Usa solo il repository locale, senza rete.
+# Il codice viene letto dal disco: l'ultima revisione dell'intervallo deve essere quella estratta.
+# Esempio: python Script/incremental_review.py --range HEAD~1..HEAD --providers openai --hunks
+
+# Righe di contesto inviate attorno a ogni modifica con --hunks
+CONTEXT_LINES = 20
+
+
+def git(repo, *args):
+    return subprocess.run(["git", "-C", repo, *args], capture_output=True, text=True, check=True).stdout
+
+
+def changed_files(repo, revision_range, extensions=review_engine.CODE_EXTENSIONS):
+    """
+    File di codice cambiati nell'intervallo, come (aggiunti o modificati, eliminati)
+    con percorsi assoluti. I file rinominati risultano eliminati e aggiunti.
+    """
+
+    root = git(repo, "rev-parse", "--show-toplevel").strip()
+    fields = git(repo, "diff", "--name-status", "--no-renames", "-z", revision_range).split("\0")
+
+    changed, deleted = [], []
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if any(path.endswith(ext) for ext in extensions):
+            (deleted if status == "D" else changed).append(os.path.join(root, path))
+    return changed, deleted
+
+
+def parse_hunks(diff_text):
+    """(inizio, righe) nel vecchio e nel nuovo file per ogni hunk di un diff -U0."""
+
+    hunks = []
+    for match in re.finditer(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@", diff_text, flags=re.M):
+        old_start, old_count, new_start, new_count = match.groups()
+        hunks.append((int(old_start), int(old_count or 1), int(new_start), int(new_count or 1)))
+    return hunks
+
+
+def hunk_segments(code, hunks, context=CONTEXT_LINES):
+    """Parti del nuovo file da revisionare: le righe modificate piu' context righe attorno, come (riga iniziale, codice)."""
+
+    lines = code.splitlines(keepends=True)
+    ranges = []
+    for _, _, new_start, new_count in hunks:
+        first = max(1, new_start - context)
+        last = min(len(lines), new_start + max(new_count, 1) - 1 + context)
+        if ranges and first <= ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], last))
+        elif first <= last:
+            ranges.append((first, last))
+    return [(first, "".join(lines[first - 1:last])) for first, last in ranges]
+
+
+def remap_line(line, hunks):
+    """Riga nel nuovo file di una riga del vecchio, oppure None se la riga e' stata modificata."""
+
+    shift = 0
+    for old_start, old_count, _, new_count in hunks:
+        if old_count and old_start <= line < old_start + old_count:
+            return None
+        # Con old_count == 0 l'hunk inserisce righe dopo old_start
+        if (old_start + old_count - 1 if old_count else old_start) < line:
+            shift += new_count - old_count
+    return line + shift
+
+
+def merge_hunk_review(previous, valutazioni, issues, hunks, segments, total_lines, file_path):
+    """
+    Unisce la revisione delle parti modificate a quella precedente del file.
+
+    Le issue precedenti fuori dalle parti revisionate restano, con le righe
+    aggiornate al nuovo file; le metriche sono la media tra il resto del file
+    e le parti revisionate, pesata sul numero di righe.
+    """
+
+    ranges = [(start, start + len(code.splitlines()) - 1) for start, code in segments]
+    merged_issues = []
+    for issue in previous["issues"]:
+        try:
+            line = remap_line(int(issue[1]), hunks)
+        except (TypeError, ValueError):
+            merged_issues.append(issue)
+            continue
+        if line is not None and not any(start <= line <= end for start, end in ranges):
+            issue[1] = line
+            merged_issues.append(issue)
+    merged_issues.extend(issues)
+
+    reviewed_lines = sum(end - start + 1 for start, end in ranges)
+    metrics = chunker.weighted_metrics([(previous["valutazioni"], max(total_lines - reviewed_lines, 0)),
+                                        (valutazioni, reviewed_lines)])
+    review_engine.append_full_path(metrics, [], file_path)
+    return metrics, merged_issues
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Revisione dei soli file cambiati in un intervallo git")
+    parser.add_argument("--range", default="HEAD~1..HEAD", help="intervallo di revisioni per git diff")
+    parser.add_argument("--providers", default=",".join(multi_runner.DEFAULT_PROVIDERS),
+                        help=f"elenco separato da virgole tra: {', '.join(multi_runner.PROVIDERS)}")
+    parser.add_argument("--hunks", action="store_true",
+                        help="revisiona solo le parti modificate dei file gia' presenti nei journal")
+    parser.add_argument("--context", type=int, default=CONTEXT_LINES, help="righe di contesto con --hunks")
+    parser.add_argument("--pack", action="store_true", help="raggruppa i file piccoli in un'unica richiesta")
+    parser.add_argument("--csv", action="store_true", help="scrive anche i CSV Valutazioni_/Issues_")
+    args = parser.parse_args()
+
+    folder_path = SourceCode.PANDA_FULL
+    cartella_destinazione = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Report"))
+    os.makedirs(cartella_destinazione, exist_ok=True)
+
+    folder = run_journal.normalize_path(folder_path)
+    changed, deleted = changed_files(folder_path, args.range)
+    changed = [p for p in changed if run_journal.normalize_path(p).startswith(folder + os.sep) and os.path.exists(p)]
+    deleted = [p for p in deleted if run_journal.normalize_path(p).startswith(folder + os.sep)]
+    print(f"{args.range}: {len(changed)} file aggiunti o modificati, {len(deleted)} eliminati")
+
+    # I journal del run precedente vengono ripresi; le voci dei file cambiati vengono sostituite
+    # solo a revisione finita, con le stesse posizioni nei CSV, e quelle dei file eliminati tolte
+    runs = [multi_runner.load_target(name.strip(), cartella_destinazione, True, args.pack)
+            for name in args.providers.split(",") if name.strip()]
+    journals = {}
+    previous = {}
+    for _, target in runs:
+        journals[target] = target.journal
+        previous[target] = target.journal.find(changed)
+        target.journal = None
+
+    order = {run_journal.normalize_path(p): i for i, p in enumerate(review_engine.walk_code_files(folder_path))}
+
+    segments = {}
+    hunks_of = {}
+    for path in changed if args.hunks else []:
+        key = run_journal.normalize_path(path)
+        if not all(key in previous[target] for _, target in runs):
+            continue
+        hunks = parse_hunks(git(folder_path, "diff", "-U0", "--no-color", args.range, "--", path))
+        if not hunks:
+            continue
+        with open(path, "r") as f:
+            code = f.read()
+        segments[path] = hunk_segments(code, hunks, args.context)
+        hunks_of[path] = (hunks, len(code.splitlines()))
+    if args.hunks:
+        print(f"{len(segments)} file revisionati solo nelle parti modificate")
+
+    review_engine.review_targets(folder_path, [target for _, target in runs], file_paths=changed,
+                                 segments=segments)
+
+    for provider, target in runs:
+        journal = journals[target]
+        entries = []
+        for index, path in enumerate(changed):
+            key = run_journal.normalize_path(path)
+            old = previous[target].get(key)
+            position = old["index"] if old else order.get(key, len(order))
+
+            if index not in target.results:
+                # Revisione fallita: resta il risultato precedente, se c'era
+                if old:
+                    target._log(f"{os.path.basename(path)} non revisionato, mantenuto il risultato precedente")
+                continue
+
+            valutazioni, issues = target.results[index]
+            if path in segments:
+                hunks, total_lines = hunks_of[path]
+                valutazioni, issues = merge_hunk_review(old, valutazioni, issues, hunks, segments[path],
+                                                        total_lines, path)
+            entries.append({"index": position, "path": path, "valutazioni": valutazioni, "issues": issues})
+
+        journal.replace(entries, deleted)
+        pipeline.finish(provider, journal, cartella_destinazione, csv=args.csv, name=target.name)
+
+    print("done!")
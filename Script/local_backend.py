@@ -0,0 +1,150 @@
+import time
+import asyncio
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+# Token generati al massimo per risposta: una revisione JSON sta ampiamente in 1024 token
+MAX_NEW_TOKENS = 1024
+
+# Prompt elaborati insieme in un solo passaggio del modello
+BATCH_SIZE = 4
+
+# Secondi di attesa per raccogliere altre richieste prima di avviare un batch
+BATCH_WAIT = 0.05
+
+
+def default_device():
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def load_tokenizer(model_path, local_files_only=False):
+    tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=local_files_only)
+
+    # Nella generazione a batch il padding va a sinistra, cosi' i token nuovi seguono il prompt
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer
+
+
+def load_model(model_path, device=None, quantization=None, local_files_only=False):
+    """
+    Carica il modello su CPU o GPU.
+
+    quantization puo' essere None, "int8" o "int4". Su CPU "int8" usa la
+    quantizzazione dinamica di PyTorch sui layer Linear, senza librerie
+    aggiuntive; "int4" e "int8" su GPU richiedono bitsandbytes, quindi "int4"
+    non e' disponibile su CPU. I modelli GPTQ (es. TheBloke/StarCoder-GPTQ)
+    vengono caricati con auto_gptq.
+    """
+
+    device = device or default_device()
+    if quantization == "int4" and device == "cpu" and "gptq" not in model_path.lower():
+        raise ValueError("la quantizzazione int4 richiede una GPU (bitsandbytes): su CPU usa --int8")
+
+    if "gptq" in model_path.lower():
+        from auto_gptq import AutoGPTQForCausalLM
+        model = AutoGPTQForCausalLM.from_quantized(model_path, device=device)
+    elif quantization == "int4" or (quantization == "int8" and device != "cpu"):
+        from transformers import BitsAndBytesConfig
+        config = BitsAndBytesConfig(load_in_4bit=quantization == "int4", load_in_8bit=quantization == "int8")
+        model = AutoModelForCausalLM.from_pretrained(model_path, quantization_config=config, device_map=device,
+                                                     local_files_only=local_files_only)
+    else:
+        dtype = torch.float32 if device == "cpu" else torch.float16
+        model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=dtype,
+                                                     local_files_only=local_files_only).to(device)
+        if quantization == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    model.eval()
+    return model
+
+
+class LocalGenerator:
+    """
+    Generazione a batch con un modello locale.
+
+    I prompt vengono ordinati per lunghezza e divisi in batch di batch_size,
+    cosi' in ogni batch il padding e' minimo; di ogni risposta viene
+    decodificata solo la parte generata, al massimo max_new_tokens token.
+    """
+
+    def __init__(self, tokenizer, model, device=None, batch_size=BATCH_SIZE, max_new_tokens=MAX_NEW_TOKENS):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device or default_device()
+        self.batch_size = batch_size
+        self.max_new_tokens = max_new_tokens
+
+        self.batches = 0
+        self.generated_tokens = 0
+        self.generate_seconds = 0.0
+
+    def _generate_batch(self, prompts):
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.device)
+
+        start = time.perf_counter()
+        with torch.inference_mode():
+            output = self.model.generate(**inputs, max_new_tokens=self.max_new_tokens, do_sample=False,
+                                         pad_token_id=self.tokenizer.pad_token_id)
+        self.generate_seconds += time.perf_counter() - start
+
+        # Solo i token successivi al prompt (uguale per tutto il batch grazie al padding a sinistra)
+        new_tokens = output[:, inputs["input_ids"].shape[1]:]
+        self.batches += 1
+        self.generated_tokens += int((new_tokens != self.tokenizer.pad_token_id).sum())
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+    def generate(self, prompts):
+        """Restituisce le risposte nello stesso ordine dei prompt."""
+
+        lengths = [len(ids) for ids in self.tokenizer(prompts)["input_ids"]]
+        order = sorted(range(len(prompts)), key=lambda i: lengths[i])
+
+        results = [None] * len(prompts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, text in zip(batch, self._generate_batch([prompts[i] for i in batch])):
+                results[i] = text
+        return results
+
+    def summary(self):
+        speed = self.generated_tokens / self.generate_seconds if self.generate_seconds else 0
+        return (f"Generazione locale: {self.batches} batch, {self.generated_tokens} token generati "
+                f"in {self.generate_seconds:.1f}s ({speed:.1f} token/s)")
+
+
+class AsyncBatcher:
+    """
+    Raccoglie le richieste concorrenti del motore di revisione e le passa a
+    LocalGenerator a gruppi, in un thread separato per non bloccare l'event loop.
+    """
+
+    def __init__(self, generator, batch_wait=BATCH_WAIT):
+        self.generator = generator
+        self.batch_wait = batch_wait
+        self.pending = []
+        self._worker = None
+
+    async def generate(self, prompt):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((prompt, future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        while self.pending:
+            # Breve attesa per lasciare arrivare le richieste dei file successivi
+            await asyncio.sleep(self.batch_wait)
+            items, self.pending = self.pending, []
+            try:
+                texts = await asyncio.to_thread(self.generator.generate, [prompt for prompt, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), text in zip(items, texts):
+                future.set_result(text)
@@ -0,0 +1,162 @@
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import local_backend
+import local_scheduler
+
+# Server HTTP che tiene il modello locale in memoria tra un run e l'altro.
+# Espone l'endpoint /v1/chat/completions compatibile con OpenAI, lo stesso usato
+# per i provider cloud, cosi' huggingface_startcoder.py resta un client leggero.
+# Le richieste concorrenti vengono generate insieme dallo scheduler a continuous batching
+# (local_scheduler.py) oppure, con --scheduler static, a batch fissi da local_backend.AsyncBatcher.
+# Esempio: python Script/local_model_server.py --model TheBloke/StarCoder-GPTQ --port 8766
+
+DEFAULT_PORT = 8766
+
+
+def _prompt_of(request):
+    parts = []
+    for message in request.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content if block.get("type") == "text")
+    return "".join(parts)
+
+
+class LocalModelHandler(BaseHTTPRequestHandler):
+    model_name = None
+    tokenizer = None
+    batcher = None
+    stats = None
+    loop = None
+    started = None
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": self.model_name, "object": "model",
+                                                          "created": int(self.started), "owned_by": "local"}]})
+        elif path.endswith("/health"):
+            self._send_json({"status": "ok", "model": self.model_name})
+        elif path.endswith("/stats"):
+            self._send_json({"requests": type(self).requests, "uptime": time.time() - self.started,
+                             **self.stats()})
+        else:
+            self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        length = int(self.headers.get("Content-Length", 0))
+        if not path.endswith("/chat/completions"):
+            self._send_json({"error": {"message": "not found"}}, status=404)
+            return
+
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            prompt = _prompt_of(request)
+        except (ValueError, TypeError, AttributeError) as e:
+            # JSON non valido o messaggi nel formato sbagliato
+            self._send_json({"error": {"type": "invalid_request_error", "message": str(e)}}, status=400)
+            return
+        try:
+            # La generazione avviene nell'event loop del server, insieme alle altre richieste in corso
+            text = asyncio.run_coroutine_threadsafe(self.batcher.generate(prompt), self.loop).result()
+        except Exception as e:
+            self._send_json({"error": {"type": "server_error", "message": str(e)}}, status=500)
+            return
+
+        type(self).requests += 1
+        prompt_tokens = len(self.tokenizer(prompt)["input_ids"])
+        completion_tokens = len(self.tokenizer(text)["input_ids"])
+        self._send_json({
+            "id": f"chatcmpl-local-{type(self).requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": self.model_name,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        })
+
+
+def _generator_stats(generator):
+    return {"batches": generator.batches, "generated_tokens": generator.generated_tokens,
+            "generate_seconds": generator.generate_seconds}
+
+
+def start_server(engine, tokenizer, model_name, host="127.0.0.1", port=DEFAULT_PORT):
+    """
+    Avvia il server in un thread e restituisce (server, base_url).
+    engine e' un ContinuousScheduler o un LocalGenerator con il modello gia' caricato.
+    """
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    if isinstance(engine, local_scheduler.ContinuousScheduler):
+        batcher, stats = engine, engine.stats.as_dict
+    else:
+        batcher, stats = local_backend.AsyncBatcher(engine), lambda: _generator_stats(engine)
+
+    handler = type("Handler", (LocalModelHandler,), {
+        "model_name": model_name, "tokenizer": tokenizer, "batcher": batcher, "stats": staticmethod(stats),
+        "loop": loop, "started": time.time()})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server locale per la revisione con modelli Hugging Face")
+    parser.add_argument("--model", required=True, help="nome sull'Hub o cartella del modello")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--device", default=None, help="cpu o cuda (default: cuda se disponibile)")
+    parser.add_argument("--quantization", choices=["int8", "int4"], default=None)
+    parser.add_argument("--batch-size", type=int, default=local_backend.BATCH_SIZE)
+    parser.add_argument("--max-new-tokens", type=int, default=local_backend.MAX_NEW_TOKENS)
+    parser.add_argument("--scheduler", choices=["continuous", "static"], default="continuous")
+    parser.add_argument("--max-active", type=int, default=local_scheduler.MAX_ACTIVE)
+    parser.add_argument("--kv-cache-tokens", type=int, default=local_scheduler.KV_CACHE_TOKENS)
+    args = parser.parse_args()
+
+    device = args.device or local_backend.default_device()
+    start = time.perf_counter()
+    tokenizer = local_backend.load_tokenizer(args.model)
+    model = local_backend.load_model(args.model, device=device, quantization=args.quantization)
+    if args.scheduler == "continuous":
+        engine = local_scheduler.ContinuousScheduler(tokenizer, model, device, args.max_new_tokens,
+                                                     max_active=args.max_active,
+                                                     kv_cache_tokens=args.kv_cache_tokens)
+    else:
+        engine = local_backend.LocalGenerator(tokenizer, model, device=device, batch_size=args.batch_size,
+                                              max_new_tokens=args.max_new_tokens)
+    print(f"Modello {args.model} caricato su {device} in {time.perf_counter() - start:.1f}s")
+
+    server, base_url = start_server(engine, tokenizer, args.model, args.host, args.port)
+    print(f"Server locale in ascolto su {base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(engine.stats.summary() if args.scheduler == "continuous" else engine.summary())
+        server.shutdown()
@@ -0,0 +1,282 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import torch
+import torch.nn.functional as F
+
+# Token di KV cache riservati in totale alle sequenze in generazione: ogni sequenza
+# occupa prompt + max_new_tokens; le richieste oltre il budget restano in coda
+KV_CACHE_TOKENS = 32768
+
+# Sequenze generate al massimo nello stesso passo
+MAX_ACTIVE = 8
+
+
+def _to_legacy(past):
+    return past.to_legacy_cache() if hasattr(past, "to_legacy_cache") else past
+
+
+def _map_cache(cache, fn):
+    """Applica fn a ogni tensore della cache (tuple annidate per layer)."""
+    if isinstance(cache, torch.Tensor):
+        return fn(cache)
+    return tuple(_map_cache(item, fn) for item in cache)
+
+
+def _merge_caches(caches, length):
+    """Unisce le cache di piu' sequenze in un batch, con padding a sinistra fino a length posizioni."""
+
+    def merge(*tensors):
+        if isinstance(tensors[0], torch.Tensor):
+            # La lunghezza della sequenza e' la penultima dimensione, sia per [B, H, S, D] che per [B, S, D]
+            return torch.cat([F.pad(t, (0, 0, length - t.shape[-2], 0)) for t in tensors])
+        return tuple(merge(*items) for items in zip(*tensors))
+
+    return merge(*caches)
+
+
+class Sequence:
+    def __init__(self, prompt_ids, future):
+        self.prompt_ids = prompt_ids
+        self.future = future
+        self.generated = []
+        # Cache del prompt, finche' la sequenza non entra nella cache del batch
+        self.cache = None
+
+    @property
+    def length(self):
+        return len(self.prompt_ids) + len(self.generated)
+
+
+class SchedulerStats:
+    """Throughput e profondita' della coda dello scheduler."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.completed = 0
+        self.generated_tokens = 0
+        self.steps = 0
+        self.active_sum = 0
+        self.busy_seconds = 0.0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.active = 0
+        self.kv_tokens = 0
+
+    def tokens_per_second(self):
+        return self.generated_tokens / self.busy_seconds if self.busy_seconds else 0
+
+    def as_dict(self):
+        with self.lock:
+            return {"completed": self.completed, "generated_tokens": self.generated_tokens,
+                    "tokens_per_second": round(self.tokens_per_second(), 2), "steps": self.steps,
+                    "mean_active": round(self.active_sum / self.steps, 2) if self.steps else 0,
+                    "active": self.active, "queue_depth": self.queue_depth,
+                    "max_queue_depth": self.max_queue_depth, "kv_tokens": self.kv_tokens}
+
+    def summary(self):
+        data = self.as_dict()
+        return (f"Scheduler: {data['completed']} risposte, {data['generated_tokens']} token generati "
+                f"({data['tokens_per_second']} token/s), in media {data['mean_active']} sequenze per passo, "
+                f"coda massima {data['max_queue_depth']}")
+
+
+class ContinuousScheduler:
+    """
+    Continuous batching per la generazione locale.
+
+    Un thread esegue la decodifica un token alla volta per tutte le sequenze
+    attive insieme: quando una sequenza termina (EOS o max_new_tokens) esce
+    dal batch e al passo successivo entrano le richieste in coda, finche' le
+    sequenze attive restano entro MAX_ACTIVE e entro il budget di KV cache.
+    Cosi' una risposta lunga non blocca le altre come in un batch statico.
+    La KV cache del batch resta unica tra un passo e l'altro (una riga per
+    sequenza, padding a sinistra) e viene ricostruita solo quando una
+    sequenza entra o esce. Un errore nel prefill fallisce solo quella richiesta.
+    Decodifica greedy come LocalGenerator; generate() ha la stessa interfaccia
+    asincrona di local_backend.AsyncBatcher.
+    """
+
+    def __init__(self, tokenizer, model, device, max_new_tokens, max_active=MAX_ACTIVE,
+                 kv_cache_tokens=KV_CACHE_TOKENS):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        self.max_new_tokens = max_new_tokens
+        self.max_active = max_active
+        self.kv_cache_tokens = kv_cache_tokens
+        self.stats = SchedulerStats()
+
+        self.queue = deque()
+        self.active = []
+        # Cache del batch: riga i = self.active[i], posizioni = lunghezza massima - 1
+        self.cache = None
+        self._cache_class = None
+        self._wakeup = threading.Condition()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, prompt):
+        """Accoda un prompt e restituisce un Future con il testo generato."""
+
+        future = Future()
+        prompt_ids = self.tokenizer(prompt)["input_ids"]
+        with self._wakeup:
+            self.queue.append(Sequence(prompt_ids, future))
+            self._update_queue_stats()
+            self._wakeup.notify()
+        return future
+
+    async def generate(self, prompt):
+        return await asyncio.wrap_future(self.submit(prompt))
+
+    def _reserved(self, sequence):
+        return len(sequence.prompt_ids) + self.max_new_tokens
+
+    def _update_queue_stats(self):
+        with self.stats.lock:
+            self.stats.queue_depth = len(self.queue)
+            self.stats.max_queue_depth = max(self.stats.max_queue_depth, len(self.queue))
+            self.stats.active = len(self.active)
+            self.stats.kv_tokens = sum(self._reserved(s) for s in self.active)
+
+    def _admit(self):
+        """Sposta in generazione le richieste in coda che rientrano nel budget."""
+
+        admitted = []
+        with self._wakeup:
+            while not self.queue and not self.active:
+                self._wakeup.wait()
+            reserved = sum(self._reserved(s) for s in self.active)
+            while self.queue and len(self.active) + len(admitted) < self.max_active:
+                sequence = self.queue[0]
+                # Una richiesta piu' grande del budget viene comunque eseguita, ma da sola
+                if reserved + self._reserved(sequence) > self.kv_cache_tokens and (self.active or admitted):
+                    break
+                admitted.append(self.queue.popleft())
+                reserved += self._reserved(sequence)
+        return admitted
+
+    def _prefill(self, sequence):
+        input_ids = torch.tensor([sequence.prompt_ids], device=self.device)
+        output = self.model(input_ids=input_ids, use_cache=True)
+        if self._cache_class is None:
+            self._cache_class = type(output.past_key_values)
+        sequence.cache = _to_legacy(output.past_key_values)
+        self._append(sequence, int(output.logits[0, -1].argmax()))
+
+    def _append(self, sequence, token):
+        sequence.generated.append(token)
+        with self.stats.lock:
+            self.stats.generated_tokens += 1
+
+    def _join(self, sequences):
+        """Aggiunge alla cache del batch le cache dei prompt delle nuove sequenze."""
+
+        if not sequences:
+            return
+        caches = ([self.cache] if self.active else []) + [s.cache for s in sequences]
+        self.active.extend(sequences)
+        self.cache = _merge_caches(caches, max(s.length for s in self.active) - 1)
+        for sequence in sequences:
+            sequence.cache = None
+
+    def _keep(self, rows):
+        """Tiene nella cache del batch solo le righe indicate, togliendo il padding in eccesso."""
+
+        self.active = [self.active[i] for i in rows]
+        if not self.active:
+            self.cache = None
+            return
+        length = max(s.length for s in self.active) - 1
+        index = torch.tensor(rows, device=self.device)
+        self.cache = _map_cache(self.cache, lambda t: t.index_select(0, index)[..., t.shape[-2] - length:, :])
+
+    def _decode_step(self):
+        """Genera un token per ogni sequenza attiva in un'unica chiamata al modello."""
+
+        length = max(s.length for s in self.active)
+        past = self.cache
+        if hasattr(self._cache_class, "from_legacy_cache"):
+            past = self._cache_class.from_legacy_cache(past)
+
+        attention_mask = torch.zeros((len(self.active), length), dtype=torch.long, device=self.device)
+        for i, s in enumerate(self.active):
+            attention_mask[i, length - s.length:] = 1
+        input_ids = torch.tensor([[s.generated[-1]] for s in self.active], device=self.device)
+        position_ids = torch.tensor([[s.length - 1] for s in self.active], device=self.device)
+
+        output = self.model(input_ids=input_ids, past_key_values=past, attention_mask=attention_mask,
+                            position_ids=position_ids, use_cache=True)
+        # Il modello aggiunge una posizione a ogni riga: la cache resta allineata a destra
+        self.cache = _to_legacy(output.past_key_values)
+        tokens = output.logits[:, -1].argmax(dim=-1).tolist()
+        for s, token in zip(self.active, tokens):
+            self._append(s, token)
+
+    def _finished(self, sequence):
+        return (sequence.generated[-1] == self.tokenizer.eos_token_id
+                or len(sequence.generated) >= self.max_new_tokens)
+
+    def _complete(self, sequence):
+        tokens = sequence.generated
+        if tokens[-1] == self.tokenizer.eos_token_id:
+            tokens = tokens[:-1]
+        sequence.cache = None
+        sequence.future.set_result(self.tokenizer.decode(tokens, skip_special_tokens=True))
+        with self.stats.lock:
+            self.stats.completed += 1
+
+    def _retire(self):
+        for sequence in self.active:
+            if self._finished(sequence):
+                self._complete(sequence)
+        rows = [i for i, s in enumerate(self.active) if not s.future.done()]
+        if len(rows) < len(self.active):
+            self._keep(rows)
+
+    def _start(self, admitted):
+        """Prefill delle nuove sequenze una per una: un errore (es. prompt oltre il contesto) fallisce solo la sua."""
+
+        started = []
+        for sequence in admitted:
+            try:
+                self._prefill(sequence)
+            except Exception as e:
+                sequence.cache = None
+                sequence.future.set_exception(e)
+                continue
+            if self._finished(sequence):
+                self._complete(sequence)
+            else:
+                started.append(sequence)
+        return started
+
+    def _loop(self):
+        while True:
+            admitted = self._admit()
+            start = time.perf_counter()
+            with torch.inference_mode():
+                started = self._start(admitted)
+                try:
+                    self._join(started)
+                    if self.active:
+                        self._decode_step()
+                        self._retire()
+                except Exception as e:
+                    # Un errore nel passo di decodifica riguarda tutto il batch
+                    for sequence in self.active + started:
+                        if not sequence.future.done():
+                            sequence.future.set_exception(e)
+                    self.active = []
+                    self.cache = None
+
+            with self.stats.lock:
+                self.stats.steps += 1
+                self.stats.active_sum += len(self.active)
+                self.stats.busy_seconds += time.perf_counter() - start
+            with self._wakeup:
+                self._update_queue_stats()
@@ -0,0 +1,60 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from Define import SourceCode
+import providers
+import review_engine
+from providers import pipeline
+
+# Esegue la revisione con piu' modelli in un unico passaggio sulla cartella:
+# ogni file viene letto una volta e inviato in parallelo a tutti i provider scelti.
+# Esempio: python Script/multi_runner.py --providers openai,anthropic --resume
+
+# Provider disponibili (vedi providers.PROVIDERS; "mock" funziona senza rete)
+PROVIDERS = providers.PROVIDERS
+
+# Provider usati se non indicati da riga di comando
+DEFAULT_PROVIDERS = ["openai", "anthropic", "deepseek", "gemini"]
+
+
+def load_target(name, cartella_destinazione, resume, pack=False, stream=False):
+    """Crea il provider e prepara il relativo ReviewTarget, limitato ai MAX_FILES file del provider."""
+
+    provider = providers.create(name, stream=stream)
+    return provider, pipeline.make_target(provider, cartella_destinazione, resume, pack, provider.MAX_FILES)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Revisione multi-modello in un unico passaggio")
+    parser.add_argument("--providers", default=",".join(DEFAULT_PROVIDERS),
+                        help=f"elenco separato da virgole tra: {', '.join(PROVIDERS)}")
+    parser.add_argument("--resume", action="store_true", help="salta i file gia' presenti nei journal")
+    parser.add_argument("--pack", action="store_true", help="raggruppa i file piccoli in un'unica richiesta")
+    parser.add_argument("--csv", action="store_true", help="scrive anche i CSV Valutazioni_/Issues_")
+    parser.add_argument("--exclude", default="", help="glob separati da virgole dei percorsi da non revisionare")
+    parser.add_argument("--stream", action="store_true", help="risposte in streaming con controllo del JSON")
+    args = parser.parse_args()
+
+    folder_path = SourceCode.PANDA_FULL
+
+    cartella_destinazione = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Report"))
+    os.makedirs(cartella_destinazione, exist_ok=True)
+
+    runs = [load_target(name.strip(), cartella_destinazione, args.resume, args.pack, args.stream)
+            for name in args.providers.split(",") if name.strip()]
+    if not all(provider.ready() for provider, _ in runs):
+        sys.exit(1)
+
+    # La cartella viene percorsa fino al limite piu' alto tra i provider scelti
+    limits = [provider.MAX_FILES for provider, _ in runs]
+    max_files = None if None in limits else max(limits)
+    review_engine.review_targets(folder_path, [target for _, target in runs], max_files=max_files,
+                                 exclude=[glob.strip() for glob in args.exclude.split(",") if glob.strip()])
+
+    for provider, target in runs:
+        # Salva i risultati nel database e nell'archivio Parquet (e nei CSV con --csv), con i nomi dei singoli script
+        pipeline.finish(provider, target.journal, cartella_destinazione, csv=args.csv, name=target.name)
+
+    print("done!")
@@ -0,0 +1,126 @@
+import os
+
+from rate_limiter import estimate_tokens
+
+# Token massimi di codice in una richiesta che raggruppa piu' file piccoli
+PACK_MAX_TOKENS = 4000
+
+# Numero massimo di file per richiesta: la risposta deve contenere una voce Metriche per ognuno
+PACK_MAX_FILES = 8
+
+# Solo i file sotto questa soglia vengono raggruppati
+SMALL_FILE_TOKENS = 800
+
+# Istruzioni aggiunte al codice quando la richiesta contiene piu' file
+PACK_HEADER = ("# Il blocco seguente contiene piu' file, ognuno preceduto da una riga '# File: <nome>'.\n"
+               "# Restituisci una voce Metriche per ogni file, usa quel nome come Filename e\n"
+               "# conta le righe dall'inizio di ciascun file, senza contare la riga '# File'.\n")
+
+FILE_MARKER = "# File: {label}\n"
+
+
+def is_small(code, max_tokens=SMALL_FILE_TOKENS):
+    return estimate_tokens(code) <= max_tokens
+
+
+class PackBin:
+    """Raccoglie file piccoli finche' restano nel budget di token e di file di una richiesta."""
+
+    def __init__(self, max_tokens=PACK_MAX_TOKENS, max_files=PACK_MAX_FILES):
+        self.max_tokens = max_tokens
+        self.max_files = max_files
+        self.items = []
+        self.tokens = 0
+
+    def fits(self, code):
+        if not self.items:
+            return True
+        return len(self.items) < self.max_files and self.tokens + estimate_tokens(code) <= self.max_tokens
+
+    def is_full(self):
+        return len(self.items) >= self.max_files
+
+    def add(self, item, code):
+        self.items.append(item)
+        self.tokens += estimate_tokens(code)
+
+    def take(self):
+        items = self.items
+        self.items = []
+        self.tokens = 0
+        return items
+
+
+def labels_for(file_paths):
+    """
+    Nome con cui ogni file compare nel prompt: il nome del file, allungato con
+    le cartelle superiori solo se piu' file del gruppo hanno lo stesso nome.
+    """
+
+    parts = [os.path.normpath(path).split(os.sep) for path in file_paths]
+    depth = [1] * len(parts)
+    while True:
+        labels = ["/".join(p[-d:]) for p, d in zip(parts, depth)]
+        duplicates = {label for label in labels if labels.count(label) > 1}
+        if not duplicates:
+            return labels
+        changed = False
+        for i, label in enumerate(labels):
+            if label in duplicates and depth[i] < len(parts[i]):
+                depth[i] += 1
+                changed = True
+        if not changed:
+            return labels
+
+
+def pack_code(labels, codes):
+    """Unisce i file in un unico blocco di codice, ognuno preceduto dal proprio marcatore."""
+
+    sections = [PACK_HEADER]
+    for label, code in zip(labels, codes):
+        sections.append(FILE_MARKER.format(label=label))
+        sections.append(code if code.endswith("\n") else code + "\n")
+    return "".join(sections)
+
+
+def _normalize(name):
+    name = str(name).strip().replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    return name
+
+
+def _match(name, labels):
+    """Indice dell'etichetta a cui si riferisce il Filename restituito dal modello, o None."""
+
+    name = _normalize(name)
+    if name in labels:
+        return labels.index(name)
+
+    # Il modello a volte accorcia o allunga il percorso: si accetta un suffisso non ambiguo
+    candidates = [i for i, label in enumerate(labels)
+                  if label.endswith("/" + name) or name.endswith("/" + label)]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def split_results(labels, valutazioni, issues):
+    """
+    Divide la risposta di una richiesta a piu' file in un risultato per file.
+
+    Restituisce una lista allineata a labels con (valutazioni, issues) per ogni
+    file, oppure None per i file senza una voce Metriche riconoscibile, che
+    vanno revisionati da soli.
+    """
+
+    labels = [_normalize(label) for label in labels]
+    results = [([], []) for _ in labels]
+    for val in valutazioni:
+        i = _match(val[0], labels)
+        if i is not None:
+            results[i][0].append(val)
+    for issue in issues:
+        i = _match(issue[0], labels)
+        if i is not None:
+            results[i][1].append(issue)
+
+    return [result if result[0] else None for result in results]
@@ -0,0 +1,48 @@
+from rate_limiter import estimate_tokens
+
+# Prefisso fisso dei prompt che il provider mette in cache da solo (nessuna marcatura nella
+# richiesta). Il PROMPT_TEMPLATE attuale ha un prefisso di circa 400 token: ne beneficia solo
+# DeepSeek, che mette in cache blocchi da 64 token; per OpenAI e' sotto il minimo di 1024.
+# Anthropic e Gemini non usano la cache dei prompt.
+
+
+def split_prompt(template, code):
+    """
+    Divide il prompt in prefisso fisso (istruzioni ed esempio JSON, uguale per
+    ogni file) e parte variabile con il codice. Unite danno template.format(code=code).
+    """
+
+    head, tail = template.split("{code}", 1)
+    return head.format(), code + tail.format()
+
+
+class PromptCacheStats:
+    """
+    Token di input letti dalla cache dei prompt del provider durante un run.
+
+    Gli script chiamano add() con i campi usage di ogni risposta; summary()
+    riporta la quota di token serviti dalla cache, oppure che la cache non e'
+    attiva (provider senza cache o prefisso fisso sotto il minimo).
+    """
+
+    def __init__(self, template, min_prefix_tokens=None):
+        self.prefix_tokens = estimate_tokens(split_prompt(template, "")[0])
+        self.min_prefix_tokens = min_prefix_tokens
+        self.requests = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def add(self, input_tokens, cached_tokens=0):
+        self.requests += 1
+        self.input_tokens += input_tokens or 0
+        self.cached_tokens += cached_tokens or 0
+
+    def summary(self):
+        if self.min_prefix_tokens is None:
+            return "Prompt caching: non usato con questo provider"
+        if self.prefix_tokens < self.min_prefix_tokens:
+            return (f"Prompt caching: non attivo, prefisso fisso di circa {self.prefix_tokens} token "
+                    f"sotto il minimo di {self.min_prefix_tokens} del provider")
+        quota = 100 * self.cached_tokens / self.input_tokens if self.input_tokens else 0
+        return (f"Prompt caching: {self.cached_tokens}/{self.input_tokens} token di input dalla cache "
+                f"({quota:.1f}%) su {self.requests} richieste")
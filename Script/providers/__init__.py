@@ -0,0 +1,22 @@
+import importlib
+
+# Provider disponibili: nome -> (modulo del pacchetto, classe). I moduli vengono importati
+# solo quando servono, cosi' il mock e il planner non richiedono gli SDK degli altri provider
+PROVIDERS = {
+    "openai": ("openai_provider", "OpenAIProvider"),
+    "anthropic": ("anthropic_provider", "AnthropicProvider"),
+    "deepseek": ("openai_provider", "DeepSeekProvider"),
+    "gemini": ("gemini_provider", "GeminiProvider"),
+    "huggingface": ("huggingface_provider", "HuggingFaceProvider"),
+    "mock": ("mock_provider", "MockProvider"),
+}
+
+
+def provider_class(name):
+    module_name, class_name = PROVIDERS[name]
+    return getattr(importlib.import_module(f"{__name__}.{module_name}"), class_name)
+
+
+def create(name, **options):
+    """Crea il provider indicato per nome; options vanno al costruttore (es. stream=True)."""
+    return provider_class(name)(**options)
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import anthropic
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from Define import keys
+import batch_mode
+import review_schema
+import stream_parser
+
+from .base import Provider
+
+
+class AnthropicProvider(Provider):
+    PROVIDER = "anthropic"
+    #MODEL_NAME = "claude-3-opus-20240229"
+    MODEL_NAME = "claude-3-haiku-20240307"
+    #MODEL_NAME = "claude-3-5-sonnet-20241022"
+    OUTPUT_NAME = "claude-haiku_v3"
+
+    # Prompt proprio di Claude: cambiarlo invaliderebbe la cache delle risposte gia' ricevute
+    PROMPT_TEMPLATE = """
+    Sei un revisore esperto di codice. Analizza il seguente codice e genera un output JSON valido con queste regole:
+    
+    - Includi metriche: Manutenibilità, Leggibilità, Performance, Sicurezza, Modularità (valori 1-5).
+    - Identifica eventuali issue con dettagli: Riga, Tipo (bug, vulnerabilità, cattiva pratica), Severità (Alta, Media, Bassa), Descrizione, Suggerimento.
+    - Rispondi solo con il JSON senza testo aggiuntivo.
+    
+    Esempio di output:
+    {{
+        "Metriche": [
+            {{
+                "Filename": "main.py",
+                "Manutenibilità": 4,
+                "Leggibilità": 3,
+                "Performance": 5,
+                "Sicurezza": 3,
+                "Modularità": 4
+            }}
+        ],
+        "Issue": [
+            {{
+                "Filename": "main.py",
+                "Line": 32,
+                "Tipo": "Cattiva Pratica",
+                "Severità": "Alta",
+                "Descrizione": "Uso di una variabile non inizializzata",
+                "Suggestion": "Dichiarare e inizializzare la variabile prima dell'uso."
+            }}
+        ]
+    }}
+    
+    Codice:
+    ```python
+    {code}
+    ```
+    """
+
+    # Con max_tokens=1024 i file grandi producono JSON troncati e la risposta contiene al massimo tre file
+    MAX_TOKENS = 1024
+    MAX_CHUNK_TOKENS = 4000
+    PACK_MAX_TOKENS = 3000
+    PACK_MAX_FILES = 3
+
+    MAX_IN_FLIGHT = 4
+
+    # Limiti del proprio account Anthropic
+    REQUESTS_PER_MIN = 50
+    TOKENS_PER_MIN = 50000
+
+    CONTEXT_TOKENS = 200000
+    PRICE_INPUT_PER_MTOK = 0.25
+    PRICE_OUTPUT_PER_MTOK = 1.25
+
+    # Risposte vincolate allo schema JSON tramite uno strumento con tool_choice forzato
+    STRUCTURED_OUTPUT = True
+
+    SUPPORTS_BATCH = True
+
+    API_KEY = keys.CLAUDE_API_KEY
+
+    def __init__(self, stream=False):
+        super().__init__(stream)
+        self.client = anthropic.Anthropic(api_key=self.API_KEY)
+        self.async_client = anthropic.AsyncAnthropic(api_key=self.API_KEY, max_retries=0)
+
+    def message_options(self):
+        if not self.STRUCTURED_OUTPUT:
+            return {}
+        return {"tools": [review_schema.anthropic_tool()],
+                "tool_choice": {"type": "tool", "name": review_schema.SCHEMA_NAME}}
+
+    def record_usage(self, usage):
+        self.prompt_cache_stats.add(usage.input_tokens)
+
+    @staticmethod
+    def response_text_of(message):
+        """Testo della risposta: con lo strumento la revisione e' l'input del blocco tool_use."""
+
+        for block in message.content:
+            if block.type == "tool_use":
+                return json.dumps(block.input, ensure_ascii=False)
+            if block.type == "text":
+                return block.text
+        return None
+
+    async def _send_async(self, content):
+        response = await self.async_client.messages.create(
+            model=self.MODEL_NAME,
+            max_tokens=self.MAX_TOKENS,
+            messages=[{"role": "user", "content": content}],
+            **self.message_options()
+        )
+        if not response.content:
+            return None
+        self.record_usage(response.usage)
+        return self.response_text_of(response)
+
+    async def _stream_async(self, content):
+        """Richiesta in streaming, interrotta appena la risposta non e' JSON (vedi stream_parser)."""
+
+        parser = stream_parser.StreamingReviewParser(on_item=stream_parser.print_item)
+        async with self.async_client.messages.stream(
+            model=self.MODEL_NAME,
+            max_tokens=self.MAX_TOKENS,
+            messages=[{"role": "user", "content": content}],
+            **self.message_options()
+        ) as stream:
+            async for event in stream:
+                if event.type == "text":
+                    parser.feed(event.text)
+                elif event.type == "input_json":
+                    parser.feed(event.partial_json)
+                if parser.stopped:
+                    break
+            else:
+                self.record_usage((await stream.get_final_message()).usage)
+        return parser.result()
+
+    def batch_backend(self):
+        return batch_mode.AnthropicBatch(self.client, self.MODEL_NAME, max_tokens=self.MAX_TOKENS,
+                                         **self.message_options())
@@ -0,0 +1,176 @@
+import asyncio
+
+import batch_mode
+import prompt_cache
+import rate_limiter
+import review_schema
+
+# Prompt di revisione comune a tutti i provider (le istruzioni fisse precedono il codice,
+# cosi' il prefisso del prompt e' sempre lo stesso e DeepSeek lo mette in cache: vedi prompt_cache)
+PROMPT_TEMPLATE = """
+    Agisci come un revisore di codice esperto. Analizza il seguente codice e in output rispettando le seguenti regole
+    
+    Regole:
+    1. Assicurati che la risposta sia un **JSON valido** senza alcun testo aggiuntivo.
+    2. Calcola le seguenti metriche: Manutenibilità, Leggibilità, Performance, Sicurezza, Modularità
+    3. Per ogni issue rilevata indica 
+    4. Usa solo valori realistici:
+        - Riga del codice in cui si trova l'issue
+        - Tipo di issue (es. potenziale bug, vulnerabilità, cattiva pratica)
+        - Severità (es. alta, media, bassa)
+        - Descrizione dell'issue
+        - Suggerimento per la correzione
+    - I punteggi delle metriche devono essere compresi tra **1 e 5**.
+    - La linea del codice deve essere un numero positivo.
+    - La severità può essere **"Bassa", "Media", "Alta"**.
+    
+    Esempio di output corretto:
+
+    {{
+        "Metriche": [
+            {{
+                "Filename": "main.py",
+                "Manutenibilità": 4,
+                "Leggibilità": 3,
+                "Performance": 5,
+                "Sicurezza": 3,
+                "Modularità": 4
+            }}
+        ],
+        "Issue": [
+            {{
+                "Filename": "main.py",
+                "Line": 32,
+                "Tipo": "Cattiva Pratica",
+                "Severità": "Alta",
+                "Descrizione": "Uso di una variabile non inizializzata",
+                "Suggestion": "Dichiarare e inizializzare la variabile prima dell'uso."
+            }}
+        ]
+    }}
+
+    Non aggiungere alcuna spiegazione o testo extra, restituisci solo il JSON.:
+   
+    ```python
+    {code}
+    ```
+    """
+
+
+class Provider:
+    """
+    Un modello a cui inviare le revisioni.
+
+    Le costanti di classe descrivono modello, limiti, prezzi e divisione dei file;
+    le sottoclassi implementano solo la chiamata alle API (_send_async e, se il
+    provider la supporta, _stream_async). Tutte le richieste passano dal
+    RateLimiter del provider, con ritentativi e backoff; prompt, parsing,
+    riparazione delle risposte, conteggio dei token e costi sono comuni.
+    """
+
+    # Nome del provider (chiave della cache), modello e suffisso dei file di output
+    PROVIDER = None
+    MODEL_NAME = None
+    OUTPUT_NAME = None
+
+    PROMPT_TEMPLATE = PROMPT_TEMPLATE
+
+    # Numero massimo di file revisionati per run da pipeline.main (None: tutti)
+    MAX_FILES = 50
+
+    # Token massimi di codice per richiesta: i file piu' grandi vengono divisi in parti
+    MAX_CHUNK_TOKENS = 8000
+
+    # File piccoli raggruppati in un'unica richiesta (con --pack)
+    PACK_MAX_TOKENS = 4000
+    PACK_MAX_FILES = 8
+
+    # Richieste contemporanee e limiti del proprio account (None: nessun limite)
+    MAX_IN_FLIGHT = 8
+    REQUESTS_PER_MIN = None
+    TOKENS_PER_MIN = None
+
+    # Contesto del modello e prezzi in dollari per milione di token (da aggiornare col listino)
+    CONTEXT_TOKENS = None
+    PRICE_INPUT_PER_MTOK = 0
+    PRICE_OUTPUT_PER_MTOK = 0
+
+    # Risposte vincolate allo schema JSON della revisione, se il provider lo supporta
+    STRUCTURED_OUTPUT = False
+
+    # Lunghezza minima del prefisso che il provider mette in cache da solo (None: nessuna cache dei prompt)
+    PROMPT_CACHE_MIN_TOKENS = None
+
+    # API batch del provider (con --batch), vedi batch_backend
+    SUPPORTS_BATCH = False
+
+    # Secondi tra un controllo e l'altro dello stato dei batch (con --batch)
+    BATCH_POLL_INTERVAL = batch_mode.POLL_INTERVAL
+
+    def __init__(self, stream=False):
+        # Risposte in streaming, interrotte appena non sono JSON (vedi stream_parser)
+        self.stream = stream
+        self.limiter = rate_limiter.RateLimiter(self.REQUESTS_PER_MIN, self.TOKENS_PER_MIN)
+        # Token di input serviti dalla cache dei prompt del provider
+        self.prompt_cache_stats = prompt_cache.PromptCacheStats(self.PROMPT_TEMPLATE, self.PROMPT_CACHE_MIN_TOKENS)
+
+    def count_tokens(self, text):
+        """Token del testo: la stima a caratteri, se il provider non ha un tokenizer offline."""
+        return rate_limiter.estimate_tokens(text)
+
+    def cost(self, input_tokens, output_tokens):
+        """Costo in dollari di input_tokens token di input e output_tokens di output."""
+        return (input_tokens * self.PRICE_INPUT_PER_MTOK + output_tokens * self.PRICE_OUTPUT_PER_MTOK) / 1_000_000
+
+    def review_content(self, code):
+        """Contenuto del messaggio di revisione: il prompt completo, o blocchi propri del provider."""
+        return self.PROMPT_TEMPLATE.format(code=code)
+
+    async def _send_async(self, content):
+        """Una richiesta al provider; restituisce il testo della risposta (o None)."""
+        raise NotImplementedError
+
+    async def _stream_async(self, content):
+        """Richiesta in streaming; senza supporto del provider, una richiesta normale."""
+        return await self._send_async(content)
+
+    async def submit_async(self, content, tokens=None, max_retries=5):
+        """Invia content rispettando i limiti del provider e restituisce il testo della risposta, o None."""
+
+        if tokens is None:
+            tokens = rate_limiter.estimate_tokens(content) + rate_limiter.EXPECTED_OUTPUT_TOKENS
+        send = self._stream_async if self.stream else self._send_async
+        return await self.limiter.call(lambda: send(content), tokens=tokens, max_retries=max_retries)
+
+    def submit(self, content, tokens=None, max_retries=5):
+        """Versione sincrona di submit_async, da chiamare fuori da un event loop."""
+        return asyncio.run(self.submit_async(content, tokens, max_retries))
+
+    async def request_review_async(self, code, max_retries=5):
+        """Invia il codice al provider e restituisce il testo della risposta."""
+
+        prompt = self.PROMPT_TEMPLATE.format(code=code)
+        return await self.submit_async(self.review_content(code),
+                                       rate_limiter.estimate_tokens(prompt) + rate_limiter.EXPECTED_OUTPUT_TOKENS,
+                                       max_retries)
+
+    async def repair_review_async(self, response_text, max_retries=5):
+        """Chiede di correggere una risposta non interpretabile, senza inviare di nuovo il codice."""
+        return await self.submit_async(review_schema.REPAIR_TEMPLATE.format(response=response_text),
+                                       max_retries=max_retries)
+
+    def parse_response(self, response):
+        return review_schema.parse_review(response)
+
+    def batch_backend(self):
+        """Backend per batch_mode.run_batch (API batch del provider), se SUPPORTS_BATCH."""
+        return None
+
+    def ready(self):
+        """True se il provider puo' ricevere richieste; altrimenti stampa come renderlo disponibile."""
+        return True
+
+    def summary(self):
+        """Righe di riepilogo del run: rate limiter e cache dei prompt."""
+
+        return [self.limiter.summary(), self.prompt_cache_stats.summary()]
@@ -0,0 +1,65 @@
+import os
+import sys
+import google.generativeai as genai
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from Define import keys
+import review_schema
+import stream_parser
+
+from .base import Provider
+
+
+class GeminiProvider(Provider):
+    PROVIDER = "gemini"
+    MODEL_NAME = "gemini-pro"
+    #MODEL_NAME = "gemini-2.0-flash-lite-preview-02-05"
+    #MODEL_NAME = "gemini-2.0-flash"
+    OUTPUT_NAME = "gemini"
+
+    # Limiti del piano Gemini in uso
+    REQUESTS_PER_MIN = 60
+    TOKENS_PER_MIN = 32000
+
+    CONTEXT_TOKENS = 32760
+    PRICE_INPUT_PER_MTOK = 0.5
+    PRICE_OUTPUT_PER_MTOK = 1.5
+
+    # response_schema richiede gemini-1.5 o successivo, non gemini-pro
+    STRUCTURED_OUTPUT = False
+
+    def __init__(self, stream=False):
+        super().__init__(stream)
+        genai.configure(api_key=keys.GEMINI_API_KEY)
+        if self.STRUCTURED_OUTPUT:
+            self.model = genai.GenerativeModel(self.MODEL_NAME, generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": review_schema.gemini_schema()
+            })
+        else:
+            self.model = genai.GenerativeModel(self.MODEL_NAME)
+
+    def record_usage(self, usage):
+        self.prompt_cache_stats.add(usage.prompt_token_count)
+
+    async def _send_async(self, content):
+        response = await self.model.generate_content_async(content)
+        if not (response and response.text):
+            return None
+        if getattr(response, "usage_metadata", None):
+            self.record_usage(response.usage_metadata)
+        return response.text
+
+    async def _stream_async(self, content):
+        """Richiesta in streaming, interrotta appena la risposta non e' JSON (vedi stream_parser)."""
+
+        parser = stream_parser.StreamingReviewParser(on_item=stream_parser.print_item)
+        response = await self.model.generate_content_async(content, stream=True)
+        async for chunk in response:
+            parser.feed(chunk.text)
+            if parser.stopped:
+                break
+        else:
+            if getattr(response, "usage_metadata", None):
+                self.record_usage(response.usage_metadata)
+        return parser.result()
@@ -0,0 +1,142 @@
+import os
+import sys
+import asyncio
+import threading
+import urllib.request
+from huggingface_hub import login
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from Define import keys
+
+import rate_limiter
+from .openai_provider import ChatCompletionsProvider
+
+# Carica il modello in questo processo invece di usare il server: python <script> --in-process
+IN_PROCESS = "--in-process" in sys.argv
+
+# Solo con --in-process: esecuzione su CPU anche se c'e' una GPU (--cpu) e quantizzazione (--int8, --int4)
+DEVICE = "cpu" if "--cpu" in sys.argv else None
+QUANTIZATION = "int8" if "--int8" in sys.argv else "int4" if "--int4" in sys.argv else None
+
+# Con --in-process le richieste entrano ed escono dalla generazione man mano (continuous
+# batching, local_scheduler.py) entro MAX_ACTIVE sequenze e KV_CACHE_TOKENS token di cache;
+# con --static vengono generate a batch fissi di BATCH_SIZE
+STATIC_BATCHING = "--static" in sys.argv
+MAX_ACTIVE = 8
+KV_CACHE_TOKENS = 32768
+BATCH_SIZE = 4
+MAX_NEW_TOKENS = 1024
+
+
+class HuggingFaceProvider(ChatCompletionsProvider):
+    """
+    StarCoder locale. Di default le richieste vanno al server che tiene il modello
+    in memoria (local_model_server.py), con la stessa API chat/completions dei
+    provider cloud; con --in-process il modello viene caricato in questo processo.
+    """
+
+    PROVIDER = "huggingface"
+    # Nome sull'Hub oppure cartella locale
+    MODEL_NAME = "TheBloke/StarCoder-GPTQ"
+    OUTPUT_NAME = "hf_startcoder"
+
+    API_KEY = "local"
+    BASE_URL = "http://127.0.0.1:8766/v1"
+    TIMEOUT = 3600
+
+    # Il contesto di StarCoder e' di 8192 token
+    MAX_CHUNK_TOKENS = 3000
+    PACK_MAX_TOKENS = 2000
+    PACK_MAX_FILES = 4
+
+    # Abbastanza richieste da tenere piena la generazione locale
+    MAX_IN_FLIGHT = 2 * MAX_ACTIVE
+
+    # Il modello locale non ha costi per token
+    CONTEXT_TOKENS = 8192
+
+    def __init__(self, stream=False):
+        super().__init__(stream)
+        # Caricati da ready() prima del run, o alla prima richiesta
+        self.tokenizer = None
+        self.generator = None
+        self.batcher = None
+        self.load_lock = threading.Lock()
+
+    def login_if_needed(self):
+        # Il login serve solo per scaricare il modello dall'Hub, non per una cartella locale
+        if not os.path.isdir(self.MODEL_NAME):
+            login(keys.HUG_FACE_TOKEN)
+
+    def count_tokens(self, text):
+        """
+        Token del testo secondo il tokenizer del modello locale, solo se gia' scaricato
+        (senza login ne' rete, come per il piano del run); altrimenti la stima a caratteri.
+        """
+
+        if self.tokenizer is None:
+            try:
+                from transformers import AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(self.MODEL_NAME, local_files_only=True)
+            except (ImportError, OSError, ValueError):
+                # Tokenizer non in cache o transformers non installato
+                self.tokenizer = False
+        if self.tokenizer is False:
+            return rate_limiter.estimate_tokens(text)
+        return len(self.tokenizer(text)["input_ids"])
+
+    def load_model(self):
+        """Carica tokenizer e modello in questo processo (--in-process). Bloccante: da non chiamare nell'event loop."""
+
+        with self.load_lock:
+            if self.generator is not None:
+                return self.batcher
+            # Import qui: torch serve solo senza server e rallenterebbe l'avvio del client
+            import local_backend
+            import local_scheduler
+
+            self.login_if_needed()
+            device = DEVICE or local_backend.default_device()
+            model = local_backend.load_model(self.MODEL_NAME, device=device, quantization=QUANTIZATION)
+            model_tokenizer = local_backend.load_tokenizer(self.MODEL_NAME)
+            if STATIC_BATCHING:
+                self.generator = local_backend.LocalGenerator(model_tokenizer, model, device=device,
+                                                              batch_size=BATCH_SIZE, max_new_tokens=MAX_NEW_TOKENS)
+                self.batcher = local_backend.AsyncBatcher(self.generator)
+            else:
+                self.generator = local_scheduler.ContinuousScheduler(model_tokenizer, model, device, MAX_NEW_TOKENS,
+                                                                     max_active=MAX_ACTIVE,
+                                                                     kv_cache_tokens=KV_CACHE_TOKENS)
+                self.batcher = self.generator
+        return self.batcher
+
+    async def _send_async(self, content):
+        if IN_PROCESS:
+            # Le richieste concorrenti vengono generate insieme, fuori dall'event loop
+            batcher = self.batcher or await asyncio.to_thread(self.load_model)
+            return await batcher.generate(content)
+        return await super()._send_async(content)
+
+    async def _stream_async(self, content):
+        # Il server locale restituisce la risposta completa
+        return await self._send_async(content)
+
+    def ready(self):
+        if IN_PROCESS:
+            # Il caricamento avviene qui, prima che parta l'event loop delle revisioni
+            self.load_model()
+            return True
+        try:
+            with urllib.request.urlopen(self.BASE_URL + "/health", timeout=2):
+                return True
+        except OSError:
+            print(f"Server locale non raggiungibile su {self.BASE_URL}. Avvialo con:\n"
+                  f"  python Script/local_model_server.py --model {self.MODEL_NAME}\n"
+                  f"oppure esegui la revisione con --in-process.")
+            return False
+
+    def summary(self):
+        if self.generator is None:
+            return [self.limiter.summary()]
+        return [self.limiter.summary(),
+                self.generator.summary() if STATIC_BATCHING else self.generator.stats.summary()]
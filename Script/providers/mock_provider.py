@@ -0,0 +1,95 @@
+import time
+import random
+import asyncio
+
+import fake_provider_server
+
+from .base import Provider
+
+
+class MockRateLimitError(Exception):
+    """Errore 429 simulato, ritentato dal RateLimiter come quelli dei client veri."""
+
+    status_code = 429
+
+
+class MockBatch:
+    """API batch in memoria: i risultati sono pronti latency secondi dopo l'invio."""
+
+    def __init__(self, provider, latency):
+        self.provider = provider
+        self.latency = latency
+        self.batches = {}
+
+    def submit(self, requests):
+        batch_id = f"mock_batch_{len(self.batches) + 1}"
+        self.batches[batch_id] = (time.monotonic(), [(custom_id, self.provider.review_text(prompt))
+                                                     for custom_id, prompt in requests])
+        return batch_id
+
+    def is_done(self, batch_id):
+        return time.monotonic() - self.batches[batch_id][0] >= self.latency
+
+    def results(self, batch_id):
+        yield from self.batches[batch_id][1]
+
+
+class MockProvider(Provider):
+    """
+    Provider finto, senza rete e senza chiavi: risponde con la revisione
+    deterministica di fake_provider_server dopo latency secondi. Con error_rate
+    una frazione delle richieste fallisce con 429 (ritentata dal RateLimiter),
+    con invalid_rate restituisce testo non JSON (corretto dalla riparazione).
+    Serve per provare e misurare la pipeline (cache, concorrenza, limiti,
+    packing, batch) senza costi.
+    """
+
+    PROVIDER = "mock"
+    MODEL_NAME = "mock-model"
+    OUTPUT_NAME = "mock"
+
+    MAX_FILES = None
+    MAX_IN_FLIGHT = 16
+    CONTEXT_TOKENS = 128000
+    SUPPORTS_BATCH = True
+    BATCH_POLL_INTERVAL = 0.1
+
+    def __init__(self, stream=False, latency=0.05, error_rate=0.0, invalid_rate=0.0, seed=0,
+                 requests_per_min=None, tokens_per_min=None):
+        self.REQUESTS_PER_MIN = requests_per_min
+        self.TOKENS_PER_MIN = tokens_per_min
+        super().__init__(stream)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.invalid_rate = invalid_rate
+        self.random = random.Random(seed)
+
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def review_text(self, prompt):
+        return fake_provider_server.fake_review(prompt)
+
+    async def _send_async(self, content):
+        if self.random.random() < self.error_rate:
+            raise MockRateLimitError("rate limit exceeded (mock)")
+
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        self.prompt_cache_stats.add(len(content) // 4)
+        if self.random.random() < self.invalid_rate:
+            return "Ecco la revisione richiesta: non e' JSON"
+        return self.review_text(content)
+
+    def batch_backend(self):
+        return MockBatch(self, self.latency)
+
+    def summary(self):
+        return super().summary() + [f"Mock: {self.requests} risposte, al massimo {self.max_in_flight} in volo"]
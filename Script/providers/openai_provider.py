@@ -0,0 +1,182 @@
+import os
+import sys
+import openai
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from Define import keys
+import batch_mode
+import rate_limiter
+import review_schema
+import stream_parser
+
+from .base import Provider
+
+
+class ChatCompletionsProvider(Provider):
+    """Provider con API chat/completions in formato OpenAI (OpenAI, DeepSeek, server locali)."""
+
+    API_KEY = None
+    BASE_URL = None
+    # Secondi di attesa massima di una risposta (None: il default del client)
+    TIMEOUT = None
+
+    def __init__(self, stream=False):
+        super().__init__(stream)
+        options = {"timeout": self.TIMEOUT} if self.TIMEOUT is not None else {}
+        self.client = openai.OpenAI(api_key=self.API_KEY, base_url=self.BASE_URL, **options)
+        self.async_client = openai.AsyncOpenAI(api_key=self.API_KEY, base_url=self.BASE_URL, max_retries=0,
+                                               **options)
+
+    def completion_options(self):
+        return {}
+
+    def record_usage(self, usage):
+        self.prompt_cache_stats.add(usage.prompt_tokens)
+
+    async def _send_async(self, content):
+        response = await self.async_client.chat.completions.create(
+            model=self.MODEL_NAME,
+            messages=[{"role": "user", "content": content}],
+            **self.completion_options()
+        )
+        if response.usage:
+            self.record_usage(response.usage)
+        return response.choices[0].message.content
+
+    async def _stream_async(self, content):
+        """
+        Richiesta in streaming: il JSON viene controllato mentre arriva, le Issue
+        stampate appena complete e lo stream chiuso appena la risposta non e' valida.
+        """
+
+        parser = stream_parser.StreamingReviewParser(on_item=stream_parser.print_item)
+        stream = await self.async_client.chat.completions.create(
+            model=self.MODEL_NAME,
+            messages=[{"role": "user", "content": content}],
+            stream=True,
+            stream_options={"include_usage": True},
+            **self.completion_options()
+        )
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    self.record_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parser.feed(chunk.choices[0].delta.content)
+                    if parser.stopped:
+                        break
+        finally:
+            await stream.close()
+        return parser.result()
+
+
+class OpenAIProvider(ChatCompletionsProvider):
+    PROVIDER = "openai"
+    MODEL_NAME = "gpt-4o-mini"
+    #MODEL_NAME = "gpt-3.5-turbo"
+    #MODEL_NAME = "gpt-4o"
+    #MODEL_NAME = "gpt-4-turbo"
+    #MODEL_NAME = "o1-mini"
+    OUTPUT_NAME = "gpt-4o-mini"
+
+    # Lo script originale per OpenAI revisionava tutti i file (gli altri si fermavano a 50)
+    MAX_FILES = None
+
+    API_KEY = keys.CHAT_GPT_API_KEY
+
+    # Limiti del proprio account OpenAI
+    REQUESTS_PER_MIN = 500
+    TOKENS_PER_MIN = 200000
+
+    CONTEXT_TOKENS = 128000
+    PRICE_INPUT_PER_MTOK = 0.15
+    PRICE_OUTPUT_PER_MTOK = 0.6
+
+    # response_format json_schema, da gpt-4o-mini in poi
+    STRUCTURED_OUTPUT = True
+
+    SUPPORTS_BATCH = True
+
+    # OpenAI mette in cache automaticamente i prefissi comuni dei prompt da 1024 token in su:
+    # il prefisso attuale e' piu' corto, quindi la cache dei prompt non fa risparmiare nulla
+    PROMPT_CACHE_MIN_TOKENS = 1024
+
+    def __init__(self, stream=False):
+        super().__init__(stream)
+        # Tokenizer offline di OpenAI, caricato da count_tokens() al primo uso
+        self.encoding = None
+
+    def count_tokens(self, text):
+        """Token del testo secondo il tokenizer del modello (tiktoken), o la stima a caratteri se non installato."""
+
+        if tiktoken is None:
+            return rate_limiter.estimate_tokens(text)
+        if self.encoding is None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(self.MODEL_NAME)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def completion_options(self):
+        return {"response_format": review_schema.openai_response_format()} if self.STRUCTURED_OUTPUT else {}
+
+    def record_usage(self, usage):
+        details = usage.prompt_tokens_details
+        self.prompt_cache_stats.add(usage.prompt_tokens, details.cached_tokens if details else 0)
+
+    def batch_backend(self):
+        return batch_mode.OpenAIBatch(self.client, self.MODEL_NAME, **self.completion_options())
+
+
+class DeepSeekProvider(ChatCompletionsProvider):
+    PROVIDER = "deepseek"
+    MODEL_NAME = "deepseek-chat"
+    OUTPUT_NAME = "deepseek"
+
+    API_KEY = keys.DEEPSEEK_API_KEY
+    BASE_URL = "https://api.deepseek.com"
+
+    # Prompt proprio di DeepSeek: cambiarlo invaliderebbe la cache delle risposte gia' ricevute
+    PROMPT_TEMPLATE = """
+    Agisci come un revisore di codice esperto. Analizza il seguente codice e restituisci un output in **JSON valido** secondo le seguenti regole:
+
+    1. Calcola le seguenti metriche: Manutenibilità, Leggibilità, Performance, Sicurezza, Modularità
+    2. Per ogni issue rilevata, indica:
+       - Riga del codice
+       - Tipo di issue (es. potenziale bug, vulnerabilità, cattiva pratica)
+       - Severità (Alta, Media, Bassa)
+       - Descrizione e suggerimento per la correzione
+    3. I punteggi delle metriche devono essere compresi tra **1 e 5**.
+
+    Restituisci solo il JSON, senza testo aggiuntivo:
+    
+    ```python
+    {code}
+    ```
+    """
+
+    # DeepSeek non pubblica limiti fissi: valori prudenti per non saturare il servizio
+    REQUESTS_PER_MIN = 300
+    TOKENS_PER_MIN = 1000000
+
+    CONTEXT_TOKENS = 64000
+    PRICE_INPUT_PER_MTOK = 0.27
+    PRICE_OUTPUT_PER_MTOK = 1.1
+
+    # JSON mode (response_format json_object): DeepSeek non supporta ancora json_schema
+    STRUCTURED_OUTPUT = True
+
+    # DeepSeek mette in cache su disco i prefissi comuni a blocchi di 64 token
+    PROMPT_CACHE_MIN_TOKENS = 64
+
+    def completion_options(self):
+        return {"response_format": {"type": "json_object"}} if self.STRUCTURED_OUTPUT else {}
+
+    def record_usage(self, usage):
+        self.prompt_cache_stats.add(usage.prompt_tokens, getattr(usage, "prompt_cache_hit_tokens", 0))
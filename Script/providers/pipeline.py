@@ -0,0 +1,109 @@
+import os
+import sys
+
+import batch_mode
+import response_cache
+import results_store
+import review_engine
+import run_journal
+
+from . import create
+
+# Revisione di una cartella con un provider: cache delle risposte, journal, richieste
+# concorrenti con rate limiting, file grandi divisi e piccoli raggruppati, riparazione
+# delle risposte non valide, API batch ed esportazione dei risultati, uguali per tutti i modelli.
+
+REPORT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "Report"))
+
+# Riprende un run interrotto saltando i file gia' nel journal: python <script> --resume
+RESUME = "--resume" in sys.argv
+
+# Oltre al database e all'archivio Parquet scrive i CSV Valutazioni_/Issues_: python <script> --csv
+EXPORT_CSV = "--csv" in sys.argv
+
+# Invia tutti i file tramite le API batch (meta' prezzo, risultati entro 24h): python <script> --batch
+BATCH = "--batch" in sys.argv
+
+# Riceve le risposte in streaming, interrompendo subito quelle che non sono JSON: python <script> --stream
+STREAM = "--stream" in sys.argv
+
+# Raggruppa i file piccoli in un'unica richiesta: python <script> --pack
+PACK = "--pack" in sys.argv
+
+
+def open_cache(provider):
+    return response_cache.ResponseCache(response_cache.CACHE_DIR, provider.PROVIDER, provider.MODEL_NAME,
+                                        provider.PROMPT_TEMPLATE)
+
+
+def journal_path(provider, cartella_destinazione=REPORT_DIR):
+    return os.path.join(cartella_destinazione, f"Journal_{provider.OUTPUT_NAME}.jsonl")
+
+
+def make_target(provider, cartella_destinazione=REPORT_DIR, resume=False, pack=False, max_files=None):
+    """ReviewTarget del provider, con la sua cache e il suo journal, per review_engine.review_targets."""
+
+    journal = run_journal.RunJournal(journal_path(provider, cartella_destinazione), resume=resume)
+    return review_engine.ReviewTarget(provider.request_review_async, provider.parse_response,
+                                      max_in_flight=provider.MAX_IN_FLIGHT, cache=open_cache(provider),
+                                      journal=journal, name=provider.OUTPUT_NAME,
+                                      max_chunk_tokens=provider.MAX_CHUNK_TOKENS,
+                                      pack_max_tokens=provider.PACK_MAX_TOKENS if pack else None,
+                                      pack_max_files=provider.PACK_MAX_FILES,
+                                      repair_review=provider.repair_review_async, max_files=max_files)
+
+
+def finish(provider, journal, cartella_destinazione=REPORT_DIR, csv=False, name=None):
+    """Stampa il riepilogo del provider, salva i risultati del journal e lo chiude."""
+
+    for line in provider.summary():
+        print(f"[{name}] {line}" if name else line)
+    results_store.export_run(journal, cartella_destinazione, provider.OUTPUT_NAME, csv=csv)
+    journal.close()
+
+
+def run(provider, folder_path, cartella_destinazione=REPORT_DIR, resume=False, pack=False, batch=False,
+        csv=False, max_files=None, exclude=None):
+    """
+    Revisiona folder_path con il provider e salva i risultati nel database,
+    nell'archivio Parquet e, con csv=True, nei CSV. Con batch=True i file
+    vengono inviati tramite le API batch del provider; lo stato dei batch
+    e' salvato in Report/Batch_<modello>.json, cosi' un run interrotto
+    riprende ad attendere gli stessi batch. Senza max_files vale il limite
+    del provider (MAX_FILES). Restituisce False se il provider non e' disponibile.
+    """
+
+    if not provider.ready():
+        return False
+    if batch and not provider.SUPPORTS_BATCH:
+        raise ValueError(f"{provider.PROVIDER} non supporta le API batch")
+    backend = provider.batch_backend() if batch else None
+
+    max_files = provider.MAX_FILES if max_files is None else max_files
+    os.makedirs(cartella_destinazione, exist_ok=True)
+    batch_state_path = os.path.join(cartella_destinazione, f"Batch_{provider.OUTPUT_NAME}.json")
+    resume = resume or (batch and os.path.exists(batch_state_path))
+
+    if batch:
+        # I risultati vengono scritti nel journal man mano che i batch sono acquisiti
+        journal = run_journal.RunJournal(journal_path(provider, cartella_destinazione), resume=resume)
+        batch_mode.run_batch(backend, provider.PROMPT_TEMPLATE, provider.parse_response, folder_path, journal,
+                             batch_state_path, cache=open_cache(provider), extensions=review_engine.CODE_EXTENSIONS,
+                             max_files=max_files, max_chunk_tokens=provider.MAX_CHUNK_TOKENS,
+                             poll_interval=provider.BATCH_POLL_INTERVAL)
+    else:
+        target = make_target(provider, cartella_destinazione, resume, pack)
+        review_engine.review_targets(folder_path, [target], max_files=max_files, exclude=exclude)
+        journal = target.journal
+
+    finish(provider, journal, cartella_destinazione, csv)
+    return True
+
+
+def main(name, folder_path):
+    """Revisione da riga di comando con le opzioni --resume, --csv, --batch, --stream e --pack."""
+
+    provider = create(name, stream=STREAM)
+    if not run(provider, folder_path, resume=RESUME, pack=PACK, batch=BATCH, csv=EXPORT_CSV):
+        sys.exit(1)
+    print(f"Analisi completata con {provider.OUTPUT_NAME}!")
@@ -0,0 +1,179 @@
+import time
+import random
+import asyncio
+import weakref
+
+# Parametri del backoff esponenziale (secondi)
+BACKOFF_BASE = 1
+BACKOFF_CAP = 60
+
+# Token di output attesi per risposta, conteggiati nel budget dei token/minuto
+EXPECTED_OUTPUT_TOKENS = 1024
+
+# Eccezioni dei client senza status HTTP che indicano un errore di rete o un timeout
+NETWORK_ERRORS = {"APIConnectionError", "APITimeoutError", "TransportError", "TimeoutException",
+                  "ServiceUnavailable", "DeadlineExceeded"}
+
+
+def estimate_tokens(text):
+    """Stima approssimativa dei token di un testo (circa 4 caratteri per token)."""
+    return max(1, len(text) // 4)
+
+
+def status_code_of(error):
+    """Restituisce lo status HTTP di un'eccezione dei client, se presente."""
+
+    for attr in ("status_code", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def retry_after_of(error):
+    """Legge l'header Retry-After (in secondi) dalla risposta di errore, se presente."""
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error):
+    """
+    429, errori 5xx, errori di rete o timeout e le eccezioni con retryable = True
+    (es. stream_parser.InvalidStreamError) si ritentano; gli altri errori no.
+    """
+
+    if getattr(error, "retryable", False):
+        return True
+    status = status_code_of(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    if isinstance(error, (OSError, asyncio.TimeoutError)):
+        return True
+    # Errori di rete dei client (openai, anthropic, httpx, google), riconosciuti per nome
+    # per non importare gli SDK qui
+    return any(cls.__name__ in NETWORK_ERRORS for cls in type(error).__mro__)
+
+
+def backoff_delay(attempt, retry_after=None, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Attesa prima del prossimo tentativo: Retry-After se indicato, altrimenti esponenziale con jitter."""
+
+    if retry_after is not None:
+        return retry_after + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Secchiello che si ricarica in modo continuo fino a per_minute unita' al minuto (None: nessun limite)."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0 if per_minute is not None else None
+        self.available = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount):
+        if self.capacity is None:
+            return 0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount):
+        if self.capacity is None:
+            return
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Limitatore condiviso di richieste/minuto e token/minuto per un provider.
+
+    Tutte le richieste passano da call(), che attende il budget disponibile,
+    ritenta con backoff esponenziale e jitter su 429/5xx e, quando il server
+    indica Retry-After, sospende tutte le richieste in coda per quel periodo.
+    Raccoglie il tempo passato in throttling, in backoff e in attesa delle risposte.
+    """
+
+    def __init__(self, requests_per_min, tokens_per_min):
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        self.paused_until = 0
+        # Un lock per event loop: il limiter puo' servire run diversi (es. Provider.submit)
+        self._locks = weakref.WeakKeyDictionary()
+
+        self.num_requests = 0
+        self.num_retries = 0
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.response_seconds = 0.0
+
+    def _lock(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._locks:
+            self._locks[loop] = asyncio.Lock()
+        return self._locks[loop]
+
+    async def acquire(self, tokens):
+        start = time.monotonic()
+        async with self._lock():
+            while True:
+                wait = max(self.requests.delay_for(1), self.tokens.delay_for(tokens),
+                           self.paused_until - time.monotonic())
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+        self.throttled_seconds += time.monotonic() - start
+
+    async def call(self, make_request, tokens, max_retries=5):
+        """
+        Esegue make_request() (che restituisce una coroutine) rispettando i limiti.
+        Restituisce il risultato, oppure None se tutti i tentativi falliscono.
+        """
+
+        for attempt in range(max_retries):
+            await self.acquire(tokens)
+
+            start = time.monotonic()
+            try:
+                self.num_requests += 1
+                return await make_request()
+            except Exception as e:
+                if not is_retryable(e) or attempt == max_retries - 1:
+                    print(f"Errore: {e}. Nessun nuovo tentativo.")
+                    return None
+
+                retry_after = retry_after_of(e)
+                delay = backoff_delay(attempt, retry_after)
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                print(f"Errore: {e}. Riprovo tra {delay:.1f} secondi...")
+            finally:
+                self.response_seconds += time.monotonic() - start
+
+            self.num_retries += 1
+            self.backoff_seconds += delay
+            await asyncio.sleep(delay)
+
+        return None
+
+    def summary(self):
+        return (f"Rate limiter: {self.num_requests} richieste, {self.num_retries} ritentativi, "
+                f"{self.throttled_seconds:.1f}s in throttling, {self.backoff_seconds:.1f}s in backoff, "
+                f"{self.response_seconds:.1f}s in attesa delle risposte")
@@ -0,0 +1,124 @@
+import os
+import json
+import hashlib
+
+# Cartella predefinita della cache, condivisa da tutti gli script
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".review_cache"))
+
+# Dimensione massima predefinita della cache su disco (byte)
+CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+
+def content_hash(code):
+    """Hash del contenuto di un file, salvato anche nell'indice dei file (file_index)."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache persistente delle risposte indirizzata per contenuto.
+
+    La chiave e' l'hash di provider, modello, template del prompt e hash del
+    contenuto del file: se nessuno dei quattro cambia, la revisione viene riletta
+    dal disco invece di essere richiesta di nuovo. Con get_hash la si cerca
+    dall'hash salvato nell'indice dei file, senza leggere il file. Ogni voce contiene la risposta
+    grezza e le righe Metriche/Issue gia' interpretate. Quando la cache supera
+    max_bytes vengono eliminate le voci usate meno di recente (mtime).
+    """
+
+    def __init__(self, directory, provider, model, prompt_template, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.provider = provider
+        self.model = model
+        self.prompt_template = prompt_template
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._entries())
+
+    def key(self, code):
+        return self.key_for_hash(content_hash(code))
+
+    def key_for_hash(self, code_hash):
+        payload = json.dumps([self.provider, self.model, self.prompt_template, code_hash], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if file_name.endswith(".json"):
+                    path = os.path.join(root, file_name)
+                    stat = os.stat(path)
+                    yield path, stat.st_mtime, stat.st_size
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        os.utime(path)  # Aggiorna l'ultimo utilizzo per l'evizione LRU
+        self.hits += 1
+        return entry["response"], entry["valutazioni"], entry["issues"]
+
+    def get(self, code):
+        """Restituisce (response_text, valutazioni, issues) oppure None."""
+
+        result = self._read(self.key(code))
+        if result is None:
+            self.misses += 1
+        return result
+
+    def get_hash(self, code_hash):
+        """
+        Come get, dall'hash del contenuto. Un miss non viene contato: il chiamante
+        legge il file e lo cerca di nuovo con get.
+        """
+        return self._read(self.key_for_hash(code_hash))
+
+    def put(self, code, response_text, valutazioni, issues):
+        path = self._path(self.key(code))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        entry = {
+            "provider": self.provider,
+            "model": self.model,
+            "response": response_text,
+            "valutazioni": valutazioni,
+            "issues": issues
+        }
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        self.total_bytes += os.path.getsize(path) - previous
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Elimina le voci meno recenti finche' la cache scende al 90% del limite."""
+
+        target = self.max_bytes * 0.9
+        for path, _, size in sorted(self._entries(), key=lambda e: e[1]):
+            if self.total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self.total_bytes -= size
+            except OSError:
+                pass
+
+    def summary(self):
+        totale = self.hits + self.misses
+        perc = 100 * self.hits / totale if totale else 0
+        return f"Cache: {self.hits} hit, {self.misses} miss ({perc:.1f}% hit), {self.total_bytes / 1024 / 1024:.1f} MB"
@@ -0,0 +1,291 @@
+import os
+import sqlite3
+import time
+
+import file_index
+import review_schema
+
+# Database SQLite con i risultati di tutti i run, letto dai Report con query aggregate
+DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Report", "results.db"))
+
+# Righe inserite per ogni executemany
+INSERT_BATCH = 5000
+
+# Colonne delle metriche nel database e nomi usati nei CSV/Report
+METRIC_COLUMNS = {"manutenibilita": "Manutenibilità", "leggibilita": "Leggibilità", "performance": "Performance",
+                  "sicurezza": "Sicurezza", "modularita": "Modularità"}
+
+# Colonne delle issue usabili per raggruppare, filtrare e ordinare, con i nomi usati nei Report
+ISSUE_COLUMNS = {"model": "Model", "filename": "File", "line": "Riga", "tipo": "Tipo", "severita": "Severità",
+                 "descrizione": "Descrizione", "suggerimento": "Suggerimento", "path": "FullPath"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    UNIQUE (model, run_id)
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    language TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    file INTEGER NOT NULL REFERENCES files(id),
+    filename TEXT,
+    manutenibilita INTEGER,
+    leggibilita INTEGER,
+    performance INTEGER,
+    sicurezza INTEGER,
+    modularita INTEGER
+);
+CREATE TABLE IF NOT EXISTS issues (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    file INTEGER NOT NULL REFERENCES files(id),
+    filename TEXT,
+    line INTEGER,
+    tipo TEXT,
+    severita TEXT,
+    descrizione TEXT,
+    suggerimento TEXT
+);
+-- Issue uguali segnalate da modelli diversi, ricostruite da Report/issue_clusters.py
+CREATE TABLE IF NOT EXISTS clusters (
+    id TEXT PRIMARY KEY,
+    path TEXT,
+    line INTEGER,
+    line_end INTEGER,
+    tipo TEXT,
+    severita TEXT,
+    descrizione TEXT,
+    models TEXT,
+    hits INTEGER
+);
+CREATE TABLE IF NOT EXISTS cluster_members (
+    issue INTEGER PRIMARY KEY,
+    cluster TEXT NOT NULL REFERENCES clusters(id)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_model ON runs (model);
+CREATE INDEX IF NOT EXISTS idx_clusters_hits ON clusters (hits, path);
+CREATE INDEX IF NOT EXISTS idx_metrics_run ON metrics (run, file);
+CREATE INDEX IF NOT EXISTS idx_issues_run_severita ON issues (run, severita);
+CREATE INDEX IF NOT EXISTS idx_issues_run_tipo ON issues (run, tipo);
+CREATE INDEX IF NOT EXISTS idx_issues_run_line ON issues (run, line);
+CREATE INDEX IF NOT EXISTS idx_issues_run_filename ON issues (run, filename);
+CREATE INDEX IF NOT EXISTS idx_issues_file ON issues (file, run);
+CREATE VIEW IF NOT EXISTS latest_runs AS
+    SELECT * FROM runs r WHERE id = (SELECT MAX(id) FROM runs WHERE model = r.model);
+CREATE VIEW IF NOT EXISTS latest_issues AS
+    SELECT r.model, i.filename, i.line, i.tipo, i.severita, i.descrizione, i.suggerimento, f.path
+    FROM latest_runs r CROSS JOIN issues i ON i.run = r.id JOIN files f ON i.file = f.id;
+"""
+
+
+def connect(db_path=DB_PATH):
+    """Apre il database in modalita' WAL, cosi' i Report possono leggere mentre un run scrive."""
+
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _score(value):
+    """Punteggio di una metrica, oppure None se non e' un intero della scala (come nell'archivio Parquet)."""
+    value = _int(value)
+    return value if value is not None and review_schema.SCORE_MIN <= value <= review_schema.SCORE_MAX else None
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def write_journal(journal, model, run_id=None, db_path=DB_PATH):
+    """Salva i risultati del journal come un nuovo run del modello e restituisce il run id."""
+
+    run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+    connection = connect(db_path)
+    file_ids = {}
+    metrics, issues = [], []
+
+    def flush():
+        connection.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?)", metrics)
+        connection.executemany("INSERT INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?)", issues)
+        metrics.clear()
+        issues.clear()
+
+    with connection:
+        # Un run salvato di nuovo con lo stesso id sostituisce il precedente
+        for (old,) in connection.execute("SELECT id FROM runs WHERE model = ? AND run_id = ?", (model, run_id)).fetchall():
+            for table in ("metrics", "issues"):
+                connection.execute(f"DELETE FROM {table} WHERE run = ?", (old,))
+            connection.execute("DELETE FROM runs WHERE id = ?", (old,))
+        run = connection.execute("INSERT INTO runs (model, run_id, created_at) VALUES (?, ?, ?)",
+                                 (model, run_id, time.strftime("%Y-%m-%d %H:%M:%S"))).lastrowid
+        for entry in journal.ordered_entries():
+            path = entry["path"]
+            if path not in file_ids:
+                connection.execute("INSERT OR IGNORE INTO files (path, language) VALUES (?, ?)",
+                                   (path, file_index.language_of(path)))
+                file_ids[path] = connection.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()[0]
+            file_id = file_ids[path]
+
+            for val in entry["valutazioni"]:
+                metrics.append((run, file_id, _text(val[0]), *[_score(v) for v in val[1:6]]))
+            for issue in entry["issues"]:
+                issues.append((run, file_id, _text(issue[0]), _int(issue[1]), *[_text(v) for v in issue[2:6]]))
+            if len(metrics) + len(issues) >= INSERT_BATCH:
+                flush()
+        flush()
+
+    connection.close()
+    return run_id
+
+
+def _column(column):
+    """Espressione SQL di una colonna delle issue, con gli alias usati in _source."""
+
+    if column not in ISSUE_COLUMNS:
+        raise ValueError(f"colonna sconosciuta: {column}")
+    return {"model": "r.model", "path": "f.path"}.get(column, f"i.{column}")
+
+
+def _source(columns):
+    """Issue dell'ultimo run di ogni modello; la tabella files viene unita solo se serve il percorso."""
+
+    # CROSS JOIN fissa l'ordine: prima i run, poi le issue tramite gli indici su run
+    source = "latest_runs r CROSS JOIN issues i ON i.run = r.id"
+    return source + (" JOIN files f ON i.file = f.id" if "path" in columns else "")
+
+
+def latest_query(table, columns=None):
+    """
+    Query delle righe di "valutazioni" o "issues" dell'ultimo run di ogni modello,
+    con le colonne (nomi dei Report, es. "Severità") rinominate come nei CSV.
+    """
+
+    if table == "valutazioni":
+        names = {"Model": "r.model", "File": "m.filename"}
+        names.update({name: f"m.{column}" for column, name in METRIC_COLUMNS.items()})
+        names["FullPath"] = "f.path"
+        source = "latest_runs r CROSS JOIN metrics m ON m.run = r.id JOIN files f ON m.file = f.id"
+    else:
+        names = {name: _column(column) for column, name in ISSUE_COLUMNS.items()}
+        source = _source(ISSUE_COLUMNS)
+    columns = list(names) if columns is None else list(columns)
+    for name in columns:
+        if name not in names:
+            raise ValueError(f"colonna sconosciuta: {name}")
+    return "SELECT " + ", ".join(f'{names[name]} AS "{name}"' for name in columns) + f" FROM {source}"
+
+
+def _where(filters):
+    """Clausola WHERE da una lista di (colonna, operatore, valore) su colonne note."""
+
+    clauses, params = [], []
+    for column, operator, value in filters or []:
+        if operator not in ("=", "!=", "<", "<=", ">", ">=", "LIKE"):
+            raise ValueError(f"operatore non supportato: {operator}")
+        clauses.append(f"{_column(column)} {operator} ?")
+        params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def issue_counts(connection, columns, filters=None, limit=None):
+    """Numero di issue dell'ultimo run di ogni modello, raggruppate per le colonne indicate."""
+
+    where, params = _where(filters)
+    group = ", ".join(_column(column) for column in columns)
+    used = list(columns) + [column for column, _, _ in filters or []]
+    query = f"SELECT {group}, COUNT(*) FROM {_source(used)}{where} GROUP BY {group} ORDER BY COUNT(*) DESC"
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    return connection.execute(query, params).fetchall()
+
+
+def total_issues(connection, filters=None):
+    where, params = _where(filters)
+    used = [column for column, _, _ in filters or []]
+    return connection.execute(f"SELECT COUNT(*) FROM {_source(used)}{where}", params).fetchone()[0]
+
+
+def metric_means(connection, by_model=False):
+    """Media di ogni metrica sull'ultimo run di ogni modello (per modello con by_model)."""
+
+    averages = ", ".join(f"AVG(m.{column})" for column in METRIC_COLUMNS)
+    query = f"SELECT r.model, {averages} FROM latest_runs r CROSS JOIN metrics m ON m.run = r.id"
+    if by_model:
+        return connection.execute(query + " GROUP BY r.model ORDER BY r.model").fetchall()
+    return connection.execute(query.replace("r.model, ", "", 1)).fetchall()
+
+
+def issues_page(connection, offset, limit, filters=None, sort=None):
+    """
+    Una pagina di issue; sort e' una lista di (colonna, "asc"/"desc").
+    Filtro e ordinamento scelgono solo i rowid della pagina, le righe
+    complete (con i testi lunghi) vengono lette dopo per quei rowid.
+    """
+
+    sort = list(sort or [])
+    where, params = _where(filters)
+    order = [f"{_column(column)} {'DESC' if direction == 'desc' else 'ASC'}" for column, direction in sort]
+    used = [column for column, _ in sort] + [column for column, _, _ in filters or []]
+    query = f"SELECT i.rowid FROM {_source(used)}{where}"
+    if order:
+        # A parita' decide il rowid, nella stessa direzione dell'ultima colonna (cosi' l'indice resta usabile)
+        query += " ORDER BY " + ", ".join(order + [f"i.rowid {order[-1].rsplit(' ', 1)[1]}"])
+    query += " LIMIT ? OFFSET ?"
+    ids = [row[0] for row in connection.execute(query, params + [int(limit), int(offset)])]
+    if not ids:
+        return []
+
+    columns = ", ".join(_column(column) for column in ISSUE_COLUMNS)
+    rows = connection.execute(f"SELECT i.rowid, {columns} FROM issues i JOIN runs r ON i.run = r.id "
+                              f"JOIN files f ON i.file = f.id WHERE i.rowid IN ({', '.join('?' * len(ids))})", ids)
+    by_id = {row[0]: row[1:] for row in rows}
+    return [by_id[rowid] for rowid in ids]
+
+
+CLUSTER_COLUMNS = {"id": "ClusterId", "path": "FullPath", "line": "Riga", "line_end": "RigaFine", "tipo": "Tipo",
+                   "severita": "Severità", "descrizione": "Descrizione", "models": "Modelli", "hits": "Modelli concordi"}
+
+
+def latest_issue_rows(connection):
+    """(rowid, modello, percorso, riga, tipo, severita', descrizione) delle issue dell'ultimo run, per file."""
+
+    return connection.execute("SELECT i.rowid, r.model, f.path, i.line, i.tipo, i.severita, i.descrizione "
+                              f"FROM {_source(['path'])} ORDER BY i.file, i.line")
+
+
+def replace_clusters(connection, clusters, members):
+    """Sostituisce i cluster salvati; clusters sono tuple nell'ordine di CLUSTER_COLUMNS, members (rowid, id)."""
+
+    with connection:
+        connection.execute("DELETE FROM cluster_members")
+        connection.execute("DELETE FROM clusters")
+        connection.executemany(f"INSERT INTO clusters VALUES ({', '.join('?' * len(CLUSTER_COLUMNS))})", clusters)
+        connection.executemany("INSERT INTO cluster_members VALUES (?, ?)", members)
+
+
+def cluster_count(connection, min_hits=1):
+    return connection.execute("SELECT COUNT(*) FROM clusters WHERE hits >= ?", (min_hits,)).fetchone()[0]
+
+
+def clusters_page(connection, offset, limit, min_hits=1):
+    """Una pagina di cluster con almeno min_hits modelli, prima quelli segnalati da piu' modelli."""
+
+    return connection.execute(f"SELECT {', '.join(CLUSTER_COLUMNS)} FROM clusters WHERE hits >= ? "
+                              "ORDER BY hits DESC, path, line LIMIT ? OFFSET ?",
+                              (min_hits, int(limit), int(offset))).fetchall()
@@ -0,0 +1,183 @@
+import os
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+import results_db
+import review_schema
+import run_journal
+
+# Archivio colonnare dei risultati: un file Parquet per tabella, modello e run,
+# in Report/results/<valutazioni|issues>/model=<modello>/run=<id>.parquet
+RESULTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Report", "results"))
+
+# Voci del journal accumulate prima di scrivere un row group
+ROW_GROUP_ENTRIES = 5000
+
+METRIC_NAMES = run_journal.VALUTAZIONI_COLUMNS[1:6]
+
+TABLES = ("valutazioni", "issues")
+
+
+def available():
+    return pa is not None
+
+
+def _schema(table):
+    category = pa.dictionary(pa.int32(), pa.string())
+    if table == "valutazioni":
+        return pa.schema([("Model", category), ("RunId", category), ("File", pa.string())]
+                         + [(name, pa.int8()) for name in METRIC_NAMES]
+                         + [("FullPath", pa.string())])
+    return pa.schema([("Model", category), ("RunId", category), ("File", pa.string()), ("Riga", pa.int32()),
+                      ("Tipo", category), ("Severità", category), ("Descrizione", pa.string()),
+                      ("Suggerimento", pa.string()), ("FullPath", pa.string())])
+
+
+def _int(value, low, high):
+    """Intero nell'intervallo, oppure None per valori come "Unknown"."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if low <= value <= high else None
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _rows(table, entry):
+    """Righe tipizzate (senza Model/RunId) di una voce del journal; FullPath e' il percorso reale del file."""
+
+    path = entry["path"]
+    if table == "valutazioni":
+        for val in entry["valutazioni"]:
+            yield ([_text(val[0])] + [_int(v, review_schema.SCORE_MIN, review_schema.SCORE_MAX) for v in val[1:6]]
+                   + [path])
+    else:
+        for issue in entry["issues"]:
+            yield [_text(issue[0]), _int(issue[1], 0, 2 ** 31 - 1)] + [_text(v) for v in issue[2:6]] + [path]
+
+
+def _path(table, model, run_id, directory=RESULTS_DIR):
+    return os.path.join(directory, table, f"model={model}", f"run={run_id}.parquet")
+
+
+def _write_batch(writer, schema, model, run_id, rows):
+    columns = list(zip(*rows))
+    arrays = [pa.array([model] * len(rows), pa.string()).dictionary_encode(),
+              pa.array([run_id] * len(rows), pa.string()).dictionary_encode()]
+    for field, values in zip(list(schema)[2:], columns):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def write_journal(journal, model, run_id=None, directory=RESULTS_DIR):
+    """
+    Scrive i risultati del journal nell'archivio, a row group di ROW_GROUP_ENTRIES
+    voci, senza caricare tutto il run in memoria. Restituisce il run id.
+    """
+
+    run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+    writers = {}
+    buffers = {table: [] for table in TABLES}
+    for table in TABLES:
+        path = _path(table, model, run_id, directory)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        writers[table] = pq.ParquetWriter(path + ".tmp", _schema(table))
+
+    for n, entry in enumerate(journal.ordered_entries(), start=1):
+        for table in TABLES:
+            buffers[table].extend(_rows(table, entry))
+        if n % ROW_GROUP_ENTRIES == 0:
+            for table in TABLES:
+                # Un blocco di voci puo' non avere issue: pyarrow non accetta row group vuoti
+                if buffers[table]:
+                    _write_batch(writers[table], _schema(table), model, run_id, buffers[table])
+                buffers[table] = []
+
+    for table in TABLES:
+        if buffers[table]:
+            _write_batch(writers[table], _schema(table), model, run_id, buffers[table])
+        writers[table].close()
+        path = _path(table, model, run_id, directory)
+        os.replace(path + ".tmp", path)
+    return run_id
+
+
+def runs(table, directory=RESULTS_DIR):
+    """{modello: [run id in ordine cronologico]} presenti nell'archivio."""
+
+    result = {}
+    root = os.path.join(directory, table)
+    if not os.path.isdir(root):
+        return result
+    for model_dir in sorted(os.listdir(root)):
+        if not model_dir.startswith("model="):
+            continue
+        run_ids = sorted(name[len("run="):-len(".parquet")] for name in os.listdir(os.path.join(root, model_dir))
+                         if name.startswith("run=") and name.endswith(".parquet"))
+        if run_ids:
+            result[model_dir[len("model="):]] = run_ids
+    return result
+
+
+def _latest_paths(table, models=None, run_id=None, directory=RESULTS_DIR):
+    """File Parquet da leggere: per ogni modello il run run_id se presente, altrimenti l'ultimo."""
+
+    for model, model_runs in runs(table, directory).items():
+        if models is not None and model not in models:
+            continue
+        chosen = run_id if run_id in model_runs else model_runs[-1]
+        yield _path(table, model, chosen, directory)
+
+
+def load(table, columns=None, models=None, run_id=None, directory=RESULTS_DIR):
+    """
+    DataFrame della tabella "valutazioni" o "issues" per tutti i modelli (o quelli
+    in models), leggendo solo le colonne richieste. Per ogni modello si usa il run
+    run_id se presente, altrimenti l'ultimo. Model, RunId, Tipo e Severità sono
+    categoriali. Restituisce None se l'archivio e' vuoto.
+    """
+
+    tables = [pq.read_table(path, columns=columns) for path in _latest_paths(table, models, run_id, directory)]
+    if not tables:
+        return None
+    return pa.concat_tables(tables).to_pandas()
+
+
+def iter_batches(table, columns=None, batch_size=ROW_GROUP_ENTRIES * 10, models=None, run_id=None,
+                 directory=RESULTS_DIR):
+    """Come load, ma un DataFrame di al massimo batch_size righe alla volta."""
+
+    for path in _latest_paths(table, models, run_id, directory):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+
+
+def export_run(journal, cartella_destinazione, output_name, csv=False):
+    """
+    Salva i risultati del journal nel database SQLite, nell'archivio Parquet e,
+    con csv=True o se pyarrow non e' installato, nei CSV Valutazioni_/Issues_
+    come in passato, tutti in cartella_destinazione (results.db, results/).
+    Database e archivio usano lo stesso run id.
+    """
+
+    db_path = os.path.join(cartella_destinazione, os.path.basename(results_db.DB_PATH))
+    directory = os.path.join(cartella_destinazione, os.path.basename(RESULTS_DIR))
+    run_id = results_db.write_journal(journal, output_name, db_path=db_path)
+    print(f"Risultati salvati in {db_path} (modello {output_name}, run {run_id})")
+    if available():
+        write_journal(journal, output_name, run_id, directory)
+        print(f"Risultati salvati in {directory} (modello {output_name}, run {run_id})")
+    if csv or not available():
+        journal.export_csv(os.path.join(cartella_destinazione, f"Valutazioni_{output_name}.csv"),
+                           os.path.join(cartella_destinazione, f"Issues_{output_name}.csv"))
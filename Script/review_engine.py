@@ -0,0 +1,396 @@
+import os
+import asyncio
+
+import chunker
+import packer
+import file_index
+import review_schema
+
+# Estensione dei file di codice da analizzare
+CODE_EXTENSIONS = {".py", ".js", ".java", ".cpp", ".cs", ".ts", ".c"}
+
+# Numero massimo di richieste contemporanee verso il provider
+MAX_IN_FLIGHT = 8
+
+
+def walk_code_files(folder_path, extensions=CODE_EXTENSIONS, max_files=None, exclude=None):
+    """
+    Restituisce i percorsi dei file di codice nello stesso ordine di os.walk,
+    esclusi quelli ignorati da .gitignore o dai glob di exclude.
+    """
+
+    file_paths = []
+    for path in file_index.walk_files(folder_path, extensions, exclude):
+        if max_files is not None and len(file_paths) >= max_files:
+            break
+        file_paths.append(path)
+    return file_paths
+
+
+def append_full_path(valutazioni, issues, file_path):
+    """Aggiunge la colonna FullPath, calcolata come negli script seriali originali."""
+
+    full_path = os.path.abspath(os.path.basename(file_path))
+    for val in valutazioni:
+        val.append([full_path])
+    for issue in issues:
+        issue.append([full_path])
+
+
+class ReviewTarget:
+    """
+    Un provider/modello a cui inviare le revisioni.
+
+    request_review e' una coroutine che riceve il codice e restituisce il testo
+    della risposta (o None); parse_response lo converte in (valutazioni, issues).
+    Ogni target ha il proprio limite di richieste in volo, la propria cache e
+    il proprio journal. Con max_chunk_tokens i file piu' grandi vengono divisi
+    con chunker.split_code e i risultati delle parti riuniti in uno solo; con
+    pack_max_tokens i file piccoli vengono raggruppati in un'unica richiesta
+    e la risposta divisa di nuovo per Filename. repair_review, se indicata, e'
+    una coroutine che riceve una risposta non interpretabile e chiede al
+    modello di correggerla; l'esito del parsing e' raccolto in parse_stats.
+    Con max_files il target revisiona solo i primi max_files file della cartella.
+    """
+
+    def __init__(self, request_review, parse_response, max_in_flight=MAX_IN_FLIGHT,
+                 cache=None, journal=None, name=None, max_chunk_tokens=None,
+                 pack_max_tokens=None, pack_max_files=packer.PACK_MAX_FILES, repair_review=None,
+                 max_files=None):
+        self.request_review = request_review
+        self.parse_response = parse_response
+        self.repair_review = repair_review
+        self.parse_stats = review_schema.ParseStats()
+        self.max_in_flight = max_in_flight
+        self.max_chunk_tokens = max_chunk_tokens
+        self.pack = packer.PackBin(pack_max_tokens, pack_max_files) if pack_max_tokens else None
+        self.cache = cache
+        self.journal = journal
+        self.name = name
+        self.max_files = max_files
+
+        # Contatori per la stampa dell'avanzamento
+        self.files_tot = 0
+        self.started = 0
+        self.issues = 0
+        self.valutazioni = 0
+        self.results = {}
+
+    def _log(self, text):
+        print(f"[{self.name}] {text}" if self.name else text)
+
+
+async def _request(code, file_name, target, semaphore):
+    """Invia il codice al provider e restituisce (risposta, valutazioni, issues), oppure None."""
+
+    async with semaphore:
+        try:
+            response_text = await target.request_review(code)
+            if response_text is None:
+                target._log(f"analyze_code Error: nessuna risposta per {file_name}")
+                return None
+
+            valutazioni, issues = target.parse_response(response_text)
+
+            # Risposta non interpretabile: si chiede al modello di correggerla invece di perderla
+            repaired = False
+            if not (valutazioni or issues) and target.repair_review is not None:
+                target._log(f"Risposta non valida per {file_name}, richiesta di correzione")
+                repaired_text = await target.repair_review(response_text)
+                if repaired_text is not None:
+                    valutazioni, issues = target.parse_response(repaired_text)
+                    if valutazioni or issues:
+                        response_text = repaired_text
+                        repaired = True
+
+            target.parse_stats.add(bool(valutazioni or issues), repaired)
+            return response_text, valutazioni, issues
+        except Exception as e:
+            target._log(f"analyze_code Error: {e}")
+            return None
+
+
+async def _review_chunk(code, file_name, target, semaphore, lookup=True):
+    """
+    Revisiona un file (o una sua parte) e restituisce (valutazioni, issues), oppure None.
+    Con lookup=False la cache non viene consultata (il chiamante l'ha gia' fatto).
+    """
+
+    cached = target.cache.get(code) if target.cache is not None and lookup else None
+    if cached is not None:
+        _, valutazioni, issues = cached
+        return valutazioni, issues
+
+    result = await _request(code, file_name, target, semaphore)
+    if result is None:
+        return None
+    response_text, valutazioni, issues = result
+
+    # Le risposte non interpretabili non vengono salvate ne' registrate nel journal,
+    # cosi' il prossimo run (o --resume) le ritenta
+    if not (valutazioni or issues):
+        target._log(f"analyze_code Error: risposta non interpretabile per {file_name}")
+        return None
+    if target.cache is not None:
+        target.cache.put(code, response_text, valutazioni, issues)
+    return valutazioni, issues
+
+
+def _record(index, file_path, valutazioni, issues, target):
+    """Registra il risultato di un file nel journal (o in memoria)."""
+
+    append_full_path(valutazioni, issues, file_path)
+
+    target.valutazioni += len(valutazioni)
+    target.issues += len(issues)
+    target._log(f"Issue: {target.issues} Evaluation: {target.valutazioni}")
+
+    if target.journal is not None:
+        target.journal.append(index, file_path, valutazioni, issues)
+    else:
+        target.results[index] = (valutazioni, issues)
+
+
+async def _review_pack(items, target, semaphore):
+    """
+    Revisiona con una sola richiesta i file (index, file_path, code) raccolti nel PackBin.
+    I file che mancano nella risposta vengono revisionati singolarmente.
+    I file arrivano qui solo dopo un miss in _review_code: la cache non viene riletta.
+    """
+
+    if len(items) == 1:
+        index, file_path, code = items[0]
+        result = await _review_chunk(code, os.path.basename(file_path), target, semaphore, lookup=False)
+        if result is not None:
+            _record(index, file_path, result[0], result[1], target)
+        return
+
+    labels = packer.labels_for([file_path for _, file_path, _ in items])
+    target._log(f"{len(items)} file in una richiesta: {', '.join(labels)}")
+    result = await _request(packer.pack_code(labels, [code for _, _, code in items]),
+                            ", ".join(labels), target, semaphore)
+    if result is None:
+        return
+    response_text, valutazioni, issues = result
+
+    retry = []
+    for (index, file_path, code), file_result in zip(items, packer.split_results(labels, valutazioni, issues)):
+        if file_result is None:
+            retry.append((index, file_path, code))
+            continue
+        if target.cache is not None:
+            target.cache.put(code, response_text, file_result[0], file_result[1])
+        _record(index, file_path, file_result[0], file_result[1], target)
+
+    if retry:
+        target._log(f"{len(retry)} file assenti nella risposta, revisionati singolarmente")
+        await asyncio.gather(*(_review_pack([item], target, semaphore) for item in retry))
+
+
+async def _review_code(index, file_path, code, target, semaphore, segments=None):
+    """
+    Revisiona un file. segments, se indicato, e' una lista di (riga iniziale, codice):
+    vengono revisionate solo quelle parti del file (es. le modifiche di un diff).
+    """
+
+    file_name = os.path.basename(file_path)
+
+    target.started += 1
+    target._log(f"{target.started} di {target.files_tot} : {file_name}")
+
+    # I file piccoli attendono nel PackBin e partono insieme quando il gruppo e' pieno
+    if segments is None and target.pack is not None and \
+            packer.is_small(code, min(packer.SMALL_FILE_TOKENS, target.pack.max_tokens)):
+        cached = target.cache.get(code) if target.cache is not None else None
+        if cached is not None:
+            _record(index, file_path, cached[1], cached[2], target)
+            return
+
+        if not target.pack.fits(code):
+            await _review_pack(target.pack.take(), target, semaphore)
+        target.pack.add((index, file_path, code), code)
+        if target.pack.is_full():
+            await _review_pack(target.pack.take(), target, semaphore)
+        return
+
+    # I file troppo grandi vengono divisi e le parti revisionate in parallelo
+    chunks = segments or [(1, code)]
+    if target.max_chunk_tokens is not None:
+        chunks = [(start + offset - 1, piece) for start, text in chunks
+                  for offset, piece in chunker.split_code(text, file_path, target.max_chunk_tokens)]
+        if len(chunks) > 1:
+            target._log(f"{file_name} diviso in {len(chunks)} parti")
+
+    results = await asyncio.gather(*(
+        _review_chunk(chunk, file_name, target, semaphore) for _, chunk in chunks
+    ))
+
+    # Se una parte fallisce il file non viene registrato, cosi' --resume lo ritenta
+    if any(result is None for result in results):
+        return
+
+    if len(chunks) > 1 or chunks[0][0] != 1:
+        valutazioni, issues = chunker.merge_results(chunks, results)
+    else:
+        valutazioni, issues = results[0]
+
+    _record(index, file_path, valutazioni, issues, target)
+
+
+def _record_cached(index, file_path, code_hash, target):
+    """Registra dalla cache, tramite l'hash dell'indice, la revisione di un file invariato; True se trovata."""
+
+    cached = target.cache.get_hash(code_hash) if target.cache is not None else None
+    if cached is None:
+        return False
+    target.started += 1
+    target._log(f"{target.started} di {target.files_tot} : {os.path.basename(file_path)}")
+    _record(index, file_path, cached[1], cached[2], target)
+    return True
+
+
+async def _review_file(index, file_path, targets, semaphores, segments=None, files=None):
+    todo = [t for t in targets if (t.max_files is None or index < t.max_files)
+            and (t.journal is None or file_path not in t.journal.done)]
+    if not todo:
+        return
+
+    # Con l'hash del contenuto nell'indice le revisioni in cache si registrano senza leggere il file
+    entry = files.files.get(file_path) if files is not None and segments is None else None
+    if entry is not None and entry["hash"] is not None:
+        todo = [t for t in todo if not _record_cached(index, file_path, entry["hash"], t)]
+        if not todo:
+            return
+
+    # Il file viene letto una sola volta, fuori dall'event loop, e inviato a tutti i target
+    try:
+        code = await asyncio.to_thread(file_index.read_code, file_path)
+    except Exception as e:
+        print(f"analyze_code Error: {e}")
+        return
+    if files is not None:
+        files.set_hash(file_path, code)
+
+    await asyncio.gather(*(
+        _review_code(index, file_path, code, target, semaphores[target], segments)
+        for target in todo
+    ))
+
+
+async def review_targets_async(folder_path, targets, extensions=CODE_EXTENSIONS,
+                               max_files=None, files_tot=None, max_files_in_memory=None,
+                               file_paths=None, segments=None, exclude=None, index_dir=file_index.INDEX_DIR):
+    """
+    Percorre la cartella una sola volta e invia ogni file a tutti i target in parallelo.
+
+    I file vengono elencati dall'indice persistente (file_index.FileIndex),
+    che rispetta .gitignore e i glob di exclude (con index_dir=None l'indice
+    non viene salvato su disco); dei file invariati gia' in cache la revisione
+    viene registrata senza leggerli. I file vengono messi in una coda da cui
+    max_files_in_memory worker (predefinito: il doppio del max_in_flight piu'
+    alto) li leggono e li revisionano. Ogni target rispetta il proprio
+    max_in_flight, cosi' il tempo totale tende a quello del provider piu'
+    lento invece che alla somma dei provider.
+
+    Con file_paths vengono revisionati solo quei file invece dell'intera cartella;
+    segments ({percorso: [(riga iniziale, codice)]}) limita la revisione di un
+    file alle parti indicate (vedi incremental_review).
+    """
+
+    files = None
+    if file_paths is None:
+        files = file_index.FileIndex(folder_path, extensions, exclude, index_dir=index_dir)
+        file_paths = [entry["path"] for entry in files.scan(max_files)]
+        print(files.summary())
+    segments = segments or {}
+
+    for target in targets:
+        own_paths = file_paths[:target.max_files]
+        target.files_tot = files_tot if files_tot is not None else len(own_paths)
+        if target.journal is not None and target.journal.done:
+            gia_fatti = sum(1 for path in own_paths if path in target.journal.done)
+            target._log(f"Ripresa: {gia_fatti} file gia' nel journal, {len(own_paths) - gia_fatti} da revisionare")
+
+    if max_files_in_memory is None:
+        max_files_in_memory = 2 * max(target.max_in_flight for target in targets)
+    semaphores = {target: asyncio.Semaphore(target.max_in_flight) for target in targets}
+    queue = asyncio.Queue(maxsize=max_files_in_memory)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, file_path = item
+            await _review_file(index, file_path, targets, semaphores, segments.get(file_path), files)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max_files_in_memory)]
+    for item in enumerate(file_paths):
+        await queue.put(item)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+
+    # Ultimi gruppi di file piccoli rimasti incompleti
+    await asyncio.gather(*(
+        _review_pack(target.pack.take(), target, semaphores[target])
+        for target in targets if target.pack is not None and target.pack.items
+    ))
+
+    # Salvato a revisione finita, con gli hash dei file letti durante il run
+    if files is not None:
+        files.save()
+
+    for target in targets:
+        target._log(target.parse_stats.summary())
+        if target.cache is not None:
+            target._log(target.cache.summary())
+
+
+async def process_folder_async(folder_path, request_review, parse_response,
+                               max_in_flight=MAX_IN_FLIGHT, extensions=CODE_EXTENSIONS,
+                               max_files=None, files_tot=None, cache=None, journal=None,
+                               max_chunk_tokens=None, pack_max_tokens=None, pack_max_files=packer.PACK_MAX_FILES,
+                               repair_review=None, exclude=None, index_dir=file_index.INDEX_DIR):
+    """
+    Elabora una cartella inviando le revisioni in parallelo a un solo provider.
+
+    Al massimo max_in_flight richieste sono attive contemporaneamente e i
+    risultati vengono riordinati secondo l'ordine di os.walk, cosi' i CSV
+    prodotti coincidono con quelli dell'elaborazione seriale.
+
+    Se viene passata una ResponseCache, i file gia' revisionati con lo stesso
+    prompt e modello vengono letti dalla cache senza chiamare il provider.
+
+    Con pack_max_tokens i file piccoli vengono inviati a gruppi (vedi packer);
+    con repair_review le risposte non interpretabili vengono fatte correggere.
+
+    Con un RunJournal ogni file completato viene scritto subito nel journal
+    invece di essere accumulato: le liste restituite sono vuote, i file gia'
+    presenti nel journal vengono saltati e i CSV si ottengono con export_csv.
+    """
+
+    target = ReviewTarget(request_review, parse_response, max_in_flight, cache, journal,
+                          max_chunk_tokens=max_chunk_tokens, pack_max_tokens=pack_max_tokens,
+                          pack_max_files=pack_max_files, repair_review=repair_review)
+    await review_targets_async(folder_path, [target], extensions, max_files, files_tot,
+                               max_files_in_memory=max_in_flight, exclude=exclude, index_dir=index_dir)
+
+    valutazioni_list = []
+    issues_list = []
+    for index in sorted(target.results):
+        valutazioni, issues = target.results[index]
+        valutazioni_list.extend(valutazioni)
+        issues_list.extend(issues)
+
+    return valutazioni_list, issues_list
+
+
+def process_folder(folder_path, request_review, parse_response, **kwargs):
+    """Versione sincrona di process_folder_async per gli script."""
+    return asyncio.run(process_folder_async(folder_path, request_review, parse_response, **kwargs))
+
+
+def review_targets(folder_path, targets, **kwargs):
+    """Versione sincrona di review_targets_async."""
+    return asyncio.run(review_targets_async(folder_path, targets, **kwargs))
@@ -0,0 +1,159 @@
+import re
+import json
+
+# Scala dei punteggi delle metriche richiesta nel prompt
+SCORE_MIN = 1
+SCORE_MAX = 5
+
+# Schema JSON della risposta di revisione, lo stesso dell'esempio nei PROMPT_TEMPLATE
+METRICA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Filename": {"type": "string"},
+        "Manutenibilità": {"type": "integer", "description": "punteggio da 1 a 5"},
+        "Leggibilità": {"type": "integer", "description": "punteggio da 1 a 5"},
+        "Performance": {"type": "integer", "description": "punteggio da 1 a 5"},
+        "Sicurezza": {"type": "integer", "description": "punteggio da 1 a 5"},
+        "Modularità": {"type": "integer", "description": "punteggio da 1 a 5"},
+    },
+    "required": ["Filename", "Manutenibilità", "Leggibilità", "Performance", "Sicurezza", "Modularità"],
+    "additionalProperties": False,
+}
+
+ISSUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Filename": {"type": "string"},
+        "Line": {"type": "integer", "description": "riga del codice, numero positivo"},
+        "Tipo": {"type": "string"},
+        "Severità": {"type": "string", "enum": ["Bassa", "Media", "Alta"]},
+        "Descrizione": {"type": "string"},
+        "Suggestion": {"type": "string"},
+    },
+    "required": ["Filename", "Line", "Tipo", "Severità", "Descrizione", "Suggestion"],
+    "additionalProperties": False,
+}
+
+REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Metriche": {"type": "array", "items": METRICA_SCHEMA},
+        "Issue": {"type": "array", "items": ISSUE_SCHEMA},
+    },
+    "required": ["Metriche", "Issue"],
+    "additionalProperties": False,
+}
+
+# Nome dello schema (OpenAI) e dello strumento (Anthropic) con cui il modello restituisce la revisione
+SCHEMA_NAME = "revisione_codice"
+
+# Prompt per correggere una risposta non interpretabile senza inviare di nuovo il codice
+REPAIR_TEMPLATE = """
+    La seguente risposta doveva essere un JSON valido con le chiavi "Metriche" e "Issue",
+    ma non e' interpretabile. Correggila senza cambiarne i valori e restituisci solo il JSON,
+    senza alcun testo aggiuntivo:
+
+    {response}
+    """
+
+
+def openai_response_format():
+    """response_format per OpenAI: json_schema in modalita' strict."""
+    return {"type": "json_schema", "json_schema": {"name": SCHEMA_NAME, "schema": REVIEW_SCHEMA, "strict": True}}
+
+
+def anthropic_tool():
+    """Strumento Anthropic il cui input e' la revisione: con tool_choice forzato il modello deve rispettare lo schema."""
+    return {"name": SCHEMA_NAME, "description": "Registra metriche e issue della revisione del codice.",
+            "input_schema": REVIEW_SCHEMA}
+
+
+def gemini_schema(schema=REVIEW_SCHEMA):
+    """Schema per response_schema di Gemini, che non accetta additionalProperties."""
+
+    if isinstance(schema, dict):
+        return {key: gemini_schema(value) for key, value in schema.items() if key != "additionalProperties"}
+    if isinstance(schema, list):
+        return [gemini_schema(value) for value in schema]
+    return schema
+
+
+def _decode_objects(text):
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            data, _ = decoder.raw_decode(text, start)
+            if isinstance(data, dict):
+                yield data
+        except ValueError:
+            pass
+        start = text.find("{", start + 1)
+
+
+def extract_json(text):
+    """
+    Estrae la revisione JSON da una risposta, ignorando recinti markdown e testo
+    prima o dopo l'oggetto e tollerando virgole finali. Restituisce il dict, oppure None.
+    """
+
+    if not text:
+        return None
+
+    first = None
+    for candidate in (text, re.sub(r",\s*([}\]])", r"\1", text)):
+        for data in _decode_objects(candidate):
+            if "Metriche" in data or "Issue" in data:
+                return data
+            first = first if first is not None else data
+    return first
+
+
+def parse_review(response):
+    """
+    Converte la risposta del modello in (valutazioni, issues): liste di righe
+    [Filename, Manutenibilità, Leggibilità, Performance, Sicurezza, Modularità]
+    e [Filename, Line, Tipo, Severità, Descrizione, Suggestion]. Restituisce
+    due liste vuote se la risposta non e' interpretabile.
+    """
+
+    data = extract_json(response)
+    if data is None:
+        print("Errore nel parsing del JSON: Formato non valido.")
+        return [], []
+
+    try:
+        metriche_list = [[m.get("Filename", "Unknown"), m.get("Manutenibilità", "Unknown"),
+                          m.get("Leggibilità", "Unknown"), m.get("Performance", "Unknown"),
+                          m.get("Sicurezza", "Unknown"), m.get("Modularità", "Unknown")]
+                         for m in data.get("Metriche", [])]
+        issue_list = [[m.get("Filename", "Unknown"), m.get("Line", 0), m.get("Tipo", "N/A"),
+                       m.get("Severità", "N/A"), m.get("Descrizione", "N/A"), m.get("Suggestion", "N/A")]
+                      for m in data.get("Issue", [])]
+        return metriche_list, issue_list
+    except Exception as e:
+        print(f"Errore inatteso: {e}")
+        return [], []
+
+
+class ParseStats:
+    """Risposte interpretate, riparate e scartate per un modello."""
+
+    def __init__(self):
+        self.ok = 0
+        self.repaired = 0
+        self.failed = 0
+
+    def add(self, ok, repaired=False):
+        if not ok:
+            self.failed += 1
+        elif repaired:
+            self.repaired += 1
+        else:
+            self.ok += 1
+
+    def summary(self):
+        total = self.ok + self.repaired + self.failed
+        rate = 100 * (self.ok + self.repaired) / total if total else 0
+        return (f"Parsing: {self.ok + self.repaired}/{total} risposte valide ({rate:.1f}%), "
+                f"{self.repaired} dopo la riparazione, {self.failed} scartate")
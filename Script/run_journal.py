@@ -0,0 +1,152 @@
+import os
+import csv
+import json
+
+# Colonne dei CSV prodotti dagli script
+VALUTAZIONI_COLUMNS = ["File", "Manutenibilità", "Leggibilità", "Performance", "Sicurezza", "Modularità", "FullPath"]
+ISSUES_COLUMNS = ["File", "Riga", "Tipo", "Severità", "Descrizione", "Suggerimento", "FullPath"]
+
+# Nei CSV FullPath e' abspath(nome del file) tra parentesi quadre, come negli script originali:
+# non identifica il file, quindi nel database e nei Report diventa "legacy:<nome del file>"
+LEGACY_PATH_PREFIX = "legacy:"
+
+
+def normalize_path(path):
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
+
+
+def legacy_path(full_path):
+    """Percorso marcato come legacy dal FullPath di un CSV (es. "['/cartella/main.py']" -> "legacy:main.py")."""
+
+    text = str(full_path).strip()
+    if text.startswith("[") and text.endswith("]"):
+        text = text[1:-1].strip().strip("'\"")
+    return LEGACY_PATH_PREFIX + text.replace("\\", "/").rsplit("/", 1)[-1]
+
+
+def is_legacy_path(path):
+    return str(path).startswith(LEGACY_PATH_PREFIX)
+
+
+class RunJournal:
+    """
+    Journal append-only (JSONL) dei file gia' revisionati in un run.
+
+    Ogni file completato viene scritto subito su disco con le sue righe di
+    Metriche/Issue, cosi' un'interruzione non perde il lavoro fatto e la
+    memoria resta costante per file. Con resume=True i file gia' presenti nel
+    journal vengono saltati; altrimenti il journal viene azzerato.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.done = set()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if resume and os.path.exists(path):
+            self._truncate_partial_line()
+            for _, entry in self._entries():
+                self.done.add(entry["path"])
+        else:
+            open(path, "w").close()
+
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _truncate_partial_line(self):
+        """Elimina un'eventuale ultima riga incompleta lasciata da un'interruzione."""
+
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _entries(self):
+        """Restituisce (offset, voce) per ogni riga valida del journal."""
+
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    yield offset, json.loads(line)
+                except ValueError:
+                    pass
+                offset += len(line)
+
+    def append(self, index, file_path, valutazioni, issues):
+        entry = {"index": index, "path": file_path, "valutazioni": valutazioni, "issues": issues}
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done.add(file_path)
+
+    def find(self, paths):
+        """Restituisce {percorso normalizzato: voce} per le voci dei file indicati, senza modificare il journal."""
+
+        wanted = {normalize_path(path) for path in paths}
+        found = {}
+        for _, entry in self._entries():
+            key = normalize_path(entry["path"])
+            if key in wanted:
+                found[key] = entry
+        return found
+
+    def replace(self, entries, deleted=()):
+        """
+        Sostituisce le voci dei file in entries (dizionari come quelli scritti da append)
+        e toglie quelle dei file in deleted, con un'unica riscrittura atomica del journal:
+        un'interruzione lascia il journal precedente intatto.
+        """
+
+        discarded = {normalize_path(entry["path"]) for entry in entries}
+        discarded.update(normalize_path(path) for path in deleted)
+        self._file.close()
+
+        tmp_path = self.path + ".tmp"
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+            for line in src:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if normalize_path(entry["path"]) not in discarded:
+                    dst.write(line)
+            for entry in entries:
+                dst.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.path)
+
+        self.done = {path for path in self.done if normalize_path(path) not in discarded}
+        self.done.update(entry["path"] for entry in entries)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self._file.close()
+
+    def ordered_entries(self):
+        """
+        Voci del journal nell'ordine di os.walk.
+        Legge una voce alla volta tramite il suo offset, senza caricare il journal in memoria.
+        """
+
+        self._file.flush()
+        order = sorted((entry["index"], offset) for offset, entry in self._entries())
+
+        with open(self.path, "rb") as journal:
+            for _, offset in order:
+                journal.seek(offset)
+                yield json.loads(journal.readline())
+
+    def export_csv(self, valutazioni_path, issues_path):
+        """Scrive i CSV Valutazioni/Issues dal journal nell'ordine di os.walk."""
+
+        with open(valutazioni_path, "w", newline="", encoding="utf-8") as fv, \
+                open(issues_path, "w", newline="", encoding="utf-8") as fi:
+            writer_v = csv.writer(fv, lineterminator=os.linesep)
+            writer_i = csv.writer(fi, lineterminator=os.linesep)
+            writer_v.writerow(VALUTAZIONI_COLUMNS)
+            writer_i.writerow(ISSUES_COLUMNS)
+
+            for entry in self.ordered_entries():
+                writer_v.writerows(entry["valutazioni"])
+                writer_i.writerows(entry["issues"])
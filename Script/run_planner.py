@@ -0,0 +1,174 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from Define import SourceCode
+import chunker
+import multi_runner
+import packer
+import providers
+import review_engine
+import rate_limiter
+import response_cache
+
+# Stima prima del lancio di token, costo e durata di una revisione, senza chiamare le API.
+# Esempio: python Script/run_planner.py --providers openai,anthropic --folder PANDA_FULL
+
+# Tempo fisso di una richiesta (rete, coda del provider) e velocita' di generazione attesa
+REQUEST_OVERHEAD_SECONDS = 1.0
+OUTPUT_TOKENS_PER_SECOND = 60
+
+# Sconto delle API batch sul prezzo standard
+BATCH_DISCOUNT = 0.5
+
+# Numero di file oltre il contesto elencati nel riepilogo
+MAX_FLAGGED_FILES = 20
+
+
+def plan_provider(provider, file_paths, use_cache=True, pack=False):
+    """
+    Conta richieste e token che il provider riceverebbe per file_paths.
+
+    I file vengono divisi come nel run vero (MAX_CHUNK_TOKENS del provider) e,
+    con pack=True, i file piccoli raggruppati come con --pack; le parti gia'
+    presenti in cache non vengono contate. Restituisce un dict con i totali e
+    l'elenco dei file il cui prompt supera il contesto del modello.
+    """
+
+    count_tokens = provider.count_tokens
+    max_chunk_tokens = provider.MAX_CHUNK_TOKENS
+    output_tokens = rate_limiter.EXPECTED_OUTPUT_TOKENS
+    cache = None
+    if use_cache:
+        cache = response_cache.ResponseCache(response_cache.CACHE_DIR, provider.PROVIDER,
+                                             provider.MODEL_NAME, provider.PROMPT_TEMPLATE)
+
+    pack_bin = None
+    if pack:
+        pack_bin = packer.PackBin(provider.PACK_MAX_TOKENS, provider.PACK_MAX_FILES)
+        small_tokens = min(packer.SMALL_FILE_TOKENS, provider.PACK_MAX_TOKENS)
+
+    def add_request(code):
+        prompt = provider.PROMPT_TEMPLATE.format(code=code)
+        plan["requests"] += 1
+        plan["input_tokens"] += count_tokens(prompt)
+        plan["output_tokens"] += output_tokens
+        # Il rate limiter conta i token con la propria stima, come in request_review_async
+        plan["limiter_tokens"] += rate_limiter.estimate_tokens(prompt) + output_tokens
+
+    def add_pack(items):
+        if len(items) == 1:
+            add_request(items[0][1])
+        elif items:
+            labels = packer.labels_for([file_path for file_path, _ in items])
+            add_request(packer.pack_code(labels, [code for _, code in items]))
+
+    plan = {"files": 0, "requests": 0, "cached": 0, "input_tokens": 0, "output_tokens": 0,
+            "limiter_tokens": 0, "over_context": []}
+    for file_path in file_paths:
+        try:
+            with open(file_path, "r") as f:
+                code = f.read()
+        except Exception as e:
+            print(f"analyze_code Error: {e}")
+            continue
+        plan["files"] += 1
+
+        prompt_tokens = count_tokens(provider.PROMPT_TEMPLATE.format(code=code))
+        if prompt_tokens + output_tokens > provider.CONTEXT_TOKENS:
+            plan["over_context"].append((file_path, prompt_tokens))
+
+        if pack_bin is not None and packer.is_small(code, small_tokens):
+            if cache is not None and cache.get(code) is not None:
+                plan["cached"] += 1
+            else:
+                if not pack_bin.fits(code):
+                    add_pack(pack_bin.take())
+                pack_bin.add((file_path, code), code)
+                if pack_bin.is_full():
+                    add_pack(pack_bin.take())
+            continue
+
+        chunks = [(1, code)] if max_chunk_tokens is None else chunker.split_code(code, file_path, max_chunk_tokens)
+        for _, chunk_code in chunks:
+            if cache is not None and cache.get(chunk_code) is not None:
+                plan["cached"] += 1
+                continue
+            add_request(chunk_code)
+
+    if pack_bin is not None:
+        add_pack(pack_bin.take())
+
+    plan["chunked"] = max_chunk_tokens is not None
+    return plan
+
+
+def estimate_cost(provider, plan):
+    return provider.cost(plan["input_tokens"], plan["output_tokens"])
+
+
+def estimate_seconds(provider, plan):
+    """
+    Durata attesa del run: il massimo tra il limite di richieste/minuto, quello
+    di token/minuto e il tempo delle risposte diviso per le richieste in parallelo.
+    """
+
+    if plan["requests"] == 0:
+        return 0.0
+
+    seconds = [plan["requests"] * (REQUEST_OVERHEAD_SECONDS + rate_limiter.EXPECTED_OUTPUT_TOKENS
+                                   / OUTPUT_TOKENS_PER_SECOND) / provider.MAX_IN_FLIGHT]
+    if provider.REQUESTS_PER_MIN is not None:
+        seconds.append(plan["requests"] / provider.REQUESTS_PER_MIN * 60)
+    if provider.TOKENS_PER_MIN is not None:
+        seconds.append(plan["limiter_tokens"] / provider.TOKENS_PER_MIN * 60)
+    return max(seconds)
+
+
+def format_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h {minutes:02d}m {seconds:02d}s"
+
+
+def print_plan(name, provider, plan):
+    cost = estimate_cost(provider, plan)
+    print(f"[{name}] {provider.MODEL_NAME}")
+    print(f"  File: {plan['files']}, richieste: {plan['requests']} (in cache: {plan['cached']})")
+    print(f"  Token di input: {plan['input_tokens']:,}, token di output attesi: {plan['output_tokens']:,}")
+    print(f"  Costo stimato: ${cost:.2f}" + (f" (con --batch: ${cost * BATCH_DISCOUNT:.2f})"
+                                             if provider.SUPPORTS_BATCH else ""))
+    print(f"  Durata stimata: {format_duration(estimate_seconds(provider, plan))} "
+          f"con {provider.MAX_IN_FLIGHT} richieste in parallelo")
+
+    if plan["over_context"]:
+        azione = "verranno divisi in parti" if plan["chunked"] else "verranno troncati o rifiutati"
+        print(f"  {len(plan['over_context'])} file oltre il contesto di {provider.CONTEXT_TOKENS:,} token ({azione}):")
+        for file_path, tokens in sorted(plan["over_context"], key=lambda x: -x[1])[:MAX_FLAGGED_FILES]:
+            print(f"    {tokens:>9,} token  {file_path}")
+
+
+def plan_run(folder_path, provider_names, max_files=None, use_cache=True, pack=False):
+    """Stampa il piano di revisione di folder_path per ciascun provider indicato."""
+
+    file_paths = review_engine.walk_code_files(folder_path, review_engine.CODE_EXTENSIONS, max_files)
+    print(f"{len(file_paths)} file di codice in {folder_path}")
+
+    for name in provider_names:
+        provider = providers.create(name)
+        print_plan(name, provider, plan_provider(provider, file_paths, use_cache, pack))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stima di token, costo e durata di una revisione")
+    parser.add_argument("--providers", default=",".join(multi_runner.DEFAULT_PROVIDERS),
+                        help=f"elenco separato da virgole tra: {', '.join(multi_runner.PROVIDERS)}")
+    parser.add_argument("--folder", default="PANDA_FULL", help="nome della cartella definita in SourceCode")
+    parser.add_argument("--max-files", type=int, default=None)
+    parser.add_argument("--no-cache", action="store_true", help="conta anche i file gia' presenti in cache")
+    parser.add_argument("--pack", action="store_true", help="stima con i file piccoli raggruppati come con --pack")
+    args = parser.parse_args()
+
+    plan_run(getattr(SourceCode, args.folder), [name.strip() for name in args.providers.split(",") if name.strip()],
+             max_files=args.max_files, use_cache=not args.no_cache, pack=args.pack)
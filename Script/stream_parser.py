@@ -0,0 +1,127 @@
+import json
+
+# Caratteri ammessi prima della '{' iniziale (spazi ed eventuale riga ```json)
+MAX_PREFIX_CHARS = 40
+
+
+class InvalidStreamError(Exception):
+    """La risposta in arrivo non e' JSON: lo stream viene interrotto e la richiesta ritentata."""
+
+    # Ritentata dal RateLimiter anche senza status HTTP (vedi rate_limiter.is_retryable)
+    retryable = True
+
+
+def print_item(key, item):
+    """Stampa una Issue appena completata nello stream."""
+    if key == "Issue":
+        print(f"Issue in arrivo: riga {item.get('Line', '?')} - {item.get('Tipo', 'N/A')} ({item.get('Severità', 'N/A')})")
+
+
+class StreamingReviewParser:
+    """
+    Parser incrementale della risposta JSON di revisione.
+
+    feed() riceve il testo man mano che arriva dallo stream: ogni oggetto degli
+    array di primo livello (Metriche, Issue) viene passato a on_item appena si
+    chiude. Se la risposta non inizia con un JSON (a parte spazi e recinto
+    markdown) o le parentesi non tornano, solleva InvalidStreamError subito,
+    senza attendere il resto della generazione. Quando il JSON e' completo e
+    arriva altro testo, stopped diventa True e il chiamante puo' chiudere lo stream.
+    """
+
+    def __init__(self, on_item=None):
+        self.on_item = on_item
+        self.text = []
+        self.json_text = []
+        self.prefix = ""
+        self.started = False
+        self.done = False
+        self.stopped = False
+        self.items = 0
+
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string = []
+        self._last_key = None
+        self._array_key = None
+        self._item_start = None
+
+    def feed(self, chunk):
+        for char in chunk:
+            if self.stopped:
+                return
+            if self.done:
+                if not (char.isspace() or char == "`"):
+                    self.stopped = True
+                    return
+            elif not self.started:
+                self._feed_prefix(char)
+            else:
+                self._feed_json(char)
+            self.text.append(char)
+
+    def _feed_prefix(self, char):
+        stripped = self.prefix.lstrip()
+        fence_line, newline, rest = stripped.partition("\n")
+        if char == "{" and (not stripped or fence_line.startswith("```") and newline and not rest.strip()):
+            self.started = True
+            self._feed_json(char)
+            return
+
+        self.prefix += char
+        stripped = self.prefix.lstrip()
+        fence_line, _, rest = stripped.partition("\n")
+        if not (fence_line.startswith("```") or "```".startswith(fence_line)) or rest.strip():
+            raise InvalidStreamError(f"la risposta non e' JSON: {stripped[:40]!r}")
+        if len(self.prefix) > MAX_PREFIX_CHARS:
+            raise InvalidStreamError(f"testo prima del JSON: {self.prefix[:40]!r}")
+
+    def _feed_json(self, char):
+        self.json_text.append(char)
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if len(self._stack) == 1:
+                    self._last_key = "".join(self._string)
+            else:
+                self._string.append(char)
+            return
+
+        if char == '"':
+            self._in_string = True
+            self._string = []
+        elif char in "{[":
+            if char == "[" and self._stack == ["{"]:
+                self._array_key = self._last_key
+            if char == "{" and self._stack == ["{", "["]:
+                self._item_start = len(self.json_text) - 1
+            self._stack.append(char)
+        elif char in "}]":
+            if not self._stack or self._stack.pop() != {"}": "{", "]": "["}[char]:
+                raise InvalidStreamError("parentesi non bilanciate nella risposta")
+            if char == "}" and self._stack == ["{", "["] and self._item_start is not None:
+                self._emit("".join(self.json_text[self._item_start:]))
+                self._item_start = None
+            if not self._stack:
+                self.done = True
+        elif not self._stack and not char.isspace():
+            raise InvalidStreamError("testo inatteso nella risposta")
+
+    def _emit(self, item_text):
+        self.items += 1
+        if self.on_item is None:
+            return
+        try:
+            self.on_item(self._array_key, json.loads(item_text))
+        except ValueError:
+            pass
+
+    def result(self):
+        """Testo ricevuto, come l'avrebbe restituito la chiamata senza streaming."""
+        return "".join(self.text)